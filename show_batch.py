@@ -0,0 +1,316 @@
+# show_batch.py
+"""
+Batch Monte Carlo for The Show: many independent half-innings advanced in
+lockstep as NumPy arrays, one pitch per iteration for every live inning.
+Same pitch model as HalfInningEngine; requires numpy.
+
+Random numbers come from UniformStream, which fills large buffers of
+uniforms at once and hands out slices, or from CounterStream, which
+derives each pitch's uniforms from its position so that separate runs can
+share them. The model's weights and rates come from a BatchModel.
+"""
+import hashlib
+
+import numpy as np
+
+from the_show import (
+    PITCH_MIX, PITCH_MIX_WEIGHTS, PITCH_TYPES, PA_OUTCOMES, HIT_BASES,
+    FLY_OUT_P, FLY_HIT_WEIGHTS, GROUND_DP_P, GROUND_SINGLE_P, LINEOUT_P,
+    LINE_HIT_WEIGHTS, HOMER_UPGRADE_P, SWING_THRESHOLD, BASE_TRANSITIONS, BASE_EVENT_OUTS,
+    OUTCOME_BASE_EVENT, optimal_batter_policy, pitch_strike_p, policy_table, swing_threshold,
+)
+
+# ----------------------- Random Streams -----------------------
+
+class UniformStream:
+    """
+    Seedable, splittable source of uniforms in [0, 1), drawn `block` at a
+    time from a NumPy Generator. seed is anything SeedSequence takes, a
+    SeedSequence, or a Generator to draw from; spawn(n) gives n independent
+    child streams, e.g. one per worker, reproducible from the parent seed.
+    """
+
+    def __init__(self, seed=None, block=1 << 20):
+        if isinstance(seed, np.random.Generator):
+            self._gen, self.seed_seq = seed, seed.bit_generator.seed_seq
+        else:
+            self.seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+            self._gen = np.random.Generator(np.random.PCG64(self.seed_seq))
+        self.block = block
+        self._buf = np.empty(0)
+        self._pos = 0
+
+    def take(self, n):
+        """The next n uniforms (a read-only view into the buffer)."""
+        pos = self._pos
+        if pos + n > self._buf.size:
+            self._buf = self._gen.random(max(self.block, n))
+            self._buf.flags.writeable = False
+            pos = 0
+        self._pos = pos + n
+        return self._buf[pos:pos + n]
+
+    def spawn(self, n):
+        return [UniformStream(child, self.block) for child in self.seed_seq.spawn(n)]
+
+# ----------------------- Counter Streams -----------------------
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _splitmix64(x):
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+class CounterStream:
+    """
+    Uniforms addressed by (half-inning row, pitch number, draw slot) rather
+    than drawn in sequence: the same half-inning sees the same number for
+    the same pitch however the other rows play out. Two runs with the same
+    seed (and key) therefore share their random numbers pitch for pitch,
+    common random numbers for comparing configurations. antithetic=True
+    hands out 1 - u in place of every u. key separates streams under one
+    seed (e.g. the innings of a game).
+    """
+
+    def __init__(self, seed=0, key=0, antithetic=False):
+        self.seed, self.key, self.antithetic = seed, key, antithetic
+        digest = hashlib.sha256(repr((seed, key)).encode("utf-8")).digest()
+        self._mix = np.uint64(int.from_bytes(digest[:8], "little"))
+
+    def at(self, rows, pitch_no, first, count):
+        """count uniforms per row, draw slots first..first+count-1 of pitch pitch_no, shape (count, len(rows))."""
+        base = (rows.astype(np.uint64) << np.uint64(24)) ^ (pitch_no.astype(np.uint64) << np.uint64(4))
+        slots = np.arange(first, first + count, dtype=np.uint64)[:, None]
+        u = (_splitmix64((base[None, :] ^ slots) ^ self._mix) >> np.uint64(11)) * (1.0 / (1 << 53))
+        return 1.0 - u if self.antithetic else u
+
+    def antithetic_twin(self):
+        return CounterStream(self.seed, self.key, not self.antithetic)
+
+# ----------------------- Tables -----------------------
+
+def _mean_bases(hit_weights):
+    return sum((i + 1) * w for i, w in enumerate(hit_weights)) / sum(hit_weights)
+
+def _cum(weights):
+    """Cumulative weights and their total: category i is chosen when cum[i-1] <= u * total < cum[i]."""
+    cum = np.cumsum(np.asarray(weights, dtype=float), axis=-1)
+    return cum[..., :-1], cum[..., -1]
+
+class BatchModel:
+    """
+    The pitch model as arrays: PITCH_TYPES and the contact constants,
+    the_show's own by default. Pass one to simulate_half_innings to run
+    another setting of the model (weights need not be integers).
+    """
+
+    def __init__(self, pitch_types=None, fly_out_p=FLY_OUT_P, ground_dp_p=GROUND_DP_P,
+                 ground_single_p=GROUND_SINGLE_P, lineout_p=LINEOUT_P, homer_p=HOMER_UPGRADE_P,
+                 swing_threshold=SWING_THRESHOLD):
+        self.pitch_types = pitch_types or PITCH_TYPES
+        self.fly_out_p, self.ground_dp_p, self.ground_single_p = fly_out_p, ground_dp_p, ground_single_p
+        self.lineout_p, self.homer_p, self.swing_threshold = lineout_p, homer_p, swing_threshold
+        self.pitch_cum, self.pitch_total = _cum(PITCH_MIX_WEIGHTS)
+        self.contact_cum, self.contact_total = _cum([self.pitch_types[pt]["contact_weights"] for pt in PITCH_MIX])
+        self.fly_hit_cum, self.fly_hit_total = _cum(FLY_HIT_WEIGHTS)
+        self.line_hit_cum, self.line_hit_total = _cum(LINE_HIT_WEIGHTS)
+        self.foul_p = np.array([self.pitch_types[pt]["foul_on_strike_p"] for pt in PITCH_MIX])
+
+        # per pitch type, given a ball in play: P(hit) and expected total bases,
+        # without and with a double play in order
+        shares = np.array([self.pitch_types[pt]["contact_weights"] for pt in PITCH_MIX], dtype=float)
+        fly, ground, line = (shares / shares.sum(axis=1, keepdims=True)).T
+        fly_tb = (1 - homer_p) * _mean_bases(FLY_HIT_WEIGHTS) + 4 * homer_p
+        line_tb = (1 - homer_p) * _mean_bases(LINE_HIT_WEIGHTS) + 4 * homer_p
+        air_hits = fly * (1 - fly_out_p) + line * (1 - lineout_p)
+        air_tb = fly * (1 - fly_out_p) * fly_tb + line * (1 - lineout_p) * line_tb
+        grounders = np.stack([ground * ground_single_p, ground * (1 - ground_dp_p) * ground_single_p])
+        self.hit_p = air_hits + grounders           # [dp possible, pitch]
+        self.total_bases = air_tb + grounders
+
+    def slot_tables(self, sides, pitcher_side):
+        """(strike_p, threshold) arrays [slot, pitch] for hitters batting from `sides`."""
+        strike_p = [[pitch_strike_p(pt, side, pitcher_side, self.pitch_types) for pt in PITCH_MIX] for side in sides]
+        threshold = [[swing_threshold(pt, side, pitcher_side, self.swing_threshold) for pt in PITCH_MIX]
+                     for side in sides]
+        return np.array(strike_p), np.array(threshold)
+
+    @staticmethod
+    def pick(u, cum, total):
+        """Categorical draw: how many cumulative weights u * total has passed (cum, total per row)."""
+        x = u * total
+        choice = np.zeros(x.shape, dtype=np.intp)
+        for k in range(cum.shape[-1]):
+            choice += x >= cum[..., k]
+        return choice
+
+DEFAULT_MODEL = BatchModel()
+
+OUT = {name: i for i, name in enumerate(PA_OUTCOMES)}
+_HIT_CODES = np.array([OUT["single"], OUT["double"], OUT["triple"]])
+
+def _transition_arrays():
+    """BASE_TRANSITIONS as arrays indexed [outcome code, base mask], plus outs and hit per outcome."""
+    new_bases = np.zeros((len(PA_OUTCOMES), 8), dtype=np.int8)
+    runs = np.zeros((len(PA_OUTCOMES), 8), dtype=np.int8)
+    outs = np.zeros(len(PA_OUTCOMES), dtype=np.int8)
+    is_hit = np.zeros(len(PA_OUTCOMES), dtype=np.int8)
+    for code, outcome in enumerate(PA_OUTCOMES):
+        event = OUTCOME_BASE_EVENT[outcome]
+        new_bases[code], runs[code] = zip(*BASE_TRANSITIONS[event])
+        outs[code] = BASE_EVENT_OUTS.get(event, 0)
+        is_hit[code] = outcome in HIT_BASES
+    return new_bases, runs, outs, is_hit
+
+_NEW_BASES, _RUNS, _OUTS, _IS_HIT = _transition_arrays()
+_TOTAL_BASES = np.array([HIT_BASES.get(outcome, 0) for outcome in PA_OUTCOMES])
+
+# Zero-mean control variates simulate_half_innings tracks per half-inning,
+# each an observed count minus its analytically known expectation:
+#   strikes    pitches in the zone, against the strike rates
+#   contact    balls put in play, against the swing-roll odds on swings at strikes
+#   hits       hits, against P(hit) for a ball in play off that pitch type
+#   bases      total bases, against their expectation for a ball in play
+CONTROLS = ("strikes", "contact", "hits", "bases")
+
+def policy_swing_table(policy, pitcher_side="R", batter_side="R"):
+    """policy_table as a bool array swing[balls, strikes, pitch]."""
+    return np.array(policy_table(policy, pitcher_side, batter_side), dtype=bool)
+
+# ----------------------- Lockstep Simulation -----------------------
+
+def simulate_half_innings(n, lineup, batter_idx, current_pitcher, batter_sides,
+                          swing_table=None, seed=None, chunk=1 << 17, model=None, controls=False,
+                          outcomes=False):
+    """
+    Play n independent half-innings against current_pitcher.
+    batter_idx is the leadoff slot (an int, or one per inning). seed is a
+    UniformStream, a CounterStream, or anything UniformStream takes as a
+    seed. swing_table is swing[balls, strikes, pitch], or one per lineup
+    slot (default: each hitter's optimal_batter_policy table for the
+    matchup). model is a BatchModel (default: the_show's pitch model).
+    Returns a dict of length-n arrays: runs, hits, pa, pitches, batter_idx
+    (next up), plus, when controls is set, an (n, len(CONTROLS)) array of
+    zero-mean control variates (see CONTROLS), and when outcomes is set,
+    outcomes: how many of each PA_OUTCOMES (indexed by OUT) all n had.
+    """
+    stream = seed if isinstance(seed, (UniformStream, CounterStream)) else UniformStream(seed)
+    model = model or DEFAULT_MODEL
+    sides = [batter_sides.get(name, "R") for name in lineup]
+    if swing_table is None:
+        swing_table = [policy_swing_table(optimal_batter_policy, current_pitcher[1], side) for side in sides]
+    swing_table = np.broadcast_to(np.asarray(swing_table, dtype=bool), (9, 4, 3, len(PITCH_MIX)))
+    strike_p, threshold = model.slot_tables(sides, current_pitcher[1])
+
+    start = np.broadcast_to(np.asarray(batter_idx, dtype=np.int64) % 9, (n,))
+    result = {key: np.zeros(n, dtype=np.int32) for key in ("runs", "hits", "pa", "pitches", "batter_idx")}
+    if controls:
+        result["controls"] = np.zeros((n, len(CONTROLS)))
+    if outcomes:
+        result["outcomes"] = np.zeros(len(PA_OUTCOMES), dtype=np.int64)
+    for lo in range(0, n, chunk):
+        hi = min(n, lo + chunk)
+        _simulate_chunk(stream, model, start[lo:hi], strike_p, threshold, swing_table, result, lo)
+    return result
+
+def _simulate_chunk(stream, model, start, strike_p, threshold, swing_table, result, offset):
+    m = start.size
+    row = np.arange(m) + offset
+    batter = start.copy()
+    balls = np.zeros(m, dtype=np.int64)
+    strikes = np.zeros(m, dtype=np.int64)
+    outs = np.zeros(m, dtype=np.int64)
+    bases = np.zeros(m, dtype=np.int64)
+    runs = np.zeros(m, dtype=np.int32)
+    hits = np.zeros(m, dtype=np.int32)
+    pa = np.zeros(m, dtype=np.int32)
+    pitches = np.zeros(m, dtype=np.int32)
+    excess = np.zeros((len(CONTROLS), m)) if "controls" in result else None
+    tally = result.get("outcomes")
+    counter = isinstance(stream, CounterStream)
+    contact_p = np.clip((11 - threshold) / 10, 0.0, 1.0)   # P(roll >= threshold)
+
+    while row.size:
+        u = stream.at(row, pitches, 0, 4) if counter else stream.take(4 * row.size).reshape(4, row.size)
+        pitch = model.pick(u[0], model.pitch_cum, model.pitch_total)
+        p = strike_p[batter, pitch]
+        strike = u[1] < p
+        swing = swing_table[batter, balls, strikes, pitch]
+
+        foul = swing & strike & (u[2] < model.foul_p[pitch])
+        roll = (u[3] * 10).astype(np.int64) + 1
+        contested = swing & strike & ~foul
+        in_play = contested & (roll >= threshold[batter, pitch])
+        if excess is not None:
+            excess[0] += strike - p
+            excess[1] += contested * (in_play - contact_p[batter, pitch])
+        balls += ~swing & ~strike
+        strikes += (~swing & strike) | (swing & ~foul & ~in_play) | (foul & (strikes < 2))
+
+        outcome = np.full(row.size, -1, dtype=np.int64)
+        outcome[balls == 4] = OUT["walk"]
+        outcome[(strikes == 3) & ~swing] = OUT["k_looking"]
+        outcome[(strikes == 3) & swing] = OUT["k_swinging"]
+
+        idx = np.flatnonzero(in_play)
+        if idx.size:
+            pi = pitch[idx]
+            if counter:
+                u4, u5, u6, u7 = stream.at(row[idx], pitches[idx], 4, 4)
+            else:
+                u4, u5, u6, u7 = stream.take(4 * idx.size).reshape(4, idx.size)
+            contact = model.pick(u4, model.contact_cum[pi], model.contact_total[pi])
+            fly, ground, line = contact == 0, contact == 1, contact == 2
+
+            hit_type = np.where(fly, model.pick(u6, model.fly_hit_cum, model.fly_hit_total),
+                                model.pick(u6, model.line_hit_cum, model.line_hit_total))
+            hit = np.where(u7 < model.homer_p, OUT["homer"], _HIT_CODES[hit_type])
+            dp = ((bases[idx] & 1) == 1) & (outs[idx] <= 1)
+            turn_two = (u5 < model.ground_dp_p) & dp
+            res = np.where(fly, np.where(u5 < model.fly_out_p, OUT["fly_out"], hit),
+                  np.where(line, np.where(u5 < model.lineout_p, OUT["lineout"], hit),
+                  np.where(turn_two, OUT["double_play"],
+                           np.where(u6 < model.ground_single_p, OUT["ground_single"], OUT["ground_out"]))))
+            outcome[idx] = res
+            if excess is not None:
+                excess[2, idx] += _IS_HIT[res] - model.hit_p[dp.astype(np.intp), pi]
+                excess[3, idx] += _TOTAL_BASES[res] - model.total_bases[dp.astype(np.intp), pi]
+        pitches += 1
+
+        idx = np.flatnonzero(outcome >= 0)
+        if idx.size:
+            code, b = outcome[idx], bases[idx]
+            runs[idx] += _RUNS[code, b]
+            bases[idx] = _NEW_BASES[code, b]
+            outs[idx] += _OUTS[code]
+            hits[idx] += _IS_HIT[code]
+            pa[idx] += 1
+            balls[idx] = 0
+            strikes[idx] = 0
+            batter[idx] = (batter[idx] + 1) % 9
+            if tally is not None:
+                tally += np.bincount(code, minlength=tally.size)
+
+            done = outs >= 3
+            if done.any():
+                rows = row[done]
+                result["runs"][rows] = runs[done]
+                result["hits"][rows] = hits[done]
+                result["pa"][rows] = pa[done]
+                result["pitches"][rows] = pitches[done]
+                result["batter_idx"][rows] = batter[done]
+                keep = ~done
+                if excess is not None:
+                    result["controls"][rows] = excess[:, done].T
+                    excess = excess[:, keep]
+                row, batter, balls, strikes, outs, bases = row[keep], batter[keep], balls[keep], strikes[keep], outs[keep], bases[keep]
+                runs, hits, pa, pitches = runs[keep], hits[keep], pa[keep], pitches[keep]
+
+def run_distribution(runs, max_runs=None):
+    """P(runs == k) for k = 0..max_runs from an array of per-inning runs."""
+    counts = np.bincount(runs, minlength=(max_runs or 0) + 1)
+    if max_runs is not None:
+        counts = counts[:max_runs + 1]
+    return counts / max(1, len(runs))
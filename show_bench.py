@@ -0,0 +1,263 @@
+# show_bench.py
+"""
+Benchmarks for The Show's hot paths: pitches, plate appearances,
+half-innings and games per second on the headless engine, the interactive
+at-bat loop driven by scripted keys with its output silenced, peak memory
+per game, and per-call timings of the roster and baserunning helpers.
+
+    python show_bench.py                   # run and print
+    python show_bench.py --save-baseline   # store results as the baseline
+    python show_bench.py --check           # exit 1 if anything regressed
+    python show_bench.py --profile stages.folded   # per-stage timings too
+
+The baseline is plain JSON; a metric regresses when it is worse than the
+stored value by more than its tolerance (default 25%; a "tolerances" map in
+the file overrides it per metric). Baselines are machine-specific, so each
+machine keeps its own bench_baseline.json.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+from unittest import mock
+
+from the_show import (
+    PITCHERS, StageProfiler, advance_bases, allocate_two_teams, build_batting_order_realistic,
+    HalfInningEngine, play_half_inning, play_notation, simulate_game, simulate_opponent_half_inning,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+# Fixed teams so every run measures the same work
+def _bench_team(seed):
+    random.seed(seed)
+    batter_sides = {}
+    defense, _ = allocate_two_teams("Bench Hitter", "9", batter_sides)
+    lineup = build_batting_order_realistic(defense, None, 9, batter_sides)
+    return {"lineup": lineup, "batter_sides": batter_sides, "defense": defense}
+
+def _timed(fn, seconds, rounds=5):
+    """
+    Call fn() for `rounds` rounds filling `seconds` in total; fn returns a
+    list of counts. Returns the best round's counts per second, which is far
+    steadier than the mean on a busy machine.
+    """
+    best = None
+    for _ in range(rounds):
+        totals = None
+        start = time.perf_counter()
+        while True:
+            counts = fn()
+            totals = counts if totals is None else [a + b for a, b in zip(totals, counts)]
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds / rounds:
+                break
+        rates = [t / elapsed for t in totals]
+        if best is None or rates[0] > best[0]:
+            best = rates
+    return best
+
+# ----------------------- Benchmarks -----------------------
+
+def bench_engine(team, seconds):
+    """Headless half-innings with the default policy: pitches, PAs and halves per second."""
+    rng = random.Random(1)
+    pitcher = PITCHERS[0][:2]
+    lineup, sides = team["lineup"], team["batter_sides"]
+
+    def batch():
+        pitches = pas = 0
+        idx = 0
+        for _ in range(200):
+            engine = HalfInningEngine(lineup, idx, pitcher, sides, rng=rng)
+            engine.run()
+            pitches += engine.pitches; pas += engine.pas; idx = engine.batter_idx
+        return [pitches, pas, 200]
+
+    pitches, pas, halves = _timed(batch, seconds)
+    return {"engine_pitches_per_sec": pitches,
+            "engine_pas_per_sec": pas,
+            "engine_halves_per_sec": halves}
+
+def bench_games(team, opp, seconds):
+    rng = random.Random(2)
+
+    def batch():
+        for _ in range(20):
+            simulate_game(team, opp, rng=rng)
+        return [20]
+
+    (games,) = _timed(batch, seconds)
+    return {"games_per_sec": games}
+
+def bench_game_memory(team, opp):
+    """Peak traced allocation while one game is simulated, in KiB."""
+    simulate_game(team, opp, rng=random.Random(3))   # warm the caches first
+    tracemalloc.start()
+    try:
+        simulate_game(team, opp, rng=random.Random(3))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"game_peak_kib": peak / 1024}
+
+def bench_interactive(team, seconds, profiler=None):
+    """play_half_inning with a scripted swing/take pattern and stdout discarded."""
+    keys = ["s", "s", "t", "s", "t", "t", "s"]
+    prompts = [0]
+
+    def scripted(_prompt=""):
+        prompts[0] += 1
+        return keys[prompts[0] % len(keys)]
+
+    lineup, sides = team["lineup"], team["batter_sides"]
+
+    def batch():
+        before = prompts[0]
+        random.seed(4)
+        idx = 0
+        for _ in range(10):
+            _, _, idx, _ = play_half_inning(lineup, idx, "Bench Hitter", "R", PITCHERS[0][:2], sides,
+                                            "Bench", True, profiler=profiler)
+        return [prompts[0] - before, 10]
+
+    with open(os.devnull, "w", encoding="utf-8") as sink, \
+            contextlib.redirect_stdout(sink), mock.patch("builtins.input", scripted):
+        pitches, halves = _timed(batch, seconds)
+    return {"interactive_pitches_per_sec": pitches,
+            "interactive_halves_per_sec": halves}
+
+def bench_helpers(team, seconds):
+    """Microseconds per call for the roster, lineup, baserunning and scorebook helpers and an opponent half."""
+    random.seed(5)
+    defense, sides = team["defense"], team["batter_sides"]
+    cases = {
+        "advance_bases_us": lambda: advance_bases(["A", None, "C"], "B", 2),
+        "build_batting_order_us": lambda: build_batting_order_realistic(defense, "Bench Hitter", 4, sides),
+        "allocate_two_teams_us": lambda: allocate_two_teams("Bench Hitter", "9", {}),
+        "play_notation_us": lambda: play_notation("ground_out", 1),
+        "opponent_half_us": lambda: simulate_opponent_half_inning(team["lineup"], 0, PITCHERS[0][:2], sides),
+    }
+    results = {}
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        reps = max(3, int(seconds / 0.2))
+        best = min(timer.repeat(repeat=reps, number=number)) / number
+        results[name] = best * 1e6
+    return results
+
+def profile_stages(seconds):
+    """StageProfiler filled by headless games and scripted interactive half-innings."""
+    team, opp = _bench_team(10), _bench_team(11)
+    profiler = StageProfiler()
+    rng = random.Random(6)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        simulate_game(team, opp, rng=rng, profiler=profiler)
+    bench_interactive(team, seconds, profiler)
+    return profiler
+
+# Higher is better for rates; lower is better for times and memory
+HIGHER_IS_BETTER = {
+    "engine_pitches_per_sec", "engine_pas_per_sec", "engine_halves_per_sec",
+    "games_per_sec", "interactive_pitches_per_sec", "interactive_halves_per_sec",
+}
+
+def run_benchmarks(seconds=1.0):
+    team, opp = _bench_team(10), _bench_team(11)
+    results = {}
+    results.update(bench_engine(team, seconds))
+    results.update(bench_games(team, opp, seconds))
+    results.update(bench_game_memory(team, opp))
+    results.update(bench_interactive(team, seconds))
+    results.update(bench_helpers(team, seconds))
+    return results
+
+# ----------------------- Baseline -----------------------
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+def save_baseline(results, path=BASELINE_PATH, tolerance=DEFAULT_TOLERANCE):
+    data = {"python": sys.version.split()[0], "tolerance": tolerance, "metrics": results}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+def compare(results, baseline, tolerance=None):
+    """
+    (name, value, baseline value, relative change, regressed) for each metric
+    in both. The change is signed so that positive is always an improvement.
+    """
+    tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE) if tolerance is None else tolerance
+    per_metric = baseline.get("tolerances", {})
+    rows = []
+    for name, value in results.items():
+        base = baseline["metrics"].get(name)
+        if not base:
+            continue
+        change = (value - base) / base
+        if name not in HIGHER_IS_BETTER:
+            change = -change
+        rows.append((name, value, base, change, change < -per_metric.get(name, tolerance)))
+    return rows
+
+def print_results(results, rows=None):
+    rows = {r[0]: r for r in rows or []}
+    for name, value in results.items():
+        line = f"{name:<30} {value:>14,.2f}"
+        if name in rows:
+            _, _, base, change, regressed = rows[name]
+            line += f"   baseline {base:>14,.2f}  {change:+7.1%}{'  REGRESSED' if regressed else ''}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark The Show's hot paths.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per throughput benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a metric regressed past its tolerance")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help=f"allowed slowdown as a fraction (default: the baseline's, else {DEFAULT_TOLERANCE})")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="also write per-stage timings (JSON, or collapsed stacks if PATH ends in .folded)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.seconds)
+    rows = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        rows = compare(results, load_baseline(args.baseline), args.tolerance)
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        print_results(results, rows)
+
+    if args.profile:
+        profile_stages(args.seconds).write(args.profile)
+        print(f"\nstage timings saved to {args.profile}")
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline,
+                      DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance)
+        print(f"\nbaseline saved to {args.baseline}")
+    elif args.check:
+        if rows is None:
+            print(f"\nno baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+        regressed = [r[0] for r in rows if r[4]]
+        if regressed:
+            print(f"\nregressed: {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# show_bullpen.py
+"""
+Bullpen manager for The Show: pitching changes by inning, score and
+base-out state, made to maximize win probability (or to minimize the
+runs allowed) from a team's whole bullpen. Requires numpy.
+
+Pitchers in the model differ only by hand, so a change pays off through
+the platoon matchups with the hitters coming up, and every change spends
+a pitcher. For one opposing batting order, bullpen_tables solves the
+fielding side's rest of the game by dynamic programming over inning,
+outs, bases, the batter up, the pitcher's hand, left- and right-handers
+left in the pen and the lead, and keeps the best move at every state.
+Tables are built once per order and cached in memory and in CACHE_DIR;
+BullpenManager looks its moves up in them with a little index arithmetic
+per plate appearance.
+
+    python show_bullpen.py --games 2000                # manager vs the fixed schedule
+    python show_bullpen.py --games 2000 --objective runs
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+
+import numpy as np
+
+from show_batch import _NEW_BASES, _OUTS, _RUNS
+from show_season import build_league
+from the_show import (
+    CACHE_DIR, MAX_LEAD, PA_OUTCOMES, PITCHERS, league_pa_distribution, model_hash, optimal_batter_policy,
+    pa_outcome_distribution, rest_of_half_runs, simulate_game, staff_pools,
+)
+
+BULLPEN_VERSION = 1
+INNINGS = 9
+PEN_DEPTH = 2        # pitchers of each hand the tables tell apart; any more count as this many
+OBJECTIVES = ("win", "runs")
+HANDS = ("L", "R")
+STAY, TO_LEFT, TO_RIGHT = 0, 1, 2
+_SWEEPS = 50         # Gauss-Seidel sweeps per outs level, at most
+
+# ----------------------- Tables -----------------------
+
+class BullpenTables:
+    """
+    moves[inning - 1, outs, bases, batter_idx, hand, lefties, righties, lead]:
+    STAY, TO_LEFT or TO_RIGHT before the plate appearance, and values[...]
+    the fielding side's win probability (or minus the runs it will allow)
+    on the best move. hand indexes HANDS; lefties and righties are capped
+    at PEN_DEPTH; lead is clamped to +/- MAX_LEAD (objective "runs" has a
+    single lead column).
+    """
+
+    def __init__(self, moves, values, objective):
+        self.moves, self.values, self.objective = moves, values, objective
+        self._flat = moves.tobytes()
+        self._strides = [s // moves.itemsize for s in moves.strides]
+        self._leads = moves.shape[-1]
+
+    def index(self, inning, outs, bases, batter_idx, hand, lefties, righties, lead):
+        st = self._strides
+        lead = 0 if self._leads == 1 else max(-MAX_LEAD, min(MAX_LEAD, lead)) + MAX_LEAD
+        return ((min(inning, INNINGS) - 1) * st[0] + outs * st[1] + bases * st[2] + batter_idx * st[3]
+                + hand * st[4] + min(lefties, PEN_DEPTH) * st[5] + min(righties, PEN_DEPTH) * st[6] + lead)
+
+    def move(self, *state):
+        """The move at a state (arguments as for index())."""
+        return self._flat[self.index(*state)]
+
+    def value(self, *state):
+        return float(self.values.flat[self.index(*state)])
+
+def _pa_table(sides):
+    """P[dp possible, hand, batter slot, outcome] under the batters' optimal policy."""
+    return np.array([[[[pa_outcome_distribution(optimal_batter_policy, hand, side, dp)[o] for o in PA_OUTCOMES]
+                       for side in sides] for hand in HANDS] for dp in (False, True)])
+
+def _tied_extra():
+    """P(the home side wins) once regulation ends tied, as in the_show's win probability."""
+    start = rest_of_half_runs({dp: league_pa_distribution(optimal_batter_policy, dp) for dp in (False, True)})[0][0]
+    return (sum(start[a] * sum(start[a + 1:]) for a in range(len(start)))
+            / (1 - sum(q * q for q in start))), np.array(start)
+
+def _build_tables(sides, home, objective):
+    win = objective == "win"
+    n_lead = 2 * MAX_LEAD + 1 if win else 1
+    depth = PEN_DEPTH + 1
+    pa = _pa_table(sides)
+    dp_possible = np.array([[(b & 1) == 1 and outs <= 1 for b in range(8)] for outs in range(3)])
+    codes = [c for c in range(len(PA_OUTCOMES)) if pa[:, :, :, c].any()]
+    tied_home, batting = _tied_extra()
+    lead_axis = np.arange(n_lead)
+    # where a lead lands after conceding r runs (rows) or scoring k (columns of the batting convolution)
+    conceded = np.clip(lead_axis[None, :] - np.arange(5)[:, None], 0, n_lead - 1)
+    scored = np.clip(lead_axis[None, :] + np.arange(len(batting))[:, None], 0, n_lead - 1)
+
+    def after_batting(start_values, last):
+        """Value on our third out: our half at bat (league-average runs), then the next fielding half."""
+        if not win:
+            return np.zeros((9, 2, depth, depth, 1)) if last else start_values.copy()
+        lead = lead_axis - MAX_LEAD
+        if last:
+            if home:
+                end = np.where(lead > 0, 1.0, np.where(lead == 0, tied_home, 0.0))
+                out = (batting[:, None] * end[scored]).sum(axis=0)
+                out = np.where(lead > 0, 1.0, out)   # bottom of the ninth not needed
+            else:
+                out = np.where(lead > 0, 1.0, np.where(lead == 0, 1 - tied_home, 0.0))
+            return np.broadcast_to(out, (9, 2, depth, depth, n_lead)).copy()
+        return np.einsum("k,...kl->...l", batting, start_values[..., scored])
+
+    moves = np.zeros((INNINGS, 3, 8, 9, 2, depth, depth, n_lead), dtype=np.uint8)
+    values = np.zeros(moves.shape, dtype=np.float32)
+    nxt_start = None
+    for inning in range(INNINGS, 0, -1):
+        cont = after_batting(nxt_start, inning == INNINGS)   # [next batter, hand, lefties, righties, lead]
+        walk_off = win and not home and inning == INNINGS    # conceding the lead ends it
+        v = np.zeros((3, 8, 9, 2, depth, depth, n_lead))
+        for outs in (2, 1, 0):
+            for _ in range(_SWEEPS):
+                change = 0.0
+                for slot in range(8, -1, -1):
+                    up = (slot + 1) % 9
+                    q = np.zeros((8, 2, depth, depth, n_lead))
+                    for c in codes:
+                        p = pa[dp_possible[outs].astype(int), :, slot, c]       # [bases, hand]
+                        nb, runs, k = _NEW_BASES[c], _RUNS[c], int(_OUTS[c])
+                        nxt = v[outs + k, nb, up] if outs + k < 3 else cont[up][None].repeat(8, axis=0)
+                        if win:
+                            nxt = np.take_along_axis(nxt, conceded[runs][:, None, None, None, :], axis=-1)
+                        else:
+                            nxt = nxt - runs[:, None, None, None, None]
+                        q += p[:, :, None, None, None] * nxt
+                    best = q.copy()
+                    move = np.zeros(best.shape, dtype=np.uint8)
+                    to_left = q[:, 0, :-1]                                       # from a right-hander
+                    better = to_left > best[:, 1, 1:] + 1e-12
+                    best[:, 1, 1:] = np.where(better, to_left, best[:, 1, 1:])
+                    move[:, 1, 1:][better] = TO_LEFT
+                    to_right = q[:, 1, :, :-1]                                   # from a left-hander
+                    better = to_right > best[:, 0, :, 1:] + 1e-12
+                    best[:, 0, :, 1:] = np.where(better, to_right, best[:, 0, :, 1:])
+                    move[:, 0, :, 1:][better] = TO_RIGHT
+                    if walk_off:
+                        best[..., :MAX_LEAD] = 0.0
+                    change = max(change, float(np.abs(best - v[outs, :, slot]).max()))
+                    v[outs, :, slot] = best
+                    moves[inning - 1, outs, :, slot] = move
+                if change < 1e-12:
+                    break
+        values[inning - 1] = v
+        nxt_start = v[0, 0]
+    return BullpenTables(moves, values, objective)
+
+_TABLES = {}
+
+def bullpen_tables(sides, home, objective="win"):
+    """
+    BullpenTables for the side fielding against a batting order given as
+    its hitters' sides, at home (fielding the top halves) or away. Built
+    once per order and cached in memory and on disk under the model hash.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    sides = tuple(sides)
+    key = (sides, bool(home), objective)
+    tables = _TABLES.get(key)
+    if tables is not None:
+        return tables
+    digest = hashlib.sha256(repr((BULLPEN_VERSION, model_hash(optimal_batter_policy), key, PEN_DEPTH, MAX_LEAD))
+                            .encode("utf-8")).hexdigest()[:32]
+    path = os.path.join(CACHE_DIR, f"bullpen-{digest}.npz")
+    try:
+        with np.load(path) as data:
+            tables = BullpenTables(data["moves"], data["values"], objective)
+    except (OSError, ValueError, KeyError):
+        tables = _build_tables(sides, home, objective)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as fh:
+                np.savez(fh, moves=tables.moves, values=tables.values)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only cache dir: keep the tables in memory only
+    _TABLES[key] = tables
+    return tables
+
+# ----------------------- Manager -----------------------
+
+def bullpen_pool(staff, pitchers=None):
+    """
+    Everyone on the staff list but the starter, by hand, in the order they
+    come in: relievers, then closers, then the other starters as long men.
+    """
+    starters, relievers, closers = staff_pools(pitchers or PITCHERS)
+    pen = {"L": [], "R": []}
+    seen = {staff["starter"][0]}
+    for name, hand in relievers + closers + starters:
+        if name not in seen:
+            seen.add(name)
+            pen[hand].append((name, hand))
+    return pen
+
+class BullpenManager:
+    """
+    One side's pitching changes for simulate_game(bullpen=...): the starter
+    goes his staff["starter_len"] innings as before, and from then on the
+    tables pick the pitcher for every plate appearance. `changes` lists
+    (inning, outs, pitcher) for each move made.
+    """
+
+    def __init__(self, staff, opponent, home, pitchers=None, objective="win"):
+        self.starter_len = staff["starter_len"]
+        self.current = staff["starter"]
+        self.pen = bullpen_pool(staff, pitchers)
+        sides = [opponent["batter_sides"].get(name, "R") for name in opponent["lineup"]]
+        self.tables = bullpen_tables(sides, home, objective)
+        self.changes = []
+
+    def __call__(self, engine, inning, lead):
+        """The pitcher for the batter up, or None to stay with the current one."""
+        if inning <= self.starter_len:
+            return None
+        hand = HANDS.index(self.current[1])
+        move = self.tables.move(inning, engine.outs, engine.bases, engine.batter_idx, hand,
+                                len(self.pen["L"]), len(self.pen["R"]), lead)
+        if move == STAY:
+            return None
+        self.current = self.pen["L" if move == TO_LEFT else "R"].pop(0)
+        self.changes.append((inning, engine.outs, self.current))
+        return self.current
+
+# ----------------------- Comparison -----------------------
+
+def compare(games=2000, seed=0, objective="win", teams=None):
+    """
+    Head to head between two league teams, one side managed by the tables
+    and the other on the fixed schedule, swapping home field and the
+    managed side between games. Returns the managed side's win rate, runs
+    allowed per game by each side, and pitching changes per game.
+    """
+    teams = teams or build_league(2, seed)
+    managers = []
+    wins = ra_managed = ra_fixed = 0
+    for g in range(games):
+        home, away = teams[g % 2], teams[1 - g % 2]
+        managed_home = (g // 2) % 2 == 0
+
+        def bullpen(staff, opponent, at_home, pitchers):
+            if at_home != managed_home:
+                return None   # the fixed schedule
+            managers.append(BullpenManager(staff, opponent, at_home, pitchers, objective))
+            return managers[-1]
+
+        result = simulate_game(home, away, rng=random.Random(f"the_show/bullpen/{seed}/{g}"), bullpen=bullpen)
+        home_runs, away_runs = sum(result["home_line"]), sum(result["away_line"])
+        ours, theirs = (home_runs, away_runs) if managed_home else (away_runs, home_runs)
+        wins += ours > theirs
+        ra_managed += theirs
+        ra_fixed += ours
+    changes = sum(len(m.changes) for m in managers)
+    return wins / games, ra_managed / games, ra_fixed / games, changes / games
+
+def main():
+    parser = argparse.ArgumentParser(description="Bullpen manager for The Show against the fixed pitching schedule.")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objective", choices=OBJECTIVES, default="win")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    win_p, ra_managed, ra_fixed, changes = compare(args.games, args.seed, args.objective)
+    print(f"managed side ({args.objective}): won {win_p:.3f}, allowed {ra_managed:.2f} runs per game "
+          f"(fixed schedule allowed {ra_fixed:.2f}), {changes:.1f} changes per game")
+    print(f"{args.games} games in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+# show_cluster.py
+"""
+Distributed simulation for The Show: a coordinator splits a job (seasons,
+or half-innings over a parameter grid) into seeded shards and hands them
+out over TCP to worker processes on this machine or any other.
+
+    python show_cluster.py run job.json --out results --local 4    # coordinator + 4 local workers
+    python show_cluster.py serve job.json --out results --host 0.0.0.0 --port 7100
+    python show_cluster.py work --host coordinator.lan --port 7100 --procs 8
+    python show_cluster.py summary results
+
+A job is a JSON object:
+
+    {"kind": "halves", "seed": 7, "replicates": 50,
+     "params": {"halves": 100000, "team_seed": 3},
+     "grid": {"pitcher": ["L", "R"]}}
+
+Every grid point (params plus one value per grid key) is run `replicates`
+times, and each run is a shard with its own seed, so a shard's result
+depends only on the job and its number, never on which worker ran it.
+Each result is written to the output directory as its own self-describing
+JSON file (job hash, shard, seed, parameters, worker, result). Starting
+the job again on the same directory skips the shards already there, so a
+killed run picks up where it stopped.
+
+The protocol is JSON lines: a worker sends {"op": "ready"}, receives a
+shard or {"op": "done"}, and answers each shard with {"op": "result"} (or
+{"op": "error"} if the shard raised) to get the next one. A shard whose
+worker disconnects or fails goes back in the queue; one that has failed
+MAX_FAILURES times is given up on and reported.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import socket
+import time
+
+from show_season import build_league, simulate_season
+from the_show import MAX_RUNS, run_half_inning
+
+SHARD_FORMAT = "the_show/shard"
+SHARD_VERSION = 1
+DEFAULT_PORT = 7100
+LINE_LIMIT = 1 << 24   # longest protocol message, in bytes
+MAX_FAILURES = 3       # errors before a shard is given up on
+
+# ----------------------- Shard Kinds -----------------------
+
+def run_season_shard(params, seed):
+    """
+    One headless season. params: teams, games (per team). The league is
+    drawn from the shard seed too, so every shard is a different league.
+    """
+    teams = build_league(params.get("teams", 30), seed)
+    games = simulate_season(teams, params.get("games", 162), seed, workers=1)["games"]
+    return {"games": len(games),
+            "runs": sum(sum(g[2]) + sum(g[3]) for g in games),
+            "hits": sum(g[4] + g[5] for g in games),
+            "extra_innings": sum(len(g[3]) > 9 for g in games),
+            "home_wins": sum(sum(g[2]) > sum(g[3]) for g in games)}
+
+def run_halves_shard(params, seed):
+    """
+    Consecutive half-innings (run_half_inning) by one lineup against one
+    hand. params: halves, team_seed (which lineup), pitcher ("L" or "R").
+    """
+    rng = random.Random(f"the_show/halves/{seed}")
+    team = build_league(1, params.get("team_seed", 0))[0]
+    pitcher = ("Grid Pitcher", params.get("pitcher", "R"))
+    hist = [0] * (MAX_RUNS + 1)
+    hits = idx = 0
+    for _ in range(params.get("halves", 10000)):
+        runs, h, idx, _ = run_half_inning(team["lineup"], idx, pitcher, team["batter_sides"], rng=rng)
+        hist[min(runs, MAX_RUNS)] += 1
+        hits += h
+    return {"halves": sum(hist), "runs": sum(k * n for k, n in enumerate(hist)), "hits": hits, "run_hist": hist}
+
+SHARD_KINDS = {"season": run_season_shard, "halves": run_halves_shard}
+
+# the parameters each kind takes, with their types (and allowed values, where limited)
+SHARD_PARAMS = {
+    "season": {"teams": (int, None), "games": (int, None)},
+    "halves": {"halves": (int, None), "team_seed": (int, None), "pitcher": (str, ("L", "R"))},
+}
+
+# ----------------------- Jobs & Result Files -----------------------
+
+def load_job(path):
+    with open(path, encoding="utf-8") as fh:
+        job = json.load(fh)
+    if not isinstance(job, dict) or job.get("kind") not in SHARD_KINDS:
+        raise ValueError(f"{path}: kind must be one of {', '.join(SHARD_KINDS)}")
+    replicates = job.get("replicates", 1)
+    if not isinstance(replicates, int) or isinstance(replicates, bool) or replicates < 1:
+        raise ValueError(f"{path}: replicates must be a positive integer")
+    params, grid = job.get("params", {}), job.get("grid", {})
+    if not isinstance(params, dict):
+        raise ValueError(f"{path}: params must be an object")
+    if not isinstance(grid, dict) or not all(isinstance(v, list) and v for v in grid.values()):
+        raise ValueError(f"{path}: grid must map each parameter to a non-empty list of values")
+    allowed = SHARD_PARAMS[job["kind"]]
+    for name, values in itertools.chain(((k, [v]) for k, v in params.items()), grid.items()):
+        if name not in allowed:
+            raise ValueError(f"{path}: {job['kind']} jobs take no parameter {name!r} "
+                             f"(known: {', '.join(allowed)})")
+        kind, choices = allowed[name]
+        for value in values:
+            if (not isinstance(value, kind) or isinstance(value, bool)
+                    or (choices is None and kind is int and value < 0)
+                    or (choices is not None and value not in choices)):
+                want = " or ".join(map(repr, choices)) if choices else f"a non-negative {kind.__name__}"
+                raise ValueError(f"{path}: {name} must be {want}, not {value!r}")
+    return job
+
+def job_hash(job):
+    """Short hash of the job's canonical JSON; every shard file carries it."""
+    canon = json.dumps(job, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()[:16]
+
+def job_shards(job):
+    """(shard number, params, seed) for every shard: grid points in order, replicates within each."""
+    grid = job.get("grid", {})
+    keys = sorted(grid)
+    shards = []
+    for point in itertools.product(*(grid[k] for k in keys)):
+        params = dict(job.get("params", {}), **dict(zip(keys, point)))
+        for _ in range(job.get("replicates", 1)):
+            n = len(shards)
+            shards.append((n, params, f"{job.get('seed', 0)}/{n}"))
+    return shards
+
+def shard_path(out_dir, shard):
+    return os.path.join(out_dir, f"shard-{shard:07d}.json")
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, sort_keys=True)
+        fh.write("\n")
+    os.replace(tmp, path)
+
+def prepare_out_dir(out_dir, job):
+    """Create out_dir with its job.json, or check that an existing one holds this job."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "job.json")
+    try:
+        with open(path, encoding="utf-8") as fh:
+            stored = json.load(fh)
+    except FileNotFoundError:
+        _write_json(path, job)
+        return
+    if job_hash(stored) != job_hash(job):
+        raise ValueError(f"{out_dir} holds results for a different job; pick another --out")
+
+def load_results(out_dir, key=None):
+    """Every readable shard record in out_dir (only job `key`'s if given), by shard number."""
+    records = []
+    for name in sorted(os.listdir(out_dir)):
+        if not (name.startswith("shard-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(out_dir, name), encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            continue   # torn or foreign file: that shard simply runs again
+        if record.get("format") == SHARD_FORMAT and (key is None or record.get("job") == key):
+            records.append(record)
+    return records
+
+# ----------------------- Coordinator -----------------------
+
+class Coordinator:
+    """
+    Hands out a job's unfinished shards to whoever connects and writes each
+    result as it arrives. `finished` is set once every shard has a file or
+    has failed MAX_FAILURES times (`failed` maps those to their last error),
+    or when stop() is called.
+    """
+
+    def __init__(self, job, out_dir, report_every=10.0):
+        prepare_out_dir(out_dir, job)
+        self.job = job
+        self.key = job_hash(job)
+        self.out_dir = out_dir
+        done = {r["shard"] for r in load_results(out_dir, self.key)}
+        shards = job_shards(job)
+        self.total = len(shards)
+        self.skipped = len(done)
+        self.completed = len(done)
+        self.pending = collections.deque(s for s in shards if s[0] not in done)
+        self.running = 0
+        self.failures = collections.Counter()
+        self.failed = {}
+        self.report_every = report_every
+        self._last_report = time.monotonic()
+        self._changed = None
+        self._handlers = set()
+        self.finished = None
+
+    def _save(self, shard, worker, msg):
+        n, params, seed = shard
+        _write_json(shard_path(self.out_dir, n), {
+            "format": SHARD_FORMAT, "version": SHARD_VERSION, "job": self.key, "kind": self.job["kind"],
+            "shard": n, "seed": seed, "params": params, "worker": worker,
+            "elapsed": msg.get("elapsed"), "result": msg["result"],
+        })
+        self.completed += 1
+        now = time.monotonic()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            print(f"{self.completed}/{self.total} shards done")
+
+    async def _next_shard(self):
+        """The next pending shard, waiting while others may still come back; None when all are done."""
+        while not self.pending and self.running:
+            self._changed.clear()
+            await self._changed.wait()
+        if not self.pending:
+            self.finished.set()
+            return None
+        self.running += 1
+        return self.pending.popleft()
+
+    def _settle(self, shard, requeue):
+        self.running -= 1
+        if requeue:
+            self.pending.appendleft(shard)
+        self._changed.set()
+
+    def _fail(self, shard, worker, error):
+        """A shard raised on a worker: back in the queue, behind the others, until it has failed too often."""
+        n = shard[0]
+        self.failures[n] += 1
+        print(f"shard {n} failed on {worker} ({self.failures[n]}/{MAX_FAILURES}): {error}")
+        self.running -= 1
+        if self.failures[n] >= MAX_FAILURES:
+            self.failed[n] = error
+        else:
+            self.pending.append(shard)
+        self._changed.set()
+
+    def stop(self, reason):
+        """Give up on the shards still pending or running (e.g. no workers are left to run them)."""
+        if not self.finished.is_set():
+            print(f"stopping with {len(self.pending) + self.running} shards unfinished: {reason}")
+            self.finished.set()
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            await self._serve_worker(reader, writer)
+        except (ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass   # shutting down; end quietly rather than as a cancelled connection
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+    async def _serve_worker(self, reader, writer):
+        shard, worker = None, "?"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                msg = json.loads(line)
+                if msg.get("op") == "ready":
+                    worker = str(msg.get("worker", worker))
+                elif msg.get("op") == "result" and shard is not None and msg.get("shard") == shard[0]:
+                    self._save(shard, worker, msg)
+                    done, shard = shard, None
+                    self._settle(done, requeue=False)
+                elif msg.get("op") == "error" and shard is not None and msg.get("shard") == shard[0]:
+                    failed, shard = shard, None
+                    self._fail(failed, worker, str(msg.get("error", "unknown error")))
+                else:
+                    return   # out of protocol: drop the worker (its shard is requeued below)
+                shard = await self._next_shard()
+                if shard is None:
+                    writer.write(b'{"op": "done"}\n')
+                    await writer.drain()
+                    return
+                n, params, seed = shard
+                writer.write(json.dumps({"op": "shard", "kind": self.job["kind"], "shard": n,
+                                         "params": params, "seed": seed}).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            if shard is not None:
+                self._settle(shard, requeue=True)
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, on_listening=None):
+        """Run until every shard is done. on_listening(port) is called once the socket is bound."""
+        self._changed = asyncio.Event()
+        self.finished = asyncio.Event()
+        if not self.pending:
+            return
+        listener = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        bound = listener.sockets[0].getsockname()[1]
+        print(f"{len(self.pending)} of {self.total} shards to run ({self.skipped} already done), "
+              f"listening on {host}:{bound}")
+        if on_listening is not None:
+            on_listening(bound)
+        async with listener:
+            await self.finished.wait()
+            # every other connection is being told "done"; let them finish saying it
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self.failed:
+            print(f"{len(self.failed)} shards failed {MAX_FAILURES} times and were given up on:")
+            for n, error in sorted(self.failed.items()):
+                print(f"  shard {n}: {error}")
+
+# ----------------------- Workers -----------------------
+
+def work(host="127.0.0.1", port=DEFAULT_PORT, name=None):
+    """Run shards for a coordinator until it has none left. Returns how many this worker ran."""
+    name = name or f"{socket.gethostname()}/{os.getpid()}"
+    ran = 0
+    with socket.create_connection((host, port)) as sock, \
+            sock.makefile("r", encoding="utf-8") as rfile, sock.makefile("w", encoding="utf-8") as wfile:
+        def send(msg):
+            wfile.write(json.dumps(msg) + "\n")
+            wfile.flush()
+
+        send({"op": "ready", "worker": name})
+        for line in rfile:
+            msg = json.loads(line)
+            if msg.get("op") != "shard":
+                break
+            start = time.perf_counter()
+            try:
+                result = SHARD_KINDS[msg["kind"]](msg["params"], msg["seed"])
+            except Exception as exc:   # a bad shard: report it and keep taking work
+                send({"op": "error", "shard": msg["shard"], "error": f"{type(exc).__name__}: {exc}"})
+                continue
+            send({"op": "result", "shard": msg["shard"], "result": result,
+                  "elapsed": round(time.perf_counter() - start, 3)})
+            ran += 1
+    return ran
+
+def _work_quietly(host, port):
+    try:
+        work(host, port)
+    except (ConnectionError, KeyboardInterrupt):
+        pass
+
+def start_workers(n, host, port):
+    """n worker processes on this machine; returns them (already started)."""
+    procs = [multiprocessing.Process(target=_work_quietly, args=(host, port), daemon=True) for _ in range(n)]
+    for proc in procs:
+        proc.start()
+    return procs
+
+def run_job(job, out_dir, workers=None, port=0):
+    """
+    Coordinator on localhost plus `workers` local worker processes (default:
+    all cores). Stops early if every worker process has exited.
+    """
+    coordinator = Coordinator(job, out_dir)
+    procs = []
+
+    def launch(bound):
+        procs.extend(start_workers(workers or os.cpu_count() or 1, "127.0.0.1", bound))
+
+    async def supervise():
+        serving = asyncio.ensure_future(coordinator.serve("127.0.0.1", port, launch))
+        while not serving.done():
+            await asyncio.wait([serving], timeout=0.5)
+            if procs and not any(proc.is_alive() for proc in procs):
+                coordinator.stop("every local worker has exited")
+        await serving
+
+    try:
+        asyncio.run(supervise())
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+    return load_results(out_dir, coordinator.key)
+
+# ----------------------- Summary -----------------------
+
+def summarize(records):
+    """
+    Shard results totalled per grid point: {params JSON: totals}, where
+    numbers are summed, lists summed elementwise, and "shards" counts shards.
+    """
+    groups = {}
+    for record in records:
+        key = json.dumps(record["params"], sort_keys=True)
+        totals = groups.setdefault(key, {"shards": 0})
+        totals["shards"] += 1
+        for name, value in record["result"].items():
+            if isinstance(value, list):
+                acc = totals.setdefault(name, [0] * len(value))
+                for i, v in enumerate(value):
+                    acc[i] += v
+            elif isinstance(value, (int, float)):
+                totals[name] = totals.get(name, 0) + value
+    return groups
+
+def print_summary(groups):
+    for key, totals in groups.items():
+        per, unit = ("halves", "half") if "halves" in totals else ("games", "game")
+        n = max(1, totals.get(per, 0))
+        print(f"{key}  shards {totals['shards']}  {per} {totals.get(per, 0)}"
+              f"  runs/{unit} {totals.get('runs', 0) / n:.4f}  hits/{unit} {totals.get('hits', 0) / n:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run The Show simulation jobs across worker processes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="coordinator with local workers")
+    serve = sub.add_parser("serve", help="coordinator only; workers connect over TCP")
+    for p in (run, serve):
+        p.add_argument("job", help="job JSON file")
+        p.add_argument("--out", required=True, help="directory for shard result files (resumes if present)")
+    run.add_argument("--local", type=int, default=None, help="local worker processes (default: all cores)")
+    run.add_argument("--port", type=int, default=0, help="coordinator port (default: any free port)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    worker = sub.add_parser("work", help="take shards from a coordinator")
+    worker.add_argument("--host", default="127.0.0.1")
+    worker.add_argument("--port", type=int, default=DEFAULT_PORT)
+    worker.add_argument("--procs", type=int, default=1, help="worker processes on this machine")
+    summary = sub.add_parser("summary", help="totals per grid point from a result directory")
+    summary.add_argument("out")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "run":
+            start = time.perf_counter()
+            records = run_job(load_job(args.job), args.out, args.local, args.port)
+            print(f"{len(records)} shards in {args.out} ({time.perf_counter() - start:.2f}s)")
+            print_summary(summarize(records))
+        elif args.command == "serve":
+            coordinator = Coordinator(load_job(args.job), args.out)
+            asyncio.run(coordinator.serve(args.host, args.port))
+            print_summary(summarize(load_results(args.out, coordinator.key)))
+        elif args.command == "work":
+            if args.procs == 1:
+                print(f"ran {work(args.host, args.port)} shards")
+            else:
+                for proc in start_workers(args.procs, args.host, args.port):
+                    proc.join()
+        else:
+            with open(os.path.join(args.out, "job.json"), encoding="utf-8") as fh:
+                key = job_hash(json.load(fh))
+            print_summary(summarize(load_results(args.out, key)))
+    except ValueError as err:
+        parser.error(str(err))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# show_fit.py
+"""
+Calibration for The Show: tunes the pitch model (each pitch's strike_p,
+foul_on_strike_p and contact_weights, plus FLY_OUT_P, GROUND_SINGLE_P,
+LINEOUT_P, HOMER_UPGRADE_P and SWING_THRESHOLD) until a simulated league
+hits target K%, BB%, AVG, HR/PA and runs per game. Requires numpy.
+
+Each candidate is scored by simulating a league's games with show_batch,
+the batters playing the swing policy solved for that candidate (the rates
+depend on it: the hitters only walk if the model makes taking pay). All
+candidates share one CounterStream seed, so nearby candidates differ by
+their parameters rather than by noise, and the fit is Levenberg-Marquardt
+on finite differences, pulled gently back toward the hand-set values (the
+targets alone do not pin down two dozen parameters). SWING_THRESHOLD is
+an integer roll, so each value in a small range gets its own fit.
+
+Evaluations are cached by a hash of the parameters and the evaluation
+settings, in memory and in CACHE_DIR/fit-evals.json, so refits and
+reruns with other targets replay the points already scored.
+
+    python show_fit.py                                  # default targets
+    python show_fit.py --k 0.20 --rg 5.0 --out fit.json
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from show_batch import BatchModel, CounterStream, OUT, simulate_half_innings
+from show_season import build_league
+from the_show import (
+    BASE_TRANSITIONS, CACHE_DIR, DEFAULT_PITCH_MODEL, FLY_HIT_WEIGHTS, LINE_HIT_WEIGHTS, PITCH_MIX,
+    PITCH_MIX_WEIGHTS, league_side_mix, solve_swing_policy_for,
+)
+
+FIT_VERSION = 1
+INNINGS = 9
+EVAL_CACHE = os.path.join(CACHE_DIR, "fit-evals.json")
+
+# League-wide rates to aim for, and how far off counts as one unit of loss
+TARGETS = {"K%": 0.224, "BB%": 0.085, "AVG": 0.245, "HR/PA": 0.031, "R/G": 4.5}
+TOLERANCE = {"K%": 0.005, "BB%": 0.003, "AVG": 0.004, "HR/PA": 0.002, "R/G": 0.1}
+STATS = tuple(TARGETS)
+
+# Fitted values per pitch, then the contact constants. Contact weights are
+# fitted as fly and line shares (ground takes the rest) and written back
+# at the pitch's original weight total.
+PITCH_FIELDS = ("strike_p", "foul_on_strike_p", "fly_share", "line_share")
+CONSTANTS = ("fly_out_p", "ground_single_p", "lineout_p", "homer_p")
+BOUNDS = {"strike_p": (0.35, 0.85), "foul_on_strike_p": (0.05, 0.40), "fly_share": (0.10, 0.70),
+          "line_share": (0.10, 0.50), "fly_out_p": (0.30, 0.85), "ground_single_p": (0.10, 0.60),
+          "lineout_p": (0.05, 0.50), "homer_p": (0.01, 0.25)}
+MIN_GROUND_SHARE = 0.10
+FD_STEP = 0.01       # finite-difference step, in probability
+PRIOR_SCALE = 0.05   # a move this size from the hand-set value costs prior * 1
+PRIOR = 1.0
+JACOBIAN_REFRESH = 8
+STOP_GAIN = 0.01     # stop once a step improves the loss by less than this share
+THRESHOLDS = range(3, 8)   # SWING_THRESHOLD values fitted by default
+
+# ----------------------- Parameters -----------------------
+
+def to_vector(model):
+    """The fitted parameters of a PitchModel as a flat array."""
+    x = []
+    for pt in PITCH_MIX:
+        spec = model.pitch_types[pt]
+        fly, _, line = spec["contact_weights"]
+        total = sum(spec["contact_weights"])
+        x += [spec["strike_p"], spec["foul_on_strike_p"], fly / total, line / total]
+    x += [getattr(model, name) for name in CONSTANTS]
+    return np.array(x, dtype=float)
+
+def from_vector(x, model):
+    """model with the fitted parameters set from x (rounded to 4 places)."""
+    x = [round(float(v), 4) for v in x]
+    pitch_types = copy.deepcopy(model.pitch_types)
+    for i, pt in enumerate(PITCH_MIX):
+        strike_p, foul_p, fly, line = x[i * len(PITCH_FIELDS):(i + 1) * len(PITCH_FIELDS)]
+        spec = pitch_types[pt]
+        total = sum(spec["contact_weights"])
+        spec.update(strike_p=strike_p, foul_on_strike_p=foul_p,
+                    contact_weights=[round(w * total, 2) for w in (fly, 1 - fly - line, line)])
+    constants = dict(zip(CONSTANTS, x[len(PITCH_MIX) * len(PITCH_FIELDS):]))
+    return model._replace(pitch_types=pitch_types, **constants)
+
+_FIELDS = PITCH_FIELDS * len(PITCH_MIX) + CONSTANTS
+LOW = np.array([BOUNDS[f][0] for f in _FIELDS])
+HIGH = np.array([BOUNDS[f][1] for f in _FIELDS])
+
+def project(x):
+    """Clip x into BOUNDS, keeping every pitch a minimum share of grounders."""
+    x = np.clip(x, LOW, HIGH)
+    for i in range(len(PITCH_MIX)):
+        at = i * len(PITCH_FIELDS) + 2
+        air = x[at] + x[at + 1]
+        if air > 1 - MIN_GROUND_SHARE:
+            x[at:at + 2] *= (1 - MIN_GROUND_SHARE) / air
+    return x
+
+def params_key(model, settings):
+    """Hash of a PitchModel, everything else the rates depend on, and the evaluation settings."""
+    data = repr((FIT_VERSION, tuple(model), PITCH_MIX, PITCH_MIX_WEIGHTS, FLY_HIT_WEIGHTS,
+                 LINE_HIT_WEIGHTS, BASE_TRANSITIONS, sorted(league_side_mix()[1].items()), settings))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+# ----------------------- Evaluation -----------------------
+
+class Evaluator:
+    """
+    League rates for a PitchModel from `games` simulated team-games: the
+    lineups of `teams` generated teams, against left- and right-handed
+    pitching in the league's proportions. Results are cached by
+    params_key; save() writes the cache to `cache_path` (None: memory only).
+    """
+
+    def __init__(self, games=4000, teams=4, seed=0, cache_path=EVAL_CACHE):
+        self.settings = (games, teams, seed)
+        self.seed = seed
+        self.league = build_league(teams, seed)
+        pitcher_mix = league_side_mix()[1]
+        per_team = games // teams
+        self.hands = [(hand, max(1, round(per_team * share))) for hand, share in sorted(pitcher_mix.items())]
+        self.cache_path = cache_path
+        self.cache = {}
+        self.hits = self.misses = 0
+        self._dirty = False
+        if cache_path:
+            try:
+                with open(cache_path, encoding="utf-8") as fh:
+                    self.cache = json.load(fh)
+            except (OSError, ValueError):
+                pass
+
+    def __call__(self, model):
+        """{stat: value} for STATS under a PitchModel."""
+        return self.many([model])[0]
+
+    def many(self, models, pool=None):
+        """__call__ for each of models, the uncached ones simulated on pool if given."""
+        keys = [params_key(model, self.settings) for model in models]
+        todo = {key: model for key, model in zip(keys, models) if key not in self.cache}
+        self.hits += len(keys) - len(todo)
+        self.misses += len(todo)
+        if todo:
+            if pool is None or len(todo) == 1:
+                results = map(self._simulate, todo.values())
+            else:
+                results = pool.map(_evaluate_job, [(self.settings, model) for model in todo.values()])
+            self.cache.update(zip(todo, results))
+            self._dirty = True
+        return [self.cache[key] for key in keys]
+
+    def _simulate(self, model):
+        calls = solve_swing_policy_for(model)[0]
+        batch_model = BatchModel(*model)
+        counts = np.zeros(len(OUT), dtype=np.int64)
+        runs = games = 0
+        for t, team in enumerate(self.league):
+            sides = [team["batter_sides"].get(name, "R") for name in team["lineup"]]
+            for hand, n in self.hands:
+                swing = [[[[c == "swing" for c in row] for row in count] for count in calls[(hand, side)]]
+                         for side in sides]
+                idx = np.zeros(n, dtype=np.int64)
+                for inning in range(INNINGS):
+                    res = simulate_half_innings(n, team["lineup"], idx, ("Fit Pitcher", hand), team["batter_sides"],
+                                                swing, seed=CounterStream(self.seed, (t, hand, inning)),
+                                                model=batch_model, outcomes=True)
+                    counts += res["outcomes"]
+                    runs += int(res["runs"].sum())
+                    idx = res["batter_idx"]
+                games += n
+        return rates(counts, runs, games)
+
+    def save(self):
+        if not (self.cache_path and self._dirty):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self.cache, fh)
+            os.replace(tmp, self.cache_path)
+            self._dirty = False
+        except OSError:
+            pass  # read-only cache dir: keep the evaluations in memory only
+
+_WORKER_EVALUATOR = None
+
+def _evaluate_job(args):
+    global _WORKER_EVALUATOR
+    settings, model = args
+    if _WORKER_EVALUATOR is None or _WORKER_EVALUATOR.settings != settings:
+        _WORKER_EVALUATOR = Evaluator(*settings, cache_path=None)
+    return _WORKER_EVALUATOR._simulate(model)
+
+def rates(counts, runs, games):
+    """STATS from PA outcome counts (indexed by show_batch.OUT) and runs over team-games."""
+    pa = max(1, int(counts.sum()))
+    walks = int(counts[OUT["walk"]])
+    hits = sum(int(counts[OUT[o]]) for o in ("ground_single", "single", "double", "triple", "homer"))
+    strikeouts = int(counts[OUT["k_looking"]] + counts[OUT["k_swinging"]])
+    return {"K%": strikeouts / pa, "BB%": walks / pa, "AVG": hits / max(1, pa - walks),
+            "HR/PA": int(counts[OUT["homer"]]) / pa, "R/G": runs / max(1, games)}
+
+# ----------------------- Fitting -----------------------
+
+def loss_terms(stats, targets, x, anchor, prior):
+    """Residual vector: stat misses in tolerances, then the pull toward the hand-set values."""
+    misses = [(float(stats[s]) - targets[s]) / TOLERANCE[s] for s in STATS if s in targets]
+    return np.concatenate([misses, np.sqrt(prior) * (x - anchor) / PRIOR_SCALE])
+
+def _jacobian(residuals, x, r):
+    """Forward-difference Jacobian of residuals at x (backward at an upper bound), all columns in one batch."""
+    points = []
+    for i in range(len(x)):
+        xi = x.copy()
+        xi[i] += FD_STEP if x[i] + FD_STEP <= HIGH[i] else -FD_STEP
+        points.append(project(xi))
+    return np.column_stack([(ri - r) / (xi[i] - x[i]) for i, (xi, ri) in enumerate(zip(points, residuals(points)))])
+
+def _fit_threshold(evaluate_many, targets, base, threshold, prior, max_iter, log):
+    """
+    Levenberg-Marquardt at one SWING_THRESHOLD. The Jacobian is taken by
+    finite differences, then carried along by Broyden updates from each
+    step, and retaken when a step fails on a stale one or every
+    JACOBIAN_REFRESH steps.
+    """
+    model = base._replace(swing_threshold=threshold)
+    anchor = to_vector(base)
+
+    def residuals(points):
+        stats = evaluate_many([from_vector(x, model) for x in points])
+        return [loss_terms(s, targets, x, anchor, prior) for s, x in zip(stats, points)]
+
+    x = project(anchor.copy())
+    r = residuals([x])[0]
+    loss, mu = float(r @ r), 1e-2
+    log(f"  threshold {threshold}: start loss {loss:.2f}")
+    jac, age = _jacobian(residuals, x, r), 0
+    for _ in range(max_iter):
+        a, g = jac.T @ jac, jac.T @ r
+        delta = np.linalg.solve(a + mu * np.diag(np.diag(a)) + 1e-9 * np.eye(len(x)), -g)
+        x_new = project(x + delta)
+        r_new = residuals([x_new])[0]
+        step = x_new - x
+        if step @ step > 0:
+            jac += np.outer(r_new - r - jac @ step, step) / (step @ step)
+        age += 1
+        new_loss = float(r_new @ r_new)
+        if new_loss < loss:
+            gain = loss - new_loss
+            x, r, loss, mu = x_new, r_new, new_loss, max(mu / 3, 1e-6)
+            log(f"  threshold {threshold}: loss {loss:.2f}")
+            if gain < STOP_GAIN * loss:
+                break
+        elif age > 1:
+            jac, age = _jacobian(residuals, x, r), 0
+            continue
+        else:
+            mu *= 4
+            if mu > 1e6:
+                break
+        if age >= JACOBIAN_REFRESH:
+            jac, age = _jacobian(residuals, x, r), 0
+    return from_vector(x, model), loss
+
+def fit(targets=None, evaluator=None, thresholds=None, prior=PRIOR, max_iter=30, workers=None, log=print):
+    """
+    Fit the pitch model to targets ({stat: value}, default TARGETS) by
+    simulation. thresholds is the SWING_THRESHOLD values to try (default
+    THRESHOLDS). Each batch of evaluations (a Jacobian's worth) runs on
+    `workers` processes (default: all cores).
+    Returns (PitchModel, stats, loss).
+    """
+    targets = dict(TARGETS, **(targets or {}))
+    evaluate = evaluator or Evaluator()
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    base = DEFAULT_PITCH_MODEL
+    best = None
+    try:
+        for threshold in thresholds or THRESHOLDS:
+            model, loss = _fit_threshold(lambda models: evaluate.many(models, pool), targets, base,
+                                         threshold, prior, max_iter, log)
+            if best is None or loss < best[1]:
+                best = (model, loss)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        evaluate.save()
+    return best[0], evaluate(best[0]), best[1]
+
+def model_json(model):
+    """A PitchModel as JSON-ready fields (PITCH_TYPES plus the constants, by their names in the_show)."""
+    return {"PITCH_TYPES": model.pitch_types, "FLY_OUT_P": model.fly_out_p, "GROUND_SINGLE_P": model.ground_single_p,
+            "LINEOUT_P": model.lineout_p, "HOMER_UPGRADE_P": model.homer_p, "SWING_THRESHOLD": model.swing_threshold}
+
+def print_report(targets, before, after):
+    print(f"{'':<7} {'target':>8} {'before':>8} {'after':>8}")
+    for s in STATS:
+        print(f"{s:<7} {targets[s]:>8.3f} {before[s]:>8.3f} {after[s]:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit The Show's pitch model to target league rates.")
+    parser.add_argument("--k", type=float, default=TARGETS["K%"], help="strikeouts per PA")
+    parser.add_argument("--bb", type=float, default=TARGETS["BB%"], help="walks per PA")
+    parser.add_argument("--avg", type=float, default=TARGETS["AVG"], help="hits per at-bat")
+    parser.add_argument("--hr", type=float, default=TARGETS["HR/PA"], help="home runs per PA")
+    parser.add_argument("--rg", type=float, default=TARGETS["R/G"], help="runs per team-game")
+    parser.add_argument("--games", type=int, default=4000, help="simulated team-games per evaluation")
+    parser.add_argument("--teams", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--thresholds", type=int, nargs="+", help="SWING_THRESHOLD values to try")
+    parser.add_argument("--prior", type=float, default=PRIOR, help="pull toward the hand-set values")
+    parser.add_argument("--iters", type=int, default=30, help="max steps per threshold")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the evaluation cache")
+    parser.add_argument("--out", help="write the fitted model here as JSON")
+    args = parser.parse_args()
+
+    targets = {"K%": args.k, "BB%": args.bb, "AVG": args.avg, "HR/PA": args.hr, "R/G": args.rg}
+    evaluator = Evaluator(args.games, args.teams, args.seed, None if args.no_cache else EVAL_CACHE)
+    start = time.perf_counter()
+    before = evaluator(DEFAULT_PITCH_MODEL)
+    model, after, loss = fit(targets, evaluator, args.thresholds, args.prior, args.iters, args.workers)
+    print(f"\nfit in {time.perf_counter() - start:.0f}s, {evaluator.misses} simulated, "
+          f"{evaluator.hits} cached, loss {loss:.2f}\n")
+    print_report(targets, before, after)
+    print()
+    print(json.dumps(model_json(model), indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(model_json(model), fh, indent=2)
+        print(f"\nsaved to {args.out}")
+
+if __name__ == "__main__":
+    main()
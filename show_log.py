@@ -0,0 +1,465 @@
+# show_log.py
+"""
+Binary event log for The Show: every pitch and plate appearance as a
+fixed-width 24-byte record, appended to one file per game or per batch.
+
+    THE_SHOW_LOG=games.log python the_show.py
+    python show_season.py --games 162 --log season.log
+    python show_log.py season.log games
+    python show_log.py season.log plays --batter "Aaron Judge" --outcome homer
+    python show_log.py season.log plays --bases 7 --outcome walk    # bases-loaded walks
+    python show_log.py season.log recap 12
+
+Player and team names live in a sidecar, PATH.names, one per line (the id
+is the line number). The reader maps the log and keeps a sorted index of
+plate appearances by batter, pitcher and base state in PATH.idx, so queries
+bisect straight to their records; the index is rebuilt whenever the log
+has grown since it was written.
+
+Record layout (little-endian): game, batter id, pitcher id (u32 each),
+then inning, flags, code, pitch, balls, strikes, bases, outs, runs (u8
+each) and three pad bytes.
+  - pitch record: code is the call (PITCH_CALLS), balls/strikes the count
+    after the pitch, bases/outs/runs the half-inning's state when it was thrown
+  - play record (FLAG_PLAY): code is the outcome (PA_OUTCOMES), pitch and
+    count are the last pitch's, bases/outs the state when the batter
+    stepped in, runs the runs that scored on the play
+  - game record (FLAG_GAME): starts a game; batter is the home team's
+    name id, pitcher the away team's
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from the_show import PA_OUTCOMES, PITCH_MIX, watch_game_recap
+
+LOG_VERSION = 1
+RECORD = struct.Struct("<IIIBBBBBBBBB3x")
+_HEADER = struct.Struct("<4sHH")
+_INDEX_HEADER = struct.Struct("<4sHHQIIII")
+
+FLAG_BOTTOM = 1
+FLAG_PLAY = 2
+FLAG_GAME = 4
+
+PITCH_CALLS = ["ball", "strike", "foul", "foul_two_strikes", "swinging_strike", "in_play"]
+_CALL_CODE = {call: i for i, call in enumerate(PITCH_CALLS)}
+_OUTCOME_CODE = {outcome: i for i, outcome in enumerate(PA_OUTCOMES)}
+_PITCH_CODE = {pitch: i for i, pitch in enumerate(PITCH_MIX)}
+
+# ----------------------- Writing -----------------------
+
+class GameRecorder:
+    """
+    Packs one game's engine events into log records. name_id maps a player
+    or team name to its id; call start(home, away) first, then hand
+    half(inning, bottom, pitcher) to each half-inning as its listener.
+    The records collect in `data`, ready for EventLog.append.
+    """
+
+    def __init__(self, name_id, game_no=0):
+        self.name_id = name_id
+        self.game_no = game_no
+        self.data = bytearray()
+
+    def start(self, home, away):
+        name_id = self.name_id
+        self.data += RECORD.pack(self.game_no, name_id(home), name_id(away), 0, FLAG_GAME, 0, 0, 0, 0, 0, 0, 0)
+
+    def half(self, inning, bottom, pitcher, start=(0, 0, 0)):
+        """
+        Listener that records one half-inning started by `pitcher` (name, hand),
+        following pitching changes. start is the (bases, outs, runs) the half
+        is picked up at, when that is part-way through.
+        """
+        game, name_id, extend, pack = self.game_no, self.name_id, self.data.extend, RECORD.pack
+        pitcher_id = [name_id(pitcher[0])]
+        flags = FLAG_BOTTOM if bottom else 0
+        # bases, outs and runs before the plate appearance; the last pitch and its count
+        state = [*start, 0, 0, 0]
+
+        def listener(ev):
+            kind = ev["event"]
+            if kind == "pitch":
+                pitch = _PITCH_CODE[ev["pitch"]]
+                state[3:] = pitch, ev["balls"], ev["strikes"]
+                extend(pack(game, name_id(ev["batter"]), pitcher_id[0], inning, flags, _CALL_CODE[ev["call"]],
+                            pitch, ev["balls"], ev["strikes"], state[0], state[1], state[2]))
+            elif kind == "play":
+                extend(pack(game, name_id(ev["batter"]), pitcher_id[0], inning, flags | FLAG_PLAY,
+                            _OUTCOME_CODE[ev["outcome"]], state[3], state[4], state[5],
+                            state[0], state[1], ev["scored"]))
+                state[:3] = ev["bases"], ev["outs"], ev["runs"]
+            elif kind == "pitching_change":
+                pitcher_id[0] = name_id(ev["pitcher"])
+        return listener
+
+class EventLog:
+    """
+    Append-only writer for one log file and its names sidecar. Names are
+    interned as they are first seen; games are numbered on from the last
+    one already in the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names = {name: i for i, name in enumerate(_read_names(path))}
+        self._names_fh = open(path + ".names", "a", encoding="utf-8")
+        self._fh = open(path, "ab")
+        if self._fh.tell() == 0:
+            self._fh.write(_HEADER.pack(b"TSEL", LOG_VERSION, RECORD.size))
+            self._fh.flush()
+            self.next_game = 0
+        else:
+            self.next_game = _last_game(path) + 1
+
+    def name_id(self, name):
+        nid = self.names.get(name)
+        if nid is None:
+            nid = self.names[name] = len(self.names)
+            self._names_fh.write(name.replace("\n", " ") + "\n")
+            self._names_fh.flush()
+        return nid
+
+    def recorder(self):
+        """GameRecorder for the next game in this log."""
+        rec = GameRecorder(self.name_id, self.next_game)
+        self.next_game += 1
+        return rec
+
+    def resume(self, home, away):
+        """
+        GameRecorder for a game picked up part-way: it carries on the log's
+        last game when that is home vs away (the part already played is
+        there), and otherwise starts a new game for what is left of it.
+        """
+        last = _last_game_record(self.path)
+        if last is not None and (last[1], last[2]) == (self.names.get(home), self.names.get(away)):
+            return GameRecorder(self.name_id, last[0])
+        rec = self.recorder()
+        rec.start(home, away)
+        return rec
+
+    def append(self, data):
+        """Write one game's records (a GameRecorder or its bytes)."""
+        if isinstance(data, GameRecorder):
+            data = data.data
+        self._fh.write(data)
+
+    def close(self):
+        self._fh.close()
+        self._names_fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_names(path):
+    try:
+        with open(path + ".names", encoding="utf-8") as fh:
+            return fh.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+def _last_game(path):
+    """Number of the last game in an existing log, or -1 if it has none."""
+    rec = _last_game_record(path)
+    return -1 if rec is None else rec[0]
+
+def _last_game_record(path):
+    """The last game record in a log, found from the end of the (mapped) file, or None."""
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size <= _HEADER.size:
+            return None
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n = (len(mm) - _HEADER.size) // RECORD.size
+            for i in range(n - 1, -1, -1):
+                rec = RECORD.unpack_from(mm, _HEADER.size + i * RECORD.size)
+                if rec[4] & FLAG_GAME:
+                    return rec
+    return None
+
+# ----------------------- Reading -----------------------
+
+class EventLogReader:
+    """
+    Memory-mapped view of a log. records(start, stop) and event(i) decode
+    records; plays(...) answers indexed queries; replay, line_scores and
+    recap rebuild a game.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _HEADER.unpack_from(self._mm)
+        if (magic, version, size) != (b"TSEL", LOG_VERSION, RECORD.size):
+            raise ValueError(f"{path}: not a version {LOG_VERSION} event log")
+        # a record cut short by a crash mid-write is ignored
+        self.n = (len(self._mm) - _HEADER.size) // RECORD.size
+        self.names = _read_names(path)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._index = _load_index(path, self.n) or _build_index(self._mm, self.n, path)
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n
+
+    def view(self, start=0, stop=None):
+        """Records start..stop as a read-only memoryview of the mapped file (no copy)."""
+        stop = self.n if stop is None else stop
+        off = _HEADER.size
+        return memoryview(self._mm)[off + start * RECORD.size:off + stop * RECORD.size]
+
+    def records(self, start=0, stop=None):
+        """Raw record tuples for records start..stop."""
+        return RECORD.iter_unpack(self.view(start, stop))
+
+    def event(self, i):
+        """Record i as an event dict, names and codes decoded."""
+        return self._decode(RECORD.unpack_from(self._mm, _HEADER.size + i * RECORD.size))
+
+    def _decode(self, rec):
+        game, batter, pitcher, inning, flags, code, pitch, balls, strikes, bases, outs, runs = rec
+        names = self.names
+        if flags & FLAG_GAME:
+            return {"event": "game", "game": game, "home": names[batter], "away": names[pitcher]}
+        ev = {"event": "play" if flags & FLAG_PLAY else "pitch", "game": game, "inning": inning,
+              "half": "bottom" if flags & FLAG_BOTTOM else "top",
+              "batter": names[batter], "pitcher": names[pitcher], "pitch": PITCH_MIX[pitch],
+              "balls": balls, "strikes": strikes, "bases": bases, "outs": outs}
+        if flags & FLAG_PLAY:
+            ev["outcome"], ev["scored"] = PA_OUTCOMES[code], runs
+        else:
+            ev["call"], ev["runs"] = PITCH_CALLS[code], runs
+        return ev
+
+    # --- queries ---
+
+    def plays(self, batter=None, pitcher=None, outcome=None, bases=None):
+        """
+        Plate appearances matching every given filter (names, a PA_OUTCOMES
+        entry, a bases mask as in BASE_TRANSITIONS), in log order. The most
+        selective index is bisected; only its hits are decoded.
+        """
+        code = None if outcome is None else _OUTCOME_CODE[outcome]
+        ids = []
+        for name in (batter, pitcher):
+            if name is not None and name not in self.ids:
+                return []
+            ids.append(None if name is None else self.ids[name])
+        batter_id, pitcher_id = ids
+
+        if batter_id is not None:
+            hits = self._lookup("batter", batter_id, code)
+        elif pitcher_id is not None:
+            hits = self._lookup("pitcher", pitcher_id, code)
+        elif bases is not None:
+            hits = self._lookup("bases", bases, code)
+        else:
+            hits = [i for b in range(8) for i in self._lookup("bases", b, code)]
+
+        results = []
+        for i in sorted(hits):
+            rec = RECORD.unpack_from(self._mm, _HEADER.size + i * RECORD.size)
+            if ((pitcher_id is None or rec[2] == pitcher_id) and (bases is None or rec[9] == bases)
+                    and (code is None or rec[5] == code)):
+                results.append(self._decode(rec))
+        return results
+
+    def _lookup(self, name, key, code):
+        keys, positions = self._index[name]
+        if code is None:
+            lo, hi = key << 4, (key + 1) << 4
+        else:
+            lo = key << 4 | code
+            hi = lo + 1
+        return positions[bisect_left(keys, lo):bisect_left(keys, hi)]
+
+    # --- games ---
+
+    def game_starts(self):
+        """Positions of the game records, in log order."""
+        return self._index["starts"]
+
+    def games(self):
+        """(game, home, away) for every game in the log, in log order."""
+        return [(ev["game"], ev["home"], ev["away"]) for ev in map(self.event, self._index["starts"])]
+
+    def _game_span(self, game):
+        keys, positions = self._index["games"]
+        at = bisect_left(keys, game)
+        if at == len(keys) or keys[at] != game:
+            raise KeyError(f"no game {game} in {self.path}")
+        start = positions[at]
+        starts = self._index["starts"]
+        nxt = bisect_left(starts, start + 1)
+        return start, starts[nxt] if nxt < len(starts) else self.n
+
+    def replay(self, game):
+        """The game's events in order, starting with its game record."""
+        start, stop = self._game_span(game)
+        return [self._decode(rec) for rec in self.records(start, stop)]
+
+    def line_scores(self, game):
+        """(home, away, home_line, away_line) rebuilt from the game's plays."""
+        start, stop = self._game_span(game)
+        lines = ([], [])   # away, home
+        home = away = None
+        for rec in self.records(start, stop):
+            inning, flags, runs = rec[3], rec[4], rec[11]
+            if flags & FLAG_GAME:
+                home, away = self.names[rec[1]], self.names[rec[2]]
+            elif flags & FLAG_PLAY:
+                line = lines[flags & FLAG_BOTTOM]
+                while len(line) < inning:
+                    line.append(0)
+                line[inning - 1] += runs
+        return home, away, lines[1], lines[0]
+
+    def recap(self, game, **kwargs):
+        """Play watch_game_recap for a logged game (home team as "my" team)."""
+        home, away, home_line, away_line = self.line_scores(game)
+        watch_game_recap(home, away, home_line, away_line, **kwargs)
+
+# ----------------------- Index -----------------------
+
+_INDEXES = ("batter", "pitcher", "bases", "games")
+
+def _build_index(mm, n, path):
+    """
+    Sorted (key, record) pairs over the play records: batter<<4|outcome,
+    pitcher<<4|outcome and bases<<4|outcome, plus game number -> game record,
+    and the game records' positions in log order. Saved to PATH.idx.
+    """
+    packed = {name: [] for name in _INDEXES}
+    starts = array("I")
+    by_batter, by_pitcher, by_bases = packed["batter"].append, packed["pitcher"].append, packed["bases"].append
+    off = _HEADER.size
+    for i, rec in enumerate(RECORD.iter_unpack(mm[off:off + n * RECORD.size])):
+        flags = rec[4]
+        if flags & FLAG_PLAY:
+            code = rec[5]
+            by_batter((rec[1] << 4 | code) << 32 | i)
+            by_pitcher((rec[2] << 4 | code) << 32 | i)
+            by_bases((rec[9] << 4 | code) << 32 | i)
+        elif flags & FLAG_GAME:
+            packed["games"].append(rec[0] << 32 | i)
+            starts.append(i)
+
+    index = {"starts": starts}
+    for name, entries in packed.items():
+        entries.sort()
+        index[name] = (array("Q", [e >> 32 for e in entries]), array("I", [e & 0xFFFFFFFF for e in entries]))
+    try:
+        _write_index(path + ".idx", n, index)
+    except OSError:
+        pass   # read-only directory: index again next time
+    return index
+
+def _write_index(dest, n, index):
+    tmp = dest + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_INDEX_HEADER.pack(b"TSIX", LOG_VERSION, 0, n, len(index["starts"]),
+                                    *(len(index[name][0]) for name in _INDEXES[:3])))
+        index["starts"].tofile(fh)
+        for name in _INDEXES:
+            keys, positions = index[name]
+            keys.tofile(fh)
+            positions.tofile(fh)
+    os.replace(tmp, dest)
+
+def _load_index(path, n):
+    """The saved index, or None if it is missing or was built for a different length of log."""
+    try:
+        with open(path + ".idx", "rb") as fh:
+            data = fh.read()
+        magic, version, _, indexed, n_games, *counts = _INDEX_HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    if (magic, version, indexed) != (b"TSIX", LOG_VERSION, n):
+        return None
+    counts.append(n_games)
+    if len(data) != _INDEX_HEADER.size + 4 * n_games + 12 * sum(counts):
+        return None
+    off = _INDEX_HEADER.size
+    starts = array("I", data[off:off + 4 * n_games])
+    off += 4 * n_games
+    index = {"starts": starts}
+    for name, count in zip(_INDEXES, counts):
+        keys = array("Q", data[off:off + 8 * count])
+        off += 8 * count
+        index[name] = (keys, array("I", data[off:off + 4 * count]))
+        off += 4 * count
+    return index
+
+# ----------------------- Command Line -----------------------
+
+def _print_event(ev):
+    if ev["event"] == "game":
+        print(f"Game {ev['game']}: {ev['away']} at {ev['home']}")
+        return
+    where = f"{ev['half'][:3]} {ev['inning']}, {ev['outs']} out, bases {ev['bases']:03b}"
+    if ev["event"] == "play":
+        scored = f" ({ev['scored']} R)" if ev["scored"] else ""
+        print(f"  [{where}] {ev['batter']} vs {ev['pitcher']}: {ev['outcome']}{scored}")
+    else:
+        print(f"  [{where}] {ev['pitch']:<8} {ev['call']:<17} {ev['balls']}-{ev['strikes']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and replay The Show event logs.")
+    parser.add_argument("log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("games", help="list the games in the log")
+    plays = sub.add_parser("plays", help="plate appearances matching the filters")
+    plays.add_argument("--batter")
+    plays.add_argument("--pitcher")
+    plays.add_argument("--outcome", choices=PA_OUTCOMES)
+    plays.add_argument("--bases", type=int, choices=range(8), help="runners as a mask: 1=1st, 2=2nd, 4=3rd")
+    for name, text in (("replay", "print a game pitch by pitch"), ("recap", "watch a game's line-score recap")):
+        cmd = sub.add_parser(name, help=text)
+        cmd.add_argument("game", type=int)
+    args = parser.parse_args()
+
+    try:
+        reader = EventLogReader(args.log)
+    except (OSError, ValueError) as exc:
+        print(exc)
+        sys.exit(1)
+    with reader:
+        try:
+            if args.command == "games":
+                for game, home, away in reader.games():
+                    print(f"{game:>6}  {away} at {home}")
+            elif args.command == "plays":
+                found = reader.plays(args.batter, args.pitcher, args.outcome, args.bases)
+                for ev in found:
+                    print(f"game {ev['game']:>5}", end="")
+                    _print_event(ev)
+                print(f"{len(found)} plate appearances")
+            elif args.command == "replay":
+                for ev in reader.replay(args.game):
+                    _print_event(ev)
+            else:
+                reader.recap(args.game)
+        except KeyError as exc:
+            print(exc.args[0])
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
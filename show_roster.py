@@ -0,0 +1,220 @@
+# show_roster.py
+"""
+Roster files for The Show. Hitters and pitchers are stream-parsed from CSV or
+JSON Lines (a plain JSON array works too), validated, and compiled to a
+binary cache in CACHE_DIR that later loads read directly. The cache is
+rebuilt whenever the source file's size or modification time changes.
+
+CSV header (JSON objects use the same keys):
+
+    name,pos,bats,throws,role,spd,obp,pow
+
+pos is 1-9 or a label (P, C, 1B, ... RF). Hitters need bats (L/R/S).
+Pitchers (pos 1) need throws (L/R) and role (starter/reliever/closer).
+spd/obp/pow are 0-100 and optional; missing ratings come from
+PLAYER_OVERRIDES or the positional heuristics, as for the built-in pools.
+A roster needs a hitter at every fielding position (2-9), and pitchers in
+every role if it has any (with none, the built-in staff pitches).
+"""
+import csv
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+from the_show import (
+    CACHE_DIR, POS_ALIASES, POS_LABELS, PLAYER_OVERRIDES, PlayerRegistry, heuristic_ratings,
+)
+
+CACHE_VERSION = 2
+BATS = ("L", "R", "S")
+THROWS = ("L", "R")
+ROLES = ("starter", "reliever", "closer")
+RATINGS = ("spd", "obp", "pow")
+
+_HEADER = struct.Struct("<4sHHQQIII")
+
+# ----------------------- Parsing & Validation -----------------------
+
+def _records(path):
+    """(line number, dict) for each record, read incrementally where the format allows."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as fh:
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+        return
+    with open(path, encoding="utf-8") as fh:
+        first = fh.read(1)
+        while first.isspace():
+            first = fh.read(1)
+        fh.seek(0)
+        if first == "[":
+            for i, row in enumerate(json.load(fh), 1):
+                yield i, row
+            return
+        for line_no, line in enumerate(fh, 1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_no, exc
+
+def _field(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+def parse_roster(path):
+    """
+    Validate a roster file. Returns (hitters, pitchers): hitters as
+    (name, bats, pos, spd, obp, pow) with ratings filled in, pitchers as
+    (name, throws, role). Raises ValueError listing the bad lines, and the
+    positions or pitching roles nobody covers.
+    """
+    hitters, pitchers, errors = [], [], []
+    seen = set()
+    for line_no, row in _records(path):
+        if not isinstance(row, dict):
+            errors.append(f"{path}:{line_no}: not a record ({row})")
+            continue
+        name = _field(row, "name")
+        pos = POS_ALIASES.get(_field(row, "pos").lower())
+        if not name or "\0" in name:
+            errors.append(f"{path}:{line_no}: missing or bad name")
+            continue
+        if pos is None:
+            errors.append(f"{path}:{line_no}: {name}: bad position {_field(row, 'pos')!r}")
+            continue
+
+        if pos == "1":
+            throws, role = _field(row, "throws").upper(), _field(row, "role").lower()
+            if throws not in THROWS or role not in ROLES:
+                errors.append(f"{path}:{line_no}: {name}: pitchers need throws L/R and role starter/reliever/closer")
+                continue
+            pitchers.append((name, throws, role))
+            continue
+
+        bats = _field(row, "bats").upper()
+        if bats not in BATS:
+            errors.append(f"{path}:{line_no}: {name}: bats must be L, R or S")
+            continue
+        if name in seen:
+            errors.append(f"{path}:{line_no}: duplicate hitter {name}")
+            continue
+        ratings = dict(PLAYER_OVERRIDES.get(name) or heuristic_ratings(name, pos, bats))
+        try:
+            for key in RATINGS:
+                raw = _field(row, key)
+                if raw:
+                    ratings[key] = int(raw)
+                    if not 0 <= ratings[key] <= 100:
+                        raise ValueError(key)
+        except ValueError:
+            errors.append(f"{path}:{line_no}: {name}: {key} must be a whole number 0-100")
+            continue
+        seen.add(name)
+        hitters.append((name, bats, pos, ratings["spd"], ratings["obp"], ratings["pow"]))
+
+    covered = {h[2] for h in hitters}
+    missing = [POS_LABELS[pos] for pos in "23456789" if pos not in covered]
+    if missing:
+        errors.append(f"{path}: no hitters at {', '.join(missing)} (every position 2-9 needs one)")
+    if pitchers:
+        missing = [r for r in ROLES if not any(p[2] == r for p in pitchers)]
+        if missing:
+            errors.append(f"{path}: no {', '.join(missing)} among the pitchers")
+    if errors:
+        more = f"\n... and {len(errors) - 10} more" if len(errors) > 10 else ""
+        raise ValueError("bad roster file:\n" + "\n".join(errors[:10]) + more)
+    return hitters, pitchers
+
+# ----------------------- Compiled Cache -----------------------
+
+def cache_path(path):
+    key = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"roster-{key}.bin")
+
+def _write_cache(dest, stat, hitters, pitchers):
+    cols = {key: array("B") for key in ("pos", "bats", "spd", "obp", "pow", "throws", "role")}
+    for name, bats, pos, spd, obp, powr in hitters:
+        for key, value in (("pos", int(pos)), ("bats", BATS.index(bats)), ("spd", spd), ("obp", obp), ("pow", powr)):
+            cols[key].append(value)
+    for name, throws, role in pitchers:
+        cols["throws"].append(THROWS.index(throws))
+        cols["role"].append(ROLES.index(role))
+    names = "\0".join([h[0] for h in hitters] + [p[0] for p in pitchers]).encode("utf-8")
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = dest + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(b"TSRS", CACHE_VERSION, 0, stat.st_size, stat.st_mtime_ns,
+                              len(hitters), len(pitchers), len(names)))
+        for key in ("pos", "bats", "spd", "obp", "pow", "throws", "role"):
+            cols[key].tofile(fh)
+        fh.write(names)
+    os.replace(tmp, dest)
+
+def _read_cache(src, stat):
+    """(hitter columns, pitchers) from a compiled cache, or None if it is stale."""
+    with open(src, "rb") as fh:
+        data = fh.read()
+    magic, version, _, size, mtime_ns, n_h, n_p, n_names = _HEADER.unpack_from(data)
+    if (magic, version, size, mtime_ns) != (b"TSRS", CACHE_VERSION, stat.st_size, stat.st_mtime_ns):
+        return None
+    off = _HEADER.size
+    if len(data) != off + 5 * n_h + 2 * n_p + n_names:
+        return None
+    view = memoryview(data)
+    pos, bats, spd, obp, powr = (view[off + i * n_h:off + (i + 1) * n_h] for i in range(5))
+    off += 5 * n_h
+    throws, role = view[off:off + n_p], view[off + n_p:off + 2 * n_p]
+    names = bytes(view[off + 2 * n_p:]).decode("utf-8").split("\0") if n_h + n_p else []
+
+    pos_labels = [str(p) for p in range(10)]
+    hitters = {"names": names[:n_h], "bats": [BATS[b] for b in bats], "pos": [pos_labels[p] for p in pos],
+               "spd": spd, "obp": obp, "pow": powr}
+    pitchers = list(zip(names[n_h:], [THROWS[t] for t in throws], [ROLES[r] for r in role]))
+    return hitters, pitchers
+
+def load_roster(path):
+    """
+    Load a roster file as (PlayerRegistry, pitchers), going through the
+    compiled cache when it matches the file's size and modification time.
+    pitchers is a PITCHERS-style list (empty if the file has none).
+    """
+    stat = os.stat(path)
+    dest = cache_path(path)
+    try:
+        cached = _read_cache(dest, stat)
+    except (OSError, struct.error, UnicodeDecodeError, IndexError):
+        cached = None
+    if cached is not None:
+        cols, pitchers = cached
+        registry = PlayerRegistry.from_columns(cols["names"], cols["bats"], cols["pos"],
+                                               cols["spd"], cols["obp"], cols["pow"])
+        return registry, pitchers
+
+    hitters, pitchers = parse_roster(path)
+    try:
+        _write_cache(dest, stat, hitters, pitchers)
+    except OSError:
+        pass  # read-only cache dir: parse again next time
+    registry = PlayerRegistry()
+    registry.extend(hitters)
+    return registry, pitchers
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python show_roster.py ROSTER.csv|ROSTER.jsonl")
+        sys.exit(2)
+    try:
+        registry, pitchers = load_roster(sys.argv[1])
+    except (OSError, ValueError) as exc:
+        print(exc)
+        sys.exit(1)
+    print(f"{len(registry)} hitters, {len(pitchers)} pitchers -> {cache_path(sys.argv[1])}")
+
+if __name__ == "__main__":
+    main()
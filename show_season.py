@@ -0,0 +1,430 @@
+# show_season.py
+"""
+Season simulator for The Show: full headless games spread over a process
+pool. Every game draws from its own random.Random seeded from the season
+seed and the game number, so results do not depend on the worker count.
+
+    python show_season.py --teams 30 --games 162 --seed 7
+    python show_season.py --log season.log    # every pitch to a binary event log
+    python show_season.py --stats season      # season.batting.csv, ... (needs numpy)
+    python show_season.py --shared            # workers write results to shared memory (needs numpy)
+    python show_season.py --bullpen win       # pitching changes by show_bullpen (needs numpy)
+    python show_season.py --fast              # a draw per plate appearance, not per pitch
+"""
+import argparse
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from show_roster import load_roster
+from show_log import EventLog, GameRecorder
+from the_show import PITCHERS, REGISTRY, build_batting_order_realistic, simulate_game
+
+# ----------------------- League -----------------------
+
+def game_rng(seed, game_no):
+    """Independent, reproducible stream for one game of a season."""
+    return random.Random(f"the_show/{seed}/{game_no}")
+
+def build_team(name, rng, registry=REGISTRY):
+    """One hitter per position from the registry, in a realistic batting order."""
+    defense = {"1": None}
+    batter_sides = {}
+    for pos in ["2","3","4","5","6","7","8","9"]:
+        player = registry[rng.choice(registry.ids_by_pos[pos])]
+        defense[pos] = player.name
+        batter_sides[player.name] = player.bats
+    lineup = build_batting_order_realistic(defense, None, 9, batter_sides, registry)
+    return {"name": name, "lineup": lineup, "batter_sides": batter_sides}
+
+def build_league(n_teams=30, seed=0, registry=REGISTRY):
+    rng = random.Random(f"the_show/league/{seed}")
+    return [build_team(f"Team {i + 1}", rng, registry) for i in range(n_teams)]
+
+def season_schedule(n_teams, games_per_team=162):
+    """
+    Round-robin rounds (circle method) repeated until every team has played
+    games_per_team games, swapping home and away on each pass. With an odd
+    number of teams one sits out each round, so the rounds go on past
+    games_per_team, and a pairing is dropped once either team has its
+    games (if n_teams and games_per_team are both odd, one team ends a game
+    short: the games can't come out even).
+    Returns a list of (home, away) team indexes.
+    """
+    if n_teams < 2:
+        return []
+    slots = list(range(n_teams)) + ([None] if n_teams % 2 else [])
+    n = len(slots)
+    played = [0] * n_teams
+    games = []
+    rnd = idle = 0
+    while min(played) < games_per_team and idle < n - 1:
+        turn = rnd % (n - 1)
+        order = [slots[0]] + slots[1:][turn:] + slots[1:][:turn]
+        flip = (rnd // (n - 1)) % 2
+        scheduled = len(games)
+        for i in range(n // 2):
+            a, b = order[i], order[n - 1 - i]
+            if a is None or b is None or played[a] >= games_per_team or played[b] >= games_per_team:
+                continue
+            games.append((b, a) if flip else (a, b))
+            played[a] += 1
+            played[b] += 1
+        idle = 0 if len(games) > scheduled else idle + 1
+        rnd += 1
+    return games
+
+# ----------------------- Workers -----------------------
+
+_TEAMS = None
+_PITCHERS = None
+_NAME_IDS = None
+_BULLPEN = None
+_FAST = False
+
+def _bullpen(objective):
+    """simulate_game's bullpen= for a show_bullpen objective, or None for the fixed schedule."""
+    if not objective:
+        return None
+    from functools import partial
+    from show_bullpen import BullpenManager
+    return partial(BullpenManager, objective=objective)
+
+def _init_worker(teams, pitchers=None, name_ids=None, bullpen=None, fast=False):
+    global _TEAMS, _PITCHERS, _NAME_IDS, _BULLPEN, _FAST
+    _TEAMS = teams
+    _PITCHERS = pitchers
+    _NAME_IDS = name_ids
+    _BULLPEN = _bullpen(bullpen)
+    _FAST = fast
+
+def _play_game(job):
+    seed, game_no, home, away = job
+    result = simulate_game(_TEAMS[home], _TEAMS[away], rng=game_rng(seed, game_no), pitchers=_PITCHERS,
+                           bullpen=_BULLPEN, fast=_FAST)
+    return (home, away, result["home_line"], result["away_line"],
+            result["home_hits"], result["away_hits"])
+
+def _play_logged_game(job):
+    """_play_game plus the game's event-log records (names already interned by the parent)."""
+    seed, game_no, home, away, log_game = job
+    recorder = GameRecorder(_NAME_IDS.__getitem__, log_game)
+    recorder.start(_TEAMS[home]["name"], _TEAMS[away]["name"])
+    result = simulate_game(_TEAMS[home], _TEAMS[away], rng=game_rng(seed, game_no), pitchers=_PITCHERS,
+                           recorder=recorder, bullpen=_BULLPEN)
+    return (home, away, result["home_line"], result["away_line"],
+            result["home_hits"], result["away_hits"]), bytes(recorder.data)
+
+def _init_shared_worker(teams, pitchers, shm_name, n_games, bullpen=None, fast=False):
+    global _TEAMS, _PITCHERS, _SHARED, _BULLPEN, _FAST
+    _TEAMS = teams
+    _PITCHERS = pitchers
+    _BULLPEN = _bullpen(bullpen)
+    _FAST = fast
+    _SHARED = SeasonArrays(n_games, shm_name)
+
+def _play_game_range(job):
+    """Play games lo..hi-1 straight into the shared SeasonArrays; only the count goes back."""
+    seed, lo, hi = job
+    for game_no in range(lo, hi):
+        home, away = _SHARED.teams(game_no)
+        result = simulate_game(_TEAMS[home], _TEAMS[away], rng=game_rng(seed, game_no), pitchers=_PITCHERS,
+                               bullpen=_BULLPEN, fast=_FAST)
+        _SHARED.put(game_no, result)
+    return hi - lo
+
+def _play_games_with_stats(jobs, flush=1 << 20):
+    """Play a run of games into a worker-local StatBook. Returns (games, book)."""
+    from show_stats import StatBook
+    book, games, pending = StatBook(), [], bytearray()
+    for seed, game_no, home, away in jobs:
+        recorder = book.recorder(game_no)
+        result = simulate_game(_TEAMS[home], _TEAMS[away], rng=game_rng(seed, game_no), pitchers=_PITCHERS,
+                               recorder=recorder, bullpen=_BULLPEN)
+        games.append((home, away, result["home_line"], result["away_line"],
+                      result["home_hits"], result["away_hits"]))
+        pending += recorder.data
+        if len(pending) >= flush:
+            book.add(pending)
+            pending.clear()
+    book.add(pending)
+    return games, book
+
+# ----------------------- Shared-Memory Results -----------------------
+
+LINE_INNINGS = 24   # innings kept per line score; runs in any later inning go in the last one
+
+# One game: home, away, innings, score[2], hits[2], line[2][LINE_INNINGS], home first
+# throughout. season_dtype() is the same layout as a NumPy dtype.
+GAME_ROW = struct.Struct(f"<hhB2h2h{2 * LINE_INNINGS}B")
+_GAME_TEAMS = struct.Struct("<hh")
+
+_SHARED = None
+
+def season_dtype():
+    import numpy as np
+    return np.dtype([("home", "<i2"), ("away", "<i2"), ("innings", "u1"), ("score", "<i2", 2),
+                     ("hits", "<i2", 2), ("line", "u1", (2, LINE_INNINGS))])
+
+class SeasonArrays:
+    """
+    One GAME_ROW per game in a multiprocessing.shared_memory block. The
+    creator (name=None) owns the block, sees it as a season_dtype array in
+    `games` (needs numpy) and unlinks it on close(). Workers attach by name
+    and pack their rows straight into it, so no results are pickled and
+    workers never import numpy.
+    """
+
+    def __init__(self, n_games, name=None):
+        from multiprocessing import shared_memory
+        self.owner = name is None
+        self.games = None
+        if self.owner:
+            import numpy as np
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, n_games * GAME_ROW.size))
+            self.games = np.ndarray(n_games, dtype=season_dtype(), buffer=self.shm.buf)
+            self.games.fill(0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def teams(self, game_no):
+        """(home, away) team indexes of a game."""
+        return _GAME_TEAMS.unpack_from(self.shm.buf, game_no * GAME_ROW.size)
+
+    def put(self, game_no, result):
+        """Write a simulate_game result into the game's row."""
+        lines = []
+        for key in ("home_line", "away_line"):
+            line = result[key]
+            if len(line) > LINE_INNINGS:
+                line = line[:LINE_INNINGS - 1] + [sum(line[LINE_INNINGS - 1:])]
+            lines += line + [0] * (LINE_INNINGS - len(line))
+        GAME_ROW.pack_into(self.shm.buf, game_no * GAME_ROW.size, *self.teams(game_no), result["innings"],
+                           sum(result["home_line"]), sum(result["away_line"]),
+                           result["home_hits"], result["away_hits"], *lines)
+
+    def close(self):
+        """Drop the view and the mapping (and the block itself, for the creator)."""
+        self.games = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def standings_from_arrays(teams, games):
+    """standings() reduced straight from a season_dtype array."""
+    import numpy as np
+    n = len(teams)
+    home, away = games["home"].astype(np.intp), games["away"].astype(np.intp)
+    score, hits = games["score"].astype(np.int64), games["hits"].astype(np.int64)
+    home_won = score[:, 0] > score[:, 1]
+
+    def both(home_values, away_values):
+        return (np.bincount(home, home_values, minlength=n) + np.bincount(away, away_values, minlength=n)).astype(np.int64)
+
+    ones = np.ones(len(games))
+    cols = {"G": both(ones, ones), "W": both(home_won, ~home_won), "L": both(~home_won, home_won),
+            "RS": both(score[:, 0], score[:, 1]), "RA": both(score[:, 1], score[:, 0]),
+            "H": both(hits[:, 0], hits[:, 1]), "HA": both(hits[:, 1], hits[:, 0])}
+    rows = [{"team": t["name"], **{c: int(v[i]) for c, v in cols.items()}} for i, t in enumerate(teams)]
+    return sorted(rows, key=lambda r: (-r["W"], -(r["RS"] - r["RA"]), r["team"]))
+
+def _simulate_shared_season(teams, jobs, workers, chunksize, pitchers, bullpen=None, fast=False):
+    """
+    Workers fill one shared SeasonArrays in runs of `chunksize` games; the
+    parent reduces the standings from it in place and returns one copy of
+    the rows as "games".
+    """
+    seed = jobs[0][0] if jobs else 0
+    arrays = SeasonArrays(len(jobs))
+    try:
+        arrays.games["home"] = [job[2] for job in jobs]
+        arrays.games["away"] = [job[3] for job in jobs]
+        ranges = [(seed, lo, min(len(jobs), lo + chunksize)) for lo in range(0, len(jobs), chunksize)]
+        if workers == 1:
+            _init_shared_worker(teams, pitchers, arrays.name, len(jobs), bullpen, fast)
+            try:
+                for job in ranges:
+                    _play_game_range(job)
+            finally:
+                _SHARED.close()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_shared_worker,
+                                     initargs=(teams, pitchers, arrays.name, len(jobs), bullpen, fast)) as pool:
+                for _ in pool.map(_play_game_range, ranges):
+                    pass
+        return {"standings": standings_from_arrays(teams, arrays.games), "games": arrays.games.copy()}
+    finally:
+        arrays.close()
+
+# ----------------------- Season -----------------------
+
+def simulate_season(teams=None, games_per_team=162, seed=0, workers=None, chunksize=64, pitchers=None,
+                    log_path=None, stats=None, shared=False, bullpen=None, fast=False):
+    """
+    Play a season and return {"standings": [...], "games": [...]}.
+    teams defaults to build_league(30, seed); staffs come from `pitchers`
+    (default PITCHERS); workers=1 plays in this process.
+    Each game is (home, away, home_line, away_line, home_hits, away_hits).
+    With log_path, every pitch and play is appended to that event log
+    (show_log.py), games in schedule order. stats, a show_stats.StatBook,
+    collects every player's batting and pitching line. shared=True has
+    workers write into a SeasonArrays block instead of returning games, and
+    "games" is then a season_dtype array (needs numpy); it cannot be combined
+    with log_path or stats (ValueError). bullpen, a
+    show_bullpen objective ("win" or "runs"), has its BullpenManager make
+    both sides' pitching changes in place of the fixed schedule. fast=True
+    plays simulate_game's fast mode, whole plate appearances at a time; with
+    no pitches to log or manage, it cannot be combined with log_path, stats
+    or bullpen (ValueError).
+    """
+    if shared and (log_path or stats is not None):
+        raise ValueError("shared=True cannot be combined with log_path or stats")
+    if fast and (log_path or stats is not None or bullpen):
+        raise ValueError("fast=True cannot be combined with log_path, stats or bullpen")
+    if teams is None:
+        teams = build_league(30, seed)
+    jobs = [(seed, game_no, home, away)
+            for game_no, (home, away) in enumerate(season_schedule(len(teams), games_per_team))]
+    if log_path:
+        return _simulate_logged_season(teams, jobs, workers, chunksize, pitchers, log_path, stats, bullpen=bullpen)
+    if stats is not None:
+        return _simulate_season_with_stats(teams, jobs, workers, chunksize, pitchers, stats, bullpen)
+    if shared:
+        return _simulate_shared_season(teams, jobs, workers, chunksize, pitchers, bullpen, fast)
+
+    if workers == 1:
+        _init_worker(teams, pitchers, bullpen=bullpen, fast=fast)
+        games = [_play_game(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(teams, pitchers, None, bullpen, fast)) as pool:
+            games = list(pool.map(_play_game, jobs, chunksize=chunksize))
+
+    return {"standings": standings(teams, games), "games": games}
+
+def _simulate_season_with_stats(teams, jobs, workers, chunksize, pitchers, stats, bullpen=None):
+    """Games go out in runs of `chunksize`; each comes back with its own StatBook to merge."""
+    runs = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+    games = []
+    if workers == 1:
+        _init_worker(teams, pitchers, bullpen=bullpen)
+        for part, book in map(_play_games_with_stats, runs):
+            games += part
+            stats.merge(book)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(teams, pitchers, None, bullpen)) as pool:
+            for part, book in pool.map(_play_games_with_stats, runs):
+                games += part
+                stats.merge(book)
+    return {"standings": standings(teams, games), "games": games}
+
+def _simulate_logged_season(teams, jobs, workers, chunksize, pitchers, log_path, stats=None, flush=1 << 20,
+                            bullpen=None):
+    with EventLog(log_path) as log:
+        # intern every name up front so workers share one fixed table
+        for team in teams:
+            log.name_id(team["name"])
+            for name in team["lineup"]:
+                log.name_id(name)
+        for name, *_ in pitchers or PITCHERS:
+            log.name_id(name)
+        first = log.next_game
+        log.next_game += len(jobs)
+        jobs = [job + (first + i,) for i, job in enumerate(jobs)]
+
+        games = []
+        if workers == 1:
+            _init_worker(teams, pitchers, log.names, bullpen)
+            results = map(_play_logged_game, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(teams, pitchers, log.names, bullpen))
+            results = pool.map(_play_logged_game, jobs, chunksize=chunksize)
+        names = list(log.names)
+        pending = bytearray()
+        try:
+            for game, data in results:
+                games.append(game)
+                log.append(data)
+                if stats is not None:
+                    pending += data
+                    if len(pending) >= flush:
+                        stats.add(pending, names)
+                        pending.clear()
+        finally:
+            if workers != 1:
+                pool.shutdown()
+        if stats is not None:
+            stats.add(pending, names)
+    return {"standings": standings(teams, games), "games": games}
+
+def standings(teams, games):
+    """Team lines (G, W, L, RS, RA, H, HA), best record first. Games never end tied."""
+    rows = [{"team": t["name"], "G": 0, "W": 0, "L": 0, "RS": 0, "RA": 0, "H": 0, "HA": 0}
+            for t in teams]
+    for home, away, home_line, away_line, home_hits, away_hits in games:
+        hr, ar = sum(home_line), sum(away_line)
+        for me, rs, ra, h, ha in ((home, hr, ar, home_hits, away_hits), (away, ar, hr, away_hits, home_hits)):
+            row = rows[me]
+            row["G"] += 1
+            row["RS"] += rs; row["RA"] += ra
+            row["H"] += h;   row["HA"] += ha
+            row["W" if rs > ra else "L"] += 1
+    return sorted(rows, key=lambda r: (-r["W"], -(r["RS"] - r["RA"]), r["team"]))
+
+def print_standings(rows):
+    print(f"{'Team':<10} {'G':>4} {'W':>4} {'L':>4} {'RS':>5} {'RA':>5} {'H':>5} {'HA':>5}")
+    for r in rows:
+        print(f"{r['team']:<10} {r['G']:>4} {r['W']:>4} {r['L']:>4} {r['RS']:>5} {r['RA']:>5} {r['H']:>5} {r['HA']:>5}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a season of The Show.")
+    parser.add_argument("--teams", type=int, default=30)
+    parser.add_argument("--games", type=int, default=162, help="games per team")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--roster", help="roster file (CSV or JSON Lines) in place of the built-in pools")
+    parser.add_argument("--log", metavar="PATH", help="append every pitch and play to this event log")
+    parser.add_argument("--stats", metavar="PREFIX",
+                        help="write player lines and run distributions to PREFIX.*.csv/.npy (needs numpy)")
+    parser.add_argument("--shared", action="store_true",
+                        help="collect results in shared memory instead of pickling each game (needs numpy)")
+    parser.add_argument("--bullpen", choices=("win", "runs"),
+                        help="make pitching changes with show_bullpen for this objective (needs numpy)")
+    parser.add_argument("--fast", action="store_true",
+                        help="draw whole plate appearances instead of pitches (several times faster)")
+    args = parser.parse_args()
+    if args.shared and (args.log or args.stats):
+        parser.error("--shared cannot be combined with --log or --stats")
+    if args.fast and (args.log or args.stats or args.bullpen):
+        parser.error("--fast plays no pitches: it cannot be combined with --log, --stats or --bullpen")
+
+    registry, pitchers = REGISTRY, None
+    if args.roster:
+        try:
+            registry, pitchers = load_roster(args.roster)
+        except (OSError, ValueError) as exc:
+            parser.error(f"--roster: {exc}")
+    stats = None
+    if args.stats:
+        from show_stats import StatBook
+        stats = StatBook()
+    start = time.perf_counter()
+    season = simulate_season(build_league(args.teams, args.seed, registry), args.games, args.seed,
+                             args.workers, pitchers=pitchers or None, log_path=args.log, stats=stats,
+                             shared=args.shared, bullpen=args.bullpen, fast=args.fast)
+    print_standings(season["standings"])
+    print(f"\n{len(season['games'])} games in {time.perf_counter() - start:.2f}s")
+    if stats is not None:
+        stats.to_csv(args.stats)
+        stats.to_npy(args.stats)
+        print(f"player lines saved to {args.stats}.*")
+
+if __name__ == "__main__":
+    main()
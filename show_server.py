@@ -0,0 +1,144 @@
+# show_server.py
+"""
+Game server for The Show: every connection plays its own game over TCP or a
+Unix socket, all in one asyncio process.
+
+    python show_server.py --port 7007              # then: nc localhost 7007
+    python show_server.py --unix /tmp/the_show.sock
+
+Each session is the_show.main_script driven by the connection: prompts go
+out on the socket and every answer is an awaited line read. Sessions keep
+everything in the suspended script (own random stream, no module state),
+so an idle player costs about 15 KB at the first pitch, plus some 300
+bytes for every pitch kept for undo (--undo-depth, 200 by default: about
+50 KB late in a game, 20 KB with --undo-depth 20). Slow steps the script hands back,
+like the lineup optimizer, run in worker threads, and the recap animates
+on the event loop (Enter skips it).
+"""
+import argparse
+import asyncio
+import random
+
+from show_roster import load_roster
+from the_show import PITCHERS, REGISTRY, UNDO_DEPTH, expectancy_tables, main_script
+
+LINE_LIMIT = 1024   # longest answer accepted, in bytes
+
+class GameServer:
+    """Accepts connections and plays one game per connection."""
+
+    def __init__(self, registry=REGISTRY, pitchers=PITCHERS, max_sessions=10000, idle_timeout=None,
+                 undo_depth=UNDO_DEPTH):
+        self.registry = registry
+        self.pitchers = pitchers
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.undo_depth = undo_depth
+        self.sessions = 0
+
+    async def handle(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            writer.write(b"The Show is full. Try again soon.\n")
+            await _close(writer)
+            return
+        self.sessions += 1
+        try:
+            await play_session(reader, writer, self.registry, self.pitchers, self.idle_timeout, self.undo_depth)
+        finally:
+            self.sessions -= 1
+            await _close(writer)
+
+async def play_session(reader, writer, registry=REGISTRY, pitchers=PITCHERS, idle_timeout=None,
+                       undo_depth=UNDO_DEPTH):
+    """
+    Play one game over a stream pair. Returns when the game ends or the
+    player leaves. The player can undo back through undo_depth pitches.
+    """
+    def out(*args, sep=" ", end="\n"):
+        writer.write((sep.join(map(str, args)) + end).encode("utf-8"))
+
+    script = main_script(registry, pitchers, rng=random.Random(), out=out, skip_hint="press Enter to skip",
+                         undo_depth=undo_depth)
+    try:
+        prompt = next(script)
+        while True:
+            if callable(prompt):
+                answer = await asyncio.to_thread(prompt)
+            elif isinstance(prompt, float):
+                # a recap frame tick: a line from the player during the pause skips ahead
+                await writer.drain()
+                try:
+                    line = await asyncio.wait_for(reader.readline(), prompt)
+                except asyncio.TimeoutError:
+                    answer = False
+                except ValueError:
+                    return
+                else:
+                    if not line:
+                        return
+                    answer = True
+            else:
+                writer.write(prompt.encode("utf-8"))
+                await writer.drain()
+                try:
+                    line = await asyncio.wait_for(reader.readline(), idle_timeout)
+                except (asyncio.TimeoutError, ValueError):   # idle too long, or line over LINE_LIMIT
+                    return
+                if not line:
+                    return   # player hung up
+                answer = line.decode("utf-8", "replace").rstrip("\r\n")
+            prompt = script.send(answer)
+    except StopIteration:
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        script.close()
+
+async def _close(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+async def serve(server, host="127.0.0.1", port=7007, unix_path=None):
+    # build or load the shared win-probability tables before anyone connects
+    await asyncio.to_thread(expectancy_tables)
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path, limit=LINE_LIMIT)
+        where = unix_path
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, limit=LINE_LIMIT)
+        where = ", ".join(str(sock.getsockname()[:2]) for sock in listener.sockets)
+    print(f"The Show is serving on {where}")
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve games of The Show over TCP or a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7007)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--roster", help="roster file (CSV or JSON Lines) in place of the built-in pools")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--idle-timeout", type=float, default=None, help="drop players idle this many seconds")
+    parser.add_argument("--undo-depth", type=int, default=UNDO_DEPTH,
+                        help="pitches each player can undo (each kept pitch costs about 300 bytes)")
+    args = parser.parse_args()
+
+    registry, pitchers = REGISTRY, PITCHERS
+    if args.roster:
+        try:
+            registry, roster_pitchers = load_roster(args.roster)
+        except (OSError, ValueError) as exc:
+            parser.error(f"--roster: {exc}")
+        pitchers = roster_pitchers or PITCHERS
+    server = GameServer(registry, pitchers, args.max_sessions, args.idle_timeout, args.undo_depth)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# show_stats.py
+"""
+Season-scale stat lines for The Show: batting and pitching counts kept as
+NumPy columns indexed by player id, updated in bulk from event-log records
+(show_log.py), whether they come from a live GameRecorder or a log file.
+Requires numpy.
+
+Memory depends only on the number of players: each update folds a batch of
+records into the columns and the bounded run histograms, then lets it go.
+Books from parallel workers merge by name, so ids need not agree.
+
+    python show_stats.py season.log --out season    # season.batting.csv, ...
+"""
+import argparse
+import csv
+
+import numpy as np
+
+from show_batch import OUT, _OUTS
+from show_log import FLAG_GAME, FLAG_PLAY, GameRecorder, EventLogReader
+from the_show import PA_OUTCOMES
+
+# Event-log records as a NumPy dtype (show_log.RECORD)
+LOG_DTYPE = np.dtype([
+    ("game", "<u4"), ("batter", "<u4"), ("pitcher", "<u4"), ("inning", "u1"), ("flags", "u1"),
+    ("code", "u1"), ("pitch", "u1"), ("balls", "u1"), ("strikes", "u1"), ("bases", "u1"),
+    ("outs", "u1"), ("runs", "u1"), ("pad", "V3"),
+])
+
+MAX_HALF_RUNS = 15   # last histogram bin holds this many runs or more
+MAX_GAME_RUNS = 30
+
+# Count columns per player: one per PA outcome, then runs (RBI for batters,
+# runs allowed for pitchers), then pitches
+_RUNS_COL = len(PA_OUTCOMES)
+_PITCHES_COL = _RUNS_COL + 1
+_WIDTH = _PITCHES_COL + 1
+
+def _outcome_mask(*names):
+    return np.isin(np.arange(_WIDTH), [OUT[n] for n in names])
+
+_HIT = _outcome_mask("ground_single", "single", "double", "triple", "homer")
+_K = _outcome_mask("k_looking", "k_swinging")
+
+BATTING_COLUMNS = ("PA", "AB", "H", "2B", "3B", "HR", "BB", "K", "RBI", "P")
+PITCHING_COLUMNS = ("BF", "OUTS", "H", "HR", "BB", "K", "R", "P")
+
+class StatBook:
+    """
+    Batting and pitching counts for every player seen, plus histograms of
+    runs per half-inning and per team-game. add() takes records in whole
+    games; merge() folds in another book.
+    """
+
+    def __init__(self, capacity=1024):
+        self.names = []
+        self.ids = {}
+        self.batting = np.zeros((capacity, _WIDTH), dtype=np.int64)
+        self.pitching = np.zeros((capacity, _WIDTH), dtype=np.int64)
+        self.half_runs = np.zeros(MAX_HALF_RUNS + 1, dtype=np.int64)
+        self.game_runs = np.zeros(MAX_GAME_RUNS + 1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        """This book's id for a player, added on first sight."""
+        pid = self.ids.get(name)
+        if pid is None:
+            pid = self.ids[name] = len(self.names)
+            self.names.append(name)
+            if pid == len(self.batting):
+                self.batting = np.concatenate([self.batting, np.zeros_like(self.batting)])
+                self.pitching = np.concatenate([self.pitching, np.zeros_like(self.pitching)])
+        return pid
+
+    def recorder(self, game_no=0):
+        """GameRecorder whose records use this book's ids (add() it when the game is over)."""
+        return GameRecorder(self.id, game_no)
+
+    def _id_map(self, names):
+        return np.array([self.id(name) for name in names], dtype=np.intp)
+
+    # --- updates ---
+
+    def add(self, records, names=None):
+        """
+        Fold in event-log records: a LOG_DTYPE array, raw record bytes, or a
+        GameRecorder. names lists the records' id -> name (default: the ids
+        are this book's own). Batches must hold whole games.
+        """
+        if isinstance(records, GameRecorder):
+            records = records.data
+        if not isinstance(records, np.ndarray):
+            records = np.frombuffer(records, dtype=LOG_DTYPE)
+        if not records.size:
+            return
+        remap = None if names is None else self._id_map(names)
+        flags = records["flags"]
+        plays = records[(flags & FLAG_PLAY) != 0]
+        pitches = records[(flags & (FLAG_PLAY | FLAG_GAME)) == 0]
+
+        batter, pitcher = plays["batter"].astype(np.intp), plays["pitcher"].astype(np.intp)
+        seen_b, seen_p = pitches["batter"].astype(np.intp), pitches["pitcher"].astype(np.intp)
+        if remap is not None:
+            batter, pitcher, seen_b, seen_p = remap[batter], remap[pitcher], remap[seen_b], remap[seen_p]
+        code = plays["code"].astype(np.intp)
+        runs = plays["runs"].astype(np.int64)
+        rbi = np.where(code == OUT["double_play"], 0, runs)   # no RBI on a double play
+
+        self._count(self.batting, batter, code, rbi, seen_b)
+        self._count(self.pitching, pitcher, code, runs, seen_p)
+        self._count_runs(plays, runs)
+
+    def _count(self, table, player, code, runs, seen):
+        cells = table.size
+        idx = np.concatenate([player * _WIDTH + code, player * _WIDTH + _RUNS_COL, seen * _WIDTH + _PITCHES_COL])
+        weights = np.concatenate([np.ones(len(code)), runs, np.ones(len(seen))])
+        table += np.bincount(idx, weights, minlength=cells).astype(np.int64).reshape(table.shape)
+
+    def _count_runs(self, plays, runs):
+        """Histogram the runs of each half-inning and each team-game in the batch."""
+        side = (plays["game"].astype(np.int64) << 1) | (plays["flags"] & 1)
+        half = (side << 8) | plays["inning"]
+        for key, hist, top in ((half, self.half_runs, MAX_HALF_RUNS), (side, self.game_runs, MAX_GAME_RUNS)):
+            _, group = np.unique(key, return_inverse=True)
+            totals = np.bincount(group, runs).astype(np.int64)
+            hist += np.bincount(np.minimum(totals, top), minlength=top + 1)
+
+    def add_log(self, reader, batch=1 << 18):
+        """Fold in a whole EventLogReader, about `batch` records at a time, split at game boundaries."""
+        starts = reader.game_starts()
+        start = 0
+        while start < reader.n:
+            at = np.searchsorted(starts, start + batch)
+            stop = int(starts[at]) if at < len(starts) else reader.n
+            self.add(np.frombuffer(reader.view(start, stop), dtype=LOG_DTYPE), reader.names)
+            start = stop
+
+    def merge(self, other):
+        """Add another book's counts (e.g. from a worker) into this one."""
+        if len(other):
+            remap = self._id_map(other.names)
+            self.batting[remap] += other.batting[:len(other)]
+            self.pitching[remap] += other.pitching[:len(other)]
+        self.half_runs += other.half_runs
+        self.game_runs += other.game_runs
+        return self
+
+    # --- lines ---
+
+    def batting_lines(self):
+        """{column: array} for BATTING_COLUMNS, one entry per player in `names` order."""
+        t = self.batting[:len(self)]
+        pa = t[:, :_RUNS_COL].sum(axis=1)
+        bb = t[:, OUT["walk"]]
+        return {"PA": pa, "AB": pa - bb, "H": t[:, _HIT].sum(axis=1), "2B": t[:, OUT["double"]],
+                "3B": t[:, OUT["triple"]], "HR": t[:, OUT["homer"]], "BB": bb, "K": t[:, _K].sum(axis=1),
+                "RBI": t[:, _RUNS_COL], "P": t[:, _PITCHES_COL]}
+
+    def pitching_lines(self):
+        """{column: array} for PITCHING_COLUMNS, one entry per player in `names` order."""
+        t = self.pitching[:len(self)]
+        return {"BF": t[:, :_RUNS_COL].sum(axis=1), "OUTS": t[:, :_RUNS_COL] @ _OUTS.astype(np.int64),
+                "H": t[:, _HIT].sum(axis=1), "HR": t[:, OUT["homer"]], "BB": t[:, OUT["walk"]],
+                "K": t[:, _K].sum(axis=1), "R": t[:, _RUNS_COL], "P": t[:, _PITCHES_COL]}
+
+    def run_distributions(self):
+        """(P(half-inning runs = k), P(team-game runs = k)); the last entries are "or more"."""
+        return (self.half_runs / max(1, self.half_runs.sum()),
+                self.game_runs / max(1, self.game_runs.sum()))
+
+    # --- export ---
+
+    def _tables(self):
+        bat, pit = self.batting_lines(), self.pitching_lines()
+        return {"batting": (bat, bat["PA"] > 0), "pitching": (pit, pit["BF"] > 0)}
+
+    def to_npy(self, prefix):
+        """PREFIX.batting.npy and PREFIX.pitching.npy as structured arrays, PREFIX.runs.npy as the histograms."""
+        names = np.array(self.names, dtype=str)
+        for kind, (cols, rows) in self._tables().items():
+            out = np.zeros(int(rows.sum()), dtype=[("name", names.dtype)] + [(c, np.int64) for c in cols])
+            out["name"] = names[rows]
+            for c, values in cols.items():
+                out[c] = values[rows]
+            np.save(f"{prefix}.{kind}.npy", out)
+        runs = np.zeros((2, MAX_GAME_RUNS + 1), dtype=np.int64)
+        runs[0, :MAX_HALF_RUNS + 1], runs[1] = self.half_runs, self.game_runs
+        np.save(f"{prefix}.runs.npy", runs)
+
+    def to_csv(self, prefix):
+        """PREFIX.batting.csv, PREFIX.pitching.csv and PREFIX.runs.csv."""
+        for kind, (cols, rows) in self._tables().items():
+            with open(f"{prefix}.{kind}.csv", "w", newline="", encoding="utf-8") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["name", *cols])
+                table = np.column_stack(list(cols.values()))
+                for i in np.flatnonzero(rows):
+                    writer.writerow([self.names[i], *table[i].tolist()])
+        with open(f"{prefix}.runs.csv", "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["runs", "halves", "team_games"])
+            for k in range(MAX_GAME_RUNS + 1):
+                writer.writerow([k, int(self.half_runs[k]) if k <= MAX_HALF_RUNS else "", int(self.game_runs[k])])
+
+def print_leaders(book, column="HR", n=10):
+    bat = book.batting_lines()
+    for i in np.argsort(-bat[column], kind="stable")[:n]:
+        print(f"{book.names[i]:<24} " + " ".join(f"{c} {int(bat[c][i]):>4}" for c in BATTING_COLUMNS))
+
+def main():
+    parser = argparse.ArgumentParser(description="Batting and pitching lines from a The Show event log.")
+    parser.add_argument("log")
+    parser.add_argument("--out", metavar="PREFIX", help="write PREFIX.batting/pitching/runs .csv and .npy")
+    parser.add_argument("--leaders", default="HR", choices=BATTING_COLUMNS)
+    args = parser.parse_args()
+
+    book = StatBook()
+    with EventLogReader(args.log) as reader:
+        book.add_log(reader)
+    print_leaders(book, args.leaders)
+    if args.out:
+        book.to_csv(args.out)
+        book.to_npy(args.out)
+        print(f"\nlines saved to {args.out}.*")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# show_variance.py
+"""
+Variance-reduced Monte Carlo for The Show: runs per game for one
+configuration, or the difference between two (two batting orders, two
+PITCH_TYPES settings), with confidence intervals. Requires numpy.
+
+Three techniques, each on by default:
+  - common random numbers: both configurations read the same CounterStream,
+    so a game differs between them only where the configurations do
+  - antithetic streams: every game is paired with one on 1 - u
+  - control variates: show_batch.CONTROLS, counts whose expectations the
+    model knows exactly (strikes against the strike rates, balls in play,
+    hits and total bases), regressed out of the result
+
+A configuration is a dict with lineup, batter_sides, and optionally
+pitcher (default a right-hander), swing_table and model (a BatchModel).
+
+    python show_variance.py --games 20000 --swap 1 9                 # batting order change
+    python show_variance.py --games 20000 --set fastball.strike_p=0.60   # pitch model change
+"""
+import argparse
+import copy
+import statistics
+from collections import namedtuple
+
+import numpy as np
+
+from show_batch import CONTROLS, BatchModel, CounterStream, simulate_half_innings
+from show_season import build_league
+from the_show import PITCH_TYPES
+
+INNINGS = 9
+DEFAULT_PITCHER = ("Variance Pitcher", "R")
+
+# mean and its standard error, the confidence interval, games simulated,
+# and speedup: how many times more games plain Monte Carlo needs for the same error
+Estimate = namedtuple("Estimate", "mean stderr low high games speedup")
+
+def simulate_games(n, config, seed=0, antithetic=False):
+    """
+    Runs and summed controls for n nine-inning games of one lineup's
+    offense, each inning picking up where the last one left off.
+    Returns (runs, controls) with shapes (n,) and (n, len(CONTROLS)).
+    """
+    runs = np.zeros(n)
+    controls = np.zeros((n, len(CONTROLS)))
+    idx = np.zeros(n, dtype=np.int64)
+    for inning in range(INNINGS):
+        res = simulate_half_innings(n, config["lineup"], idx, config.get("pitcher", DEFAULT_PITCHER),
+                                    config["batter_sides"], config.get("swing_table"),
+                                    seed=CounterStream(seed, inning, antithetic), model=config.get("model"),
+                                    controls=True)
+        runs += res["runs"]
+        controls += res["controls"]
+        idx = res["batter_idx"]
+    return runs, controls
+
+def _sample(n, config, seed, antithetic):
+    """(per-unit runs, per-unit controls, per-game runs): units are antithetic pairs when antithetic."""
+    if not antithetic:
+        runs, controls = simulate_games(n, config, seed)
+        return runs, controls, runs
+    half = max(1, n // 2)
+    runs, controls = simulate_games(half, config, seed)
+    twin_runs, twin_controls = simulate_games(half, config, seed, antithetic=True)
+    return (runs + twin_runs) / 2, (controls + twin_controls) / 2, np.concatenate([runs, twin_runs])
+
+def _estimate(y, controls, games, plain_var, confidence):
+    """Mean of y, less the controls' fitted part when controls is given, as an Estimate."""
+    m = len(y)
+    if controls is None:
+        mean, var = y.mean(), y.var(ddof=1) / m
+    else:
+        xc = controls - controls.mean(axis=0)
+        beta = np.linalg.lstsq(xc, y - y.mean(), rcond=None)[0]
+        mean = y.mean() - controls.mean(axis=0) @ beta   # the controls' true mean is zero
+        resid = y - y.mean() - xc @ beta
+        var = (resid @ resid) / (m - 1 - controls.shape[1]) / m
+    stderr = float(np.sqrt(var))
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    speedup = plain_var / var if var > 0 else float("inf")
+    return Estimate(float(mean), stderr, float(mean) - z * stderr, float(mean) + z * stderr, games, float(speedup))
+
+def estimate_runs(config, n, seed=0, antithetic=True, control=True, confidence=0.95):
+    """Expected runs per game for a configuration from about n simulated games."""
+    y, controls, per_game = _sample(n, config, seed, antithetic)
+    plain_var = per_game.var(ddof=1) / len(per_game)
+    return _estimate(y, controls if control else None, len(per_game), plain_var, confidence)
+
+def compare_runs(config_a, config_b, n, seed=0, crn=True, antithetic=True, control=True, confidence=0.95):
+    """
+    Expected runs per game of config_a minus config_b, from about n games
+    of each. Without crn the two get independent streams.
+    """
+    ya, ca, games_a = _sample(n, config_a, seed, antithetic)
+    yb, cb, games_b = _sample(n, config_b, seed if crn else (seed, "b"), antithetic)
+    plain_var = games_a.var(ddof=1) / len(games_a) + games_b.var(ddof=1) / len(games_b)
+    return _estimate(ya - yb, np.hstack([ca, cb]) if control else None,
+                     len(games_a) + len(games_b), plain_var, confidence)
+
+# ----------------------- Configurations -----------------------
+
+def team_config(team_seed=0, pitcher_side="R"):
+    team = build_league(1, team_seed)[0]
+    return {"lineup": team["lineup"], "batter_sides": team["batter_sides"],
+            "pitcher": (DEFAULT_PITCHER[0], pitcher_side)}
+
+def swapped(config, i, j):
+    """The configuration with batting-order slots i and j (1-based) swapped."""
+    lineup = list(config["lineup"])
+    lineup[i - 1], lineup[j - 1] = lineup[j - 1], lineup[i - 1]
+    return dict(config, lineup=lineup)
+
+def with_pitch_types(config, settings):
+    """The configuration under PITCH_TYPES with settings {"fastball.strike_p": 0.6, ...} applied."""
+    pitch_types = copy.deepcopy(PITCH_TYPES)
+    for name, value in settings.items():
+        pitch, field = name.split(".", 1)
+        pitch_types[pitch][field] = value
+    return dict(config, model=BatchModel(pitch_types))
+
+def print_estimate(label, est):
+    print(f"{label:<10} {est.mean:+.4f} ± {est.stderr:.4f}  [{est.low:+.4f}, {est.high:+.4f}]"
+          f"  {est.games} games  {est.speedup:5.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare The Show configurations with variance-reduced Monte Carlo.")
+    parser.add_argument("--games", type=int, default=20000, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--team", type=int, default=0, help="seed of the team whose lineup is used")
+    parser.add_argument("--pitcher", choices=("L", "R"), default="R", help="opposing pitcher's hand")
+    parser.add_argument("--swap", type=int, nargs=2, metavar=("I", "J"), help="compare with slots I and J swapped")
+    parser.add_argument("--set", action="append", default=[], metavar="PITCH.FIELD=VALUE",
+                        help="compare with a PITCH_TYPES change, e.g. fastball.strike_p=0.60 (repeatable)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args()
+
+    base = team_config(args.team, args.pitcher)
+    other = base
+    if args.swap:
+        other = swapped(other, *args.swap)
+    if args.set:
+        settings = {}
+        for item in args.set:
+            name, eq, value = item.partition("=")
+            pitch, dot, field = name.strip().partition(".")
+            if not (eq and dot):
+                parser.error(f"--set {item!r}: expected PITCH.FIELD=VALUE, e.g. fastball.strike_p=0.60")
+            if pitch not in PITCH_TYPES:
+                parser.error(f"--set {item!r}: no pitch {pitch!r} (one of {', '.join(PITCH_TYPES)})")
+            scalars = [key for key, v in PITCH_TYPES[pitch].items() if isinstance(v, (int, float))]
+            if field not in scalars:
+                parser.error(f"--set {item!r}: {pitch} has no field {field!r} to set (one of {', '.join(scalars)})")
+            try:
+                number = float(value)
+            except ValueError:
+                parser.error(f"--set {item!r}: {value!r} is not a number")
+            if not 0.0 <= number <= 1.0:
+                parser.error(f"--set {item!r}: {field} is a probability, 0 to 1")
+            settings[f"{pitch}.{field}"] = number
+        other = with_pitch_types(other, settings)
+    if other is base:
+        parser.error("nothing to compare: give --swap and/or --set")
+
+    print(f"runs per game, changed minus current, {args.confidence:.0%} interval, speedup over plain Monte Carlo")
+    print_estimate("plain", compare_runs(other, base, args.games, args.seed, crn=False, antithetic=False,
+                                         control=False, confidence=args.confidence))
+    print_estimate("reduced", compare_runs(other, base, args.games, args.seed, confidence=args.confidence))
+
+if __name__ == "__main__":
+    main()
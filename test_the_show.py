@@ -0,0 +1,363 @@
+# test_the_show.py
+"""
+Checks for The Show's model tables and saved state. Run with: python -m pytest test_the_show.py
+"""
+import os
+import random
+import statistics
+from collections import Counter
+
+import pytest
+
+import show_log
+from show_log import EventLog, EventLogReader
+import show_roster
+from show_roster import cache_path, load_roster, parse_roster
+from show_season import build_team, season_schedule
+from the_show import (
+    BASE_TRANSITIONS, HalfInningEngine, SnapshotRing, advance_bases, allocate_two_teams,
+    build_batting_order_realistic, decode_snapshot, double_play_643, encode_snapshot, force_advance_on_walk,
+    lineup_expected_runs, load_snapshot, main_script, optimize_batting_order, rng_state, set_rng_state,
+    simulate_game,
+)
+
+HIT_BASES = {"single": 1, "double": 2, "triple": 3, "homer": 4}
+
+def _apply(event, mask):
+    """(new mask, runs) from the baserunning functions, for a mask of occupied bases."""
+    bases = [f"R{i + 1}" if mask >> i & 1 else None for i in range(3)]
+    if event in HIT_BASES:
+        runs = advance_bases(bases, "B", HIT_BASES[event])
+    elif event == "walk":
+        runs = force_advance_on_walk(bases, "B")
+    elif event == "double_play":
+        runs = double_play_643(bases)
+    else:   # a plain out moves nobody
+        runs = 0
+    return sum(1 << i for i, runner in enumerate(bases) if runner is not None), runs
+
+def test_base_transitions_match_the_baserunning_functions():
+    assert set(BASE_TRANSITIONS) == {*HIT_BASES, "walk", "double_play", "out"}
+    mismatches = [(event, mask, row[mask], _apply(event, mask))
+                  for event, row in BASE_TRANSITIONS.items() for mask in range(8)
+                  if row[mask] != _apply(event, mask)]
+    assert mismatches == []
+
+# ----------------------- Snapshots & Undo -----------------------
+
+SETUP_ANSWERS = ["Tester", "1", "2", "R", "6", "3", "n"]
+
+def _play(answer, seed=1, **kwargs):
+    """
+    Drive main_script with the setup answers above, and `answer(n, prompt)`
+    at the n-th pitch prompt. Returns the lines the game printed.
+    """
+    lines, pitch_no = [], 0
+    setup = iter(SETUP_ANSWERS)
+    script = main_script(rng=random.Random(seed), out=lambda *a, **k: lines.append(" ".join(map(str, a))),
+                         tty=False, **kwargs)
+    try:
+        prompt = next(script)
+        while True:
+            if callable(prompt):
+                reply = prompt()
+            elif isinstance(prompt, float):
+                reply = False
+            elif prompt.startswith("⚾"):
+                pitch_no += 1
+                reply = answer(pitch_no, prompt)
+            elif prompt.startswith("\nWatch"):
+                reply = "n"
+            else:
+                reply = next(setup, "1")
+            prompt = script.send(reply)
+    except StopIteration:
+        pass
+    return lines
+
+def test_snapshot_encodes_and_decodes_to_the_same_state(tmp_path):
+    path = str(tmp_path / "game.snap")
+    _play(lambda n, prompt: "q" if n == 12 else "s", autosave=path)
+    snap = load_snapshot(path)
+    assert snap is not None
+    assert decode_snapshot(encode_snapshot(snap)) == snap
+    with pytest.raises(ValueError):
+        decode_snapshot(encode_snapshot(snap)[:-10])
+
+def test_undo_stops_at_the_ring_capacity():
+    ring = SnapshotRing(3)
+    rng = random.Random(0)
+    for n in range(5):
+        ring.push({}, (1, (), (), 0, 0, 0), (n,), rng_state(rng), logged=n)
+    assert len(ring) == 3
+    assert [ring.pop()[1] for _ in range(3)] == [4, 3, 2]
+    with pytest.raises(IndexError):
+        ring.pop()
+
+    # in a game, undo goes back to the oldest kept pitch, then is no longer offered
+    prompts = []
+    def answer(n, prompt):
+        prompts.append(prompt)
+        return "u" if 6 <= n <= 8 else "s"
+    lines = _play(answer, undo_depth=3)
+    assert lines.count("⏪ Back one pitch.") == 2
+    assert "/u/" in prompts[6] and "/u/" not in prompts[7]
+    assert lines.count("Type s (swing), t (take), or q (quit).") == 1
+
+def test_restored_engine_plays_on_like_one_never_snapshotted():
+    lineup = [f"Hitter {i}" for i in range(9)]
+    sides = dict(zip(lineup, "LRSRLRRLS"))
+
+    def engine(seed, events):
+        return HalfInningEngine(lineup, 0, ("Gerrit Cole", "R"), sides, rng=random.Random(seed),
+                                listener=events.append)
+
+    straight_events = []
+    straight = engine(7, straight_events)
+    for _ in range(6):
+        straight.step()
+    state, snap_rng, mark = straight.snapshot(), rng_state(straight.rng), len(straight_events)
+    while straight.step():
+        pass
+
+    restored_events = []
+    restored = engine(99, restored_events)
+    restored.restore(state)
+    set_rng_state(restored.rng, snap_rng)
+    del restored_events[:]
+    while restored.step():
+        pass
+    assert restored_events == straight_events[mark:]
+    assert restored.snapshot() == straight.snapshot()
+
+# ----------------------- Event Log -----------------------
+
+class _TeeRecorder:
+    """A GameRecorder's half() listeners, also keeping every event as (inning, half, event)."""
+
+    def __init__(self, recorder):
+        self.recorder, self.events = recorder, []
+
+    def half(self, inning, bottom, pitcher, start=(0, 0, 0)):
+        listener = self.recorder.half(inning, bottom, pitcher, start)
+        half = "bottom" if bottom else "top"
+        def tee(ev):
+            self.events.append((inning, half, dict(ev)))
+            listener(ev)
+        return tee
+
+def _play_key(ev):
+    return ev["batter"], ev["outcome"], ev["scored"]
+
+def test_event_log_index_queries_and_replay(tmp_path, monkeypatch):
+    path = str(tmp_path / "games.log")
+    rng = random.Random(3)
+    teams = [build_team(f"Team {i}", rng) for i in range(4)]
+    played = []
+    with EventLog(path) as log:
+        for game_no, (home, away) in enumerate([(0, 1), (2, 3), (1, 2)]):
+            rec = log.recorder()
+            rec.start(teams[home]["name"], teams[away]["name"])
+            tee = _TeeRecorder(rec)
+            result = simulate_game(teams[home], teams[away], rng=random.Random(game_no), recorder=tee)
+            log.append(rec)
+            played.append((teams[home]["name"], teams[away]["name"], result, tee.events))
+    assert not os.path.exists(path + ".idx")
+
+    plays = [ev for *_, events in played for _, _, ev in events if ev["event"] == "play"]
+    for attempt in ("built", "loaded"):
+        if attempt == "loaded":
+            monkeypatch.setattr(show_log, "_build_index", None)   # the saved .idx must be used
+        with EventLogReader(path) as reader:
+            assert os.path.exists(path + ".idx")
+            assert reader.games() == [(g, home, away) for g, (home, away, _, _) in enumerate(played)]
+            for game, (home, away, result, events) in enumerate(played):
+                assert reader.line_scores(game) == (home, away, result["home_line"], result["away_line"])
+                replayed = reader.replay(game)
+                assert replayed[0] == {"event": "game", "game": game, "home": home, "away": away}
+                logged = [(ev["inning"], ev["half"], ev["event"], ev.get("call"), ev.get("outcome"))
+                          for ev in replayed[1:]]
+                assert logged == [(inning, half, ev["event"], ev.get("call"), ev.get("outcome"))
+                                  for inning, half, ev in events if ev["event"] in ("pitch", "play")]
+
+            batter = plays[0]["batter"]
+            assert [_play_key(ev) for ev in reader.plays(batter=batter)] == \
+                [_play_key(ev) for ev in plays if ev["batter"] == batter]
+            assert [_play_key(ev) for ev in reader.plays(outcome="single")] == \
+                [_play_key(ev) for ev in plays if ev["outcome"] == "single"]
+            assert len(reader.plays()) == len(plays)
+            assert reader.plays(batter="Nobody") == []
+
+def test_resumed_game_logs_like_one_played_straight(tmp_path):
+    straight = str(tmp_path / "straight.log")
+    with EventLog(straight) as log:
+        rec = log.recorder()
+        _play(lambda n, prompt: "s", recorder=rec)
+        log.append(rec)
+
+    split, save = str(tmp_path / "split.log"), str(tmp_path / "game.snap")
+    with EventLog(split) as log:
+        rec = log.recorder()
+        _play(lambda n, prompt: "q" if n == 15 else "s", recorder=rec, autosave=save)
+        log.append(rec)
+    snap = load_snapshot(save)
+    with EventLog(split) as log:
+        rec = log.resume(snap[0]["my_team"], snap[0]["opp_team"])
+        _play(lambda n, prompt: "s", recorder=rec, resume=snap)
+        log.append(rec)
+
+    for suffix in ("", ".names"):
+        with open(straight + suffix, "rb") as a, open(split + suffix, "rb") as b:
+            assert a.read() == b.read()
+
+# ----------------------- Rosters -----------------------
+
+ROSTER_HEADER = "name,pos,bats,throws,role\n"
+FULL_ROSTER = [f"Hitter {pos},{pos},R,," for pos in range(2, 10)] + \
+    ["Ace,P,,R,starter", "Setup,P,,L,reliever", "Stopper,P,,R,closer"]
+
+def _roster(tmp_path, rows, name="roster.csv"):
+    path = tmp_path / name
+    path.write_text(ROSTER_HEADER + "\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("rows, message", [
+    (FULL_ROSTER[1:], "no hitters at Catcher"),
+    ([row for row in FULL_ROSTER if "closer" not in row], "no closer among the pitchers"),
+    (FULL_ROSTER + ["Lefty,SS,X,,"], "bats must be L, R or S"),
+    (FULL_ROSTER + ["Wild,P,,S,starter"], "pitchers need throws L/R"),
+    (FULL_ROSTER + ["Hitter 2,C,L,,"], "duplicate hitter Hitter 2"),
+    (FULL_ROSTER + ["Nobody,DH,R,,"], "bad position 'DH'"),
+])
+def test_parse_roster_rejects_bad_rosters(tmp_path, rows, message):
+    with pytest.raises(ValueError, match=message):
+        parse_roster(_roster(tmp_path, rows))
+
+def test_roster_cache_goes_stale_when_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(show_roster, "CACHE_DIR", str(tmp_path / "cache"))
+    path = _roster(tmp_path, FULL_ROSTER)
+    registry, pitchers = load_roster(path)
+    assert len(registry) == 8 and len(pitchers) == 3
+    assert os.path.exists(cache_path(path))
+
+    # the cached copy is read as long as the file is unchanged
+    monkeypatch.setattr(show_roster, "parse_roster", None)
+    assert load_roster(path)[1] == pitchers
+    monkeypatch.setattr(show_roster, "parse_roster", parse_roster)
+
+    stat = os.stat(path)
+    _roster(tmp_path, FULL_ROSTER + ["Extra Bat,LF,L,,"])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    registry, _ = load_roster(path)
+    assert len(registry) == 9
+
+    _roster(tmp_path, FULL_ROSTER[1:] + ["Extra Bat,LF,L,,"])
+    with pytest.raises(ValueError, match="no hitters at Catcher"):
+        load_roster(path)
+
+# ----------------------- Seasons -----------------------
+
+@pytest.mark.parametrize("n_teams, games", [(4, 6), (7, 162), (9, 20), (5, 5)])
+def test_season_schedule_gives_every_team_its_games(n_teams, games):
+    schedule = season_schedule(n_teams, games)
+    counts = Counter(team for game in schedule for team in game)
+    assert all(home != away for home, away in schedule)
+    # with both counts odd the games can't come out even, and one team is a game short
+    short = n_teams * games % 2
+    assert sorted(counts[team] for team in range(n_teams)) == [games - 1] * short + [games] * (n_teams - short)
+
+# ----------------------- Stat Books -----------------------
+
+def test_stat_books_merged_from_shards_equal_one_book():
+    pytest.importorskip("numpy")
+    from show_stats import StatBook
+
+    rng = random.Random(5)
+    teams = [build_team(f"Team {i}", rng) for i in range(4)]
+    schedule = [(0, 1), (2, 3), (1, 3), (0, 2), (3, 0), (2, 1)]
+
+    def fill(book, games):
+        for game_no in games:
+            home, away = schedule[game_no]
+            rec = book.recorder(game_no)
+            rec.start(teams[home]["name"], teams[away]["name"])
+            simulate_game(teams[home], teams[away], rng=random.Random(game_no), recorder=rec)
+            book.add(rec)
+        return book
+
+    whole = fill(StatBook(), range(6))
+    # small capacities make the shards grow their columns; the second sees players in another order
+    merged = fill(StatBook(capacity=4), [0, 1, 2]).merge(fill(StatBook(capacity=8), [5, 4, 3]))
+
+    def by_name(book, lines):
+        return {name: {col: int(values[i]) for col, values in lines.items()} for i, name in enumerate(book.names)}
+
+    assert sorted(merged.names) == sorted(whole.names)
+    assert by_name(merged, merged.batting_lines()) == by_name(whole, whole.batting_lines())
+    assert by_name(merged, merged.pitching_lines()) == by_name(whole, whole.pitching_lines())
+    assert merged.half_runs.tolist() == whole.half_runs.tolist()
+    assert merged.game_runs.tolist() == whole.game_runs.tolist()
+    assert sum(whole.batting_lines()["PA"]) > 6 * 60
+
+# ----------------------- Batch Simulation -----------------------
+
+def test_batch_simulation_agrees_with_the_engine():
+    """
+    show_batch's lockstep arrays and HalfInningEngine are two codings of one
+    model: over seeded runs their means and run distributions must agree
+    within 4 standard errors of the difference. They differ by under 2
+    here; moving every pitch's strike_p by 0.03 in one of them puts runs
+    and plate appearances 5-7 apart.
+    """
+    np = pytest.importorskip("numpy")
+    from show_batch import simulate_half_innings
+
+    team, pitcher = build_team("Test", random.Random(1)), ("Gerrit Cole", "R")
+    rng, rows = random.Random(11), []
+    for _ in range(20000):
+        engine = HalfInningEngine(team["lineup"], 0, pitcher, team["batter_sides"], rng=rng)
+        engine.run()
+        rows.append((engine.runs, engine.hits, engine.pitches, engine.pas))
+    engine_stats = dict(zip(("runs", "hits", "pitches", "pa"), np.array(rows).T))
+    batch = simulate_half_innings(200000, team["lineup"], 0, pitcher, team["batter_sides"], seed=11)
+
+    def within(a, b, label):
+        stderr = np.sqrt(a.var() / len(a) + b.var() / len(b))
+        assert abs(a.mean() - b.mean()) < 4 * stderr, (label, a.mean(), b.mean(), stderr)
+
+    for key, values in engine_stats.items():
+        within(values, batch[key], key)
+    for runs in range(4):   # P(0), P(1), P(2), P(3 or more) runs in the half
+        within(np.minimum(engine_stats["runs"], 3) == runs, np.minimum(batch["runs"], 3) == runs, f"P({runs})")
+
+# ----------------------- Lineups -----------------------
+
+def test_optimized_order_keeps_same_side_hitters_in_role_order():
+    sides = {"Tester": "S"}
+    defense, _ = allocate_two_teams("Tester", "6", sides, rng=random.Random(2))
+    realistic = build_batting_order_realistic(defense, "Tester", 3, sides)
+    order, value = optimize_batting_order(defense, "Tester", 3, sides, ("R",) * 9, leadoff=2)
+    assert order.index("Tester") == 2 and sorted(order) == sorted(realistic)
+    assert value == pytest.approx(lineup_expected_runs(tuple(sides[n] for n in order), ("R",) * 9, leadoff=2))
+    for side in "LRS":   # the player is pinned to a spot; everyone else keeps role order within a side
+        same = lambda lineup: [n for n in lineup if sides[n] == side and n != "Tester"]
+        assert same(order) == same(realistic)
+
+def test_fast_games_agree_with_pitch_by_pitch_games():
+    """simulate_game(fast=True) plays the same model by plate appearance: same runs within 4 standard errors."""
+    home, away = build_team("Home", random.Random(4)), build_team("Away", random.Random(5))
+    totals = {}
+    for fast in (False, True):
+        games = [simulate_game(home, away, rng=random.Random(i), fast=fast) for i in range(1500)]
+        totals[fast] = [sum(g["home_line"]) + sum(g["away_line"]) for g in games]
+        for g in games:
+            margin = sum(g["home_line"]) - sum(g["away_line"])
+            assert margin != 0 and len(g["away_line"]) == g["innings"] >= 9
+            if len(g["home_line"]) == g["innings"] and margin > 0:
+                # a walk-off: the home half stopped on the play that put them ahead
+                assert margin <= 4
+    slow, fast = totals[False], totals[True]
+    stderr = (statistics.pvariance(slow) / len(slow) + statistics.pvariance(fast) / len(fast)) ** 0.5
+    assert abs(statistics.fmean(slow) - statistics.fmean(fast)) < 4 * stderr
+    with pytest.raises(ValueError):
+        simulate_game(home, away, fast=True, recorder=object())
@@ -1,6 +1,17 @@
 # the_show.py
+import hashlib
+import json
+import os
 import random
+import struct
+import sys
 import time
+from array import array
+from bisect import bisect
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import accumulate
 
 # ----------------------- Config & Labels -----------------------
 
@@ -77,37 +88,69 @@ PLAYER_OVERRIDES = {
 
 # ----------------------- Input & Small Helpers -----------------------
 
-def prompt_position():
-    pos_map = {
-        "1": "1", "p": "1", "pitcher": "1",
-        "2": "2", "c": "2", "catcher": "2",
-        "3": "3", "1b": "3", "first base": "3",
-        "4": "4", "2b": "4", "second base": "4",
-        "5": "5", "3b": "5", "third base": "5",
-        "6": "6", "ss": "6", "shortstop": "6",
-        "7": "7", "lf": "7", "left field": "7",
-        "8": "8", "cf": "8", "center field": "8",
-        "9": "9", "rf": "9", "right field": "9",
-    }
+# Position numbers by number, abbreviation or name (lowercase)
+POS_ALIASES = {
+    "1": "1", "p": "1", "pitcher": "1",
+    "2": "2", "c": "2", "catcher": "2",
+    "3": "3", "1b": "3", "first base": "3",
+    "4": "4", "2b": "4", "second base": "4",
+    "5": "5", "3b": "5", "third base": "5",
+    "6": "6", "ss": "6", "shortstop": "6",
+    "7": "7", "lf": "7", "left field": "7",
+    "8": "8", "cf": "8", "center field": "8",
+    "9": "9", "rf": "9", "right field": "9",
+}
+
+# Interactive code is written as prompt scripts: generators that yield each
+# prompt, are sent back the line the player typed, and print through `out`.
+# Slow work is yielded as a zero-argument callable instead, and the driver
+# sends back its result (the server runs it off the event loop); a float is
+# a pause in seconds, answered with True if the player asked to skip ahead.
+# run_at_console drives scripts from the keyboard; show_server drives the
+# same scripts over network connections.
+
+def run_at_console(script):
+    """Answer a prompt script's prompts with input(). Returns what the script returns."""
+    try:
+        prompt = next(script)
+        while True:
+            if callable(prompt):
+                answer = prompt()
+            elif isinstance(prompt, float):
+                answer = _console_pause(prompt)
+            else:
+                answer = input(prompt)
+            prompt = script.send(answer)
+    except StopIteration as stop:
+        return stop.value
+
+def prompt_position_script(out=print):
     while True:
-        raw = input("Your position? (1-9 or RF/SS/3B): ").strip().lower()
-        if raw in pos_map:
-            return pos_map[raw]
-        print("Pick 1–9 or a name like RF, CF, SS, 3B.")
+        raw = (yield "Your position? (1-9 or RF/SS/3B): ").strip().lower()
+        if raw in POS_ALIASES:
+            return POS_ALIASES[raw]
+        out("Pick 1–9 or a name like RF, CF, SS, 3B.")
 
-def choose_team_name(prompt_label):
-    base = input(f"What is {prompt_label} team name? ").strip()
+def prompt_position():
+    return run_at_console(prompt_position_script())
+
+def choose_team_name_script(prompt_label, out=print):
+    base = (yield f"What is {prompt_label} team name? ").strip()
     if not base:
         base = "Goats" if "your" in prompt_label.lower() else "Opponents"
     already_has_the = base.lower().startswith("the ")
-    add_the = input(f"Include 'the' in '{base}' when displayed? (y/n): ").strip().lower()
+    add_the = (yield f"Include 'the' in '{base}' when displayed? (y/n): ").strip().lower()
     if add_the.startswith("y"):
         return base if already_has_the else f"the {base}"
     return base[4:] if already_has_the else base
 
-def show_bases(bases):
-    def slot(x): return "_" if x is None else "X"
-    print(f"Bases: 1st[{slot(bases[0])}]  2nd[{slot(bases[1])}]  3rd[{slot(bases[2])}]")
+def choose_team_name(prompt_label):
+    return run_at_console(choose_team_name_script(prompt_label))
+
+def show_bases(bases, out=print):
+    """bases is a 3-bit mask: 1 = runner on 1st, 2 = on 2nd, 4 = on 3rd."""
+    def slot(bit): return "X" if bases & bit else "_"
+    out(f"Bases: 1st[{slot(1)}]  2nd[{slot(2)}]  3rd[{slot(4)}]")
 
 def reset_count(state):
     state["balls"] = 0
@@ -119,7 +162,8 @@ def count_string(state):
 
 # ----------------------- Walk-up & Announcing -----------------------
 
-def announce_batter(lineup, idx, batter_sides, current_pitcher, show_on_deck=False, user_name=None, user_side_for_ab=None):
+def announce_batter(lineup, idx, batter_sides, current_pitcher, show_on_deck=False, user_name=None, user_side_for_ab=None,
+                    rng=None, out=print):
     spot = idx + 1
     name = lineup[idx]
     bats = batter_sides.get(name, "R")
@@ -145,31 +189,34 @@ def announce_batter(lineup, idx, batter_sides, current_pitcher, show_on_deck=Fal
         "advantage": ["Likes this matchup.", "Platoon edge here.", "Comfortable split."],
         "even": ["Straight-up battle.", "Neutral split.", "No edge either way."]
     }
-    line = random.choice(slot_lines.get(spot, ["Locked in."])) + " " + random.choice(platoon_lines[vs_platoon])
+    rng = rng or random
+    line = rng.choice(slot_lines.get(spot, ["Locked in."])) + " " + rng.choice(platoon_lines[vs_platoon])
 
-    print(f"\nNow up: {spot}. {name} (Bats {display_bats}). {line}")
-    print(f"Pitching: {p_name} (Throws {p_throws})")
+    out(f"\nNow up: {spot}. {name} (Bats {display_bats}). {line}")
+    out(f"Pitching: {p_name} (Throws {p_throws})")
     if bats == "S" and name == user_name:
-        print("Switch hitter: auto side chosen vs pitcher. Press 'h' to flip this AB.")
+        out("Switch hitter: auto side chosen vs pitcher. Press 'h' to flip this AB.")
 
     if show_on_deck:
         on_deck_idx = (idx + 1) % 9
         in_hole_idx = (idx + 2) % 9
-        print(f"On deck: {lineup[on_deck_idx]} | In the hole: {lineup[in_hole_idx]}")
+        out(f"On deck: {lineup[on_deck_idx]} | In the hole: {lineup[in_hole_idx]}")
 
 # ----------------------- Rosters & Lineups -----------------------
 
-def allocate_two_teams(user_name, user_pos_num, batter_sides):
+def allocate_two_teams(user_name, user_pos_num, batter_sides, registry=None, rng=None):
     """
-    Build home and opponent defenses with variety.
+    Build home and opponent defenses with variety, drawing from the registry
+    (default: the built-in pools).
     """
+    registry = registry or REGISTRY
+    rng = rng or random
     home = {str(i): None for i in range(1, 10)}
     opp  = {str(i): None for i in range(1, 10)}
 
     def pick_two_from(pos):
-        pool = MLB_POSITION_POOL.get(pos, []) + BENCH_POSITION_POOL.get(pos, [])
-        pool = [p for p in pool]
-        random.shuffle(pool)
+        pool = [(p.name, p.bats) for p in registry.at_position(pos)]
+        rng.shuffle(pool)
         seen = set()
         picks = []
         for name, bats in pool:
@@ -200,14 +247,29 @@ def allocate_two_teams(user_name, user_pos_num, batter_sides):
     batter_sides.setdefault("Opp Pitcher", "R")
     return home, opp
 
-def choose_staff():
-    starters = [(n,t) for (n,t,r) in PITCHERS if r == "starter"]
-    relievers = [(n,t) for (n,t,r) in PITCHERS if r == "reliever"]
-    closers   = [(n,t) for (n,t,r) in PITCHERS if r == "closer"]
-    starter   = random.choice(starters)
-    reliever  = random.choice(relievers)
-    closer    = random.choice(closers)
-    starter_len = random.choice([3,4])  # starter goes 3–4 innings
+_STAFF_POOLS = {}
+
+def staff_pools(pitchers):
+    """(starters, relievers, closers) from a PITCHERS-style list, split once per list."""
+    entry = _STAFF_POOLS.get(id(pitchers))
+    if entry is None or entry[0] is not pitchers:
+        starters = [(n,t) for (n,t,r) in pitchers if r == "starter"]
+        relievers = [(n,t) for (n,t,r) in pitchers if r == "reliever"]
+        closers   = [(n,t) for (n,t,r) in pitchers if r == "closer"]
+        entry = _STAFF_POOLS[id(pitchers)] = (pitchers, (starters, relievers, closers))
+    return entry[1]
+
+def choose_staff(rng=None, pitchers=None, exclude=()):
+    """Starter, reliever and closer; names in `exclude` are skipped while a role has anyone else."""
+    rng = rng or random
+    starters, relievers, closers = staff_pools(pitchers or PITCHERS)
+    if exclude:
+        starters, relievers, closers = ([p for p in pool if p[0] not in exclude] or pool
+                                        for pool in (starters, relievers, closers))
+    starter   = rng.choice(starters)
+    reliever  = rng.choice(relievers)
+    closer    = rng.choice(closers)
+    starter_len = rng.choice([3,4])  # starter goes 3–4 innings
     return {"starter": starter, "reliever": reliever, "closer": closer, "starter_len": starter_len}
 
 def current_pitcher_for_inning(staff, inning):
@@ -235,15 +297,129 @@ def heuristic_ratings(name, pos, bats):
         base["obp"] += 5
     return base
 
-def get_player_scores(defense, name, bats):
-    pos = infer_pos_for_name(defense, name)
+# ----------------------- Player Registry -----------------------
+
+class Player:
+    """One hitter: integer id, handedness, primary position and ratings."""
+    __slots__ = ("id", "name", "bats", "pos", "spd", "obp", "pow", "overall")
+
+    def __init__(self, pid, name, bats, pos, spd, obp, powr):
+        self.id = pid
+        self.name = name
+        self.bats = bats
+        self.pos = pos
+        self.spd = spd
+        self.obp = obp
+        self.pow = powr
+        self.overall = round(0.35*obp + 0.35*powr + 0.30*spd, 2)
+
+    def __repr__(self):
+        return f"Player({self.id}, {self.name!r}, bats={self.bats}, pos={self.pos})"
+
+class PlayerRegistry:
+    """
+    Players by integer id, stored column by column, with O(1) lookups by id,
+    name, position and bats. Ratings are worked out once, when a player is
+    added; Player records are built the first time a player is looked up.
+    """
+    __slots__ = ("names", "bats", "pos", "spd", "obp", "pow",
+                 "ids_by_name", "ids_by_pos", "ids_by_bats", "_records")
+
+    def __init__(self):
+        self.names = []
+        self.bats = []
+        self.pos = []
+        self.spd = array("B")
+        self.obp = array("B")
+        self.pow = array("B")
+        self.ids_by_name = {}
+        self.ids_by_pos = {pos: [] for pos in POS_LABELS}
+        self.ids_by_bats = {"L": [], "R": [], "S": []}
+        self._records = {}
+
+    @classmethod
+    def from_columns(cls, names, bats, pos, spd, obp, powr):
+        """Registry straight from equal-length columns of unique names (e.g. a compiled roster)."""
+        registry = cls()
+        registry.names = list(names)
+        registry.bats = list(bats)
+        registry.pos = list(pos)
+        registry.spd = array("B", spd)
+        registry.obp = array("B", obp)
+        registry.pow = array("B", powr)
+        registry.ids_by_name = dict(zip(registry.names, range(len(registry.names))))
+        for pid, (p, b) in enumerate(zip(registry.pos, registry.bats)):
+            registry.ids_by_pos.setdefault(p, []).append(pid)
+            registry.ids_by_bats.setdefault(b, []).append(pid)
+        return registry
+
+    def extend(self, rows):
+        """Bulk-add (name, bats, pos, spd, obp, pow) rows whose ratings are already worked out."""
+        for name, bats, pos, spd, obp, powr in rows:
+            if name in self.ids_by_name:
+                continue
+            pid = len(self.names)
+            self.names.append(name)
+            self.bats.append(bats)
+            self.pos.append(pos)
+            self.spd.append(spd)
+            self.obp.append(obp)
+            self.pow.append(powr)
+            self.ids_by_name[name] = pid
+            self.ids_by_pos.setdefault(pos, []).append(pid)
+            self.ids_by_bats.setdefault(bats, []).append(pid)
+
+    def add(self, name, bats, pos, ratings=None):
+        """Register a hitter (or return the existing record for that name)."""
+        if name not in self.ids_by_name:
+            r = ratings or PLAYER_OVERRIDES.get(name) or heuristic_ratings(name, pos, bats)
+            self.extend([(name, bats, pos, r["spd"], r["obp"], r["pow"])])
+        return self[self.ids_by_name[name]]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, pid):
+        player = self._records.get(pid)
+        if player is None:
+            player = self._records[pid] = Player(pid, self.names[pid], self.bats[pid], self.pos[pid],
+                                                 self.spd[pid], self.obp[pid], self.pow[pid])
+        return player
+
+    def find(self, name):
+        pid = self.ids_by_name.get(name)
+        return None if pid is None else self[pid]
+
+    def at_position(self, pos):
+        return [self[pid] for pid in self.ids_by_pos.get(pos, ())]
+
+    def batting(self, bats):
+        return [self[pid] for pid in self.ids_by_bats.get(bats, ())]
+
+def default_registry():
+    """The built-in pools: starters first, then bench, position by position."""
+    registry = PlayerRegistry()
+    for pool in (MLB_POSITION_POOL, BENCH_POSITION_POOL):
+        for pos, players in pool.items():
+            for name, bats in players:
+                registry.add(name, bats, pos)
+    return registry
+
+REGISTRY = default_registry()
+
+def get_player_scores(defense, name, bats, pos=None, registry=None):
+    if pos is None:
+        pos = infer_pos_for_name(defense, name)
+    player = (registry or REGISTRY).find(name)
+    if player is not None and (player.pos == pos or name in PLAYER_OVERRIDES):
+        return player.spd, player.obp, player.pow
     ovr = PLAYER_OVERRIDES.get(name)
     if ovr:
         return ovr["spd"], ovr["obp"], ovr["pow"]
     h = heuristic_ratings(name, pos, bats)
     return h["spd"], h["obp"], h["pow"]
 
-def build_batting_order_realistic(defense, user_name, user_spot, batter_sides):
+def build_batting_order_realistic(defense, user_name, user_spot, batter_sides, registry=None):
     # Collect non-pitcher hitters
     hitters = [n for p,n in defense.items() if p != "1" and n is not None]
     # De-dup and pad
@@ -256,9 +432,12 @@ def build_batting_order_realistic(defense, user_name, user_spot, batter_sides):
         uniq.append(extra); batter_sides.setdefault(extra, "R"); seen.add(extra)
 
     # Score everyone
+    pos_of = {}
+    for p, n in defense.items():
+        pos_of.setdefault(n, p)
     scored = []
     for n in uniq:
-        spd, obp, powr = get_player_scores(defense, n, batter_sides.get(n, "R"))
+        spd, obp, powr = get_player_scores(defense, n, batter_sides.get(n, "R"), pos_of.get(n), registry)
         overall = round(0.35*obp + 0.35*powr + 0.30*spd, 2)
         scored.append({"name": n, "spd": spd, "obp": obp, "pow": powr, "overall": overall})
 
@@ -285,7 +464,9 @@ def build_batting_order_realistic(defense, user_name, user_spot, batter_sides):
     lineup = [leadoff["name"], two["name"], three["name"], four["name"],
               five["name"], six["name"], seven["name"], eight["name"], nine["name"]]
 
-    # Put user in chosen spot
+    # Put user in chosen spot (no user: keep the role order)
+    if user_name is None:
+        return lineup
     if user_name in lineup:
         lineup.remove(user_name)
     user_spot = max(1, min(9, user_spot))
@@ -315,6 +496,44 @@ def platoon_modifier(hitter_side, pitcher_side):
         return 0.04
     return 0.0
 
+# Pitch mix the opposing pitcher throws from
+PITCH_MIX = ["fastball", "slider", "curve", "changeup", "sinker"]
+PITCH_MIX_WEIGHTS = [30, 25, 15, 15, 15]
+
+# Balls in play: out rates and hit-type weights once contact is made
+CONTACT_TYPES = ["fly", "ground", "line"]
+HIT_TYPES = ["single", "double", "triple"]
+FLY_OUT_P = 0.55
+FLY_HIT_WEIGHTS = [35, 50, 15]
+GROUND_DP_P = 0.10
+GROUND_SINGLE_P = 0.35
+LINEOUT_P = 0.20
+LINE_HIT_WEIGHTS = [45, 40, 15]
+HOMER_UPGRADE_P = 0.07
+SWING_THRESHOLD = 6   # swing roll (1-10) needed to put a strike in play
+
+def pitch_strike_p(pitch_type, hitter_side, pitcher_side, pitch_types=None):
+    """
+    Strike probability the at-bat loop uses: the platoon edge on top of the
+    pitch's base rate. (The count adjustment is not applied in the loop.)
+    pitch_types stands in for PITCH_TYPES, e.g. to try other settings.
+    """
+    base_p = (pitch_types or PITCH_TYPES)[pitch_type]["strike_p"]
+    return max(0.10, min(0.90, base_p + platoon_modifier(hitter_side, pitcher_side)))
+
+def swing_threshold(pitch_type, hitter_side, pitcher_side, base=None):
+    threshold = SWING_THRESHOLD if base is None else base
+    if pitch_type in ("slider", "curve"): threshold += 1
+    if pitch_type == "sinker": threshold += 1
+    if platoon_modifier(hitter_side, pitcher_side) > 0: threshold -= 1
+    return threshold
+
+# The model's tunable settings together, to solve or simulate another
+# setting of them than the constants above
+PitchModel = namedtuple("PitchModel", "pitch_types fly_out_p ground_dp_p ground_single_p lineout_p homer_p swing_threshold")
+DEFAULT_PITCH_MODEL = PitchModel(PITCH_TYPES, FLY_OUT_P, GROUND_DP_P, GROUND_SINGLE_P, LINEOUT_P,
+                                 HOMER_UPGRADE_P, SWING_THRESHOLD)
+
 # ----------------------- Baserunning -----------------------
 
 def advance_bases(bases, batter_name, bases_to_advance):
@@ -393,414 +612,1803 @@ def double_play_643(bases):
     bases[0] = None
     return runs
 
-# ----------------------- Defense Sim (3 outs exactly) -----------------------
+# ----------------------- Base-Out Tables -----------------------
+
+# Bases as a 3-bit mask: 1 = runner on 1st, 2 = on 2nd, 4 = on 3rd.
+# BASE_TRANSITIONS[event][mask] = (new mask, runs scored), the same moves the
+# functions above make (note a runner on 1st stops at 3rd on a double, and a
+# double play with nobody on 1st changes nothing).
+BASE_TRANSITIONS = {
+    #                 ___    1__    _2_    12_    __3    1_3    _23    123
+    "single":      [(1,0), (3,0), (5,0), (7,0), (1,1), (3,1), (5,1), (7,1)],
+    "double":      [(2,0), (6,0), (2,1), (6,1), (2,1), (6,1), (2,2), (6,2)],
+    "triple":      [(4,0), (4,1), (4,1), (4,2), (4,1), (4,2), (4,2), (4,3)],
+    "homer":       [(0,1), (0,2), (0,2), (0,3), (0,2), (0,3), (0,3), (0,4)],
+    "walk":        [(1,0), (3,0), (3,0), (7,0), (5,0), (7,0), (7,0), (7,1)],
+    "double_play": [(0,0), (0,0), (2,0), (4,0), (4,0), (4,0), (6,0), (4,1)],
+    "out":         [(0,0), (1,0), (2,0), (3,0), (4,0), (5,0), (6,0), (7,0)],
+}
+BASE_EVENT_OUTS = {"double_play": 2, "out": 1}
+
+# ----------------------- Profiling -----------------------
 
-def defensive_play_notation_exact(user_pos_num):
+class StageProfiler:
     """
-    Build a concise, position-only summary that equals three outs.
-    Events and their out values:
-      - 'K' or 'ꓘ' = 1
-      - 'F{pos}' = 1
-      - '6-3'/'5-3'/'4-3'/'1-3' = 1
-      - 'CS 2-6' or 'CS 2-4' = 1
-      - '6-4-3 DP'/'5-4-3 DP'/'4-6-3 DP'/'3-6-3 DP' = 2
+    Counts and cumulative time for each stage of a pitch, filled in by
+    engines created with profiler=... (engines without one pay nothing):
+      pitch_type   drawing the pitch
+      strike       the strike/ball draw
+      policy       the batter's decision (the keyboard, in a live game)
+      foul         foul-ball draw on a swing
+      contact      swing roll and contact type
+      hit_type     resolving a ball in play to an outcome
+      baserunning  moving runners and the count once the PA is over
+      render       the listener: narration, announcements, output
+    Profilers from different games or workers combine with merge().
     """
-    outs_left = 3
-    plays = []
-    while outs_left > 0:
-        # If 2 or 3 outs remain, we may choose a DP
-        can_dp = outs_left >= 2 and random.random() < 0.25
-        if can_dp:
-            dp = random.choice(["6-4-3 DP", "5-4-3 DP", "4-6-3 DP", "3-6-3 DP"])
-            plays.append(dp)
-            outs_left -= 2
-            continue
+    STAGES = ("pitch_type", "strike", "policy", "foul", "contact", "hit_type", "baserunning", "render")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self.ns = dict.fromkeys(self.STAGES, 0)
+        self._lap_ns = self._lap_render = 0
+
+    def add(self, stage, ns):
+        self.counts[stage] += 1
+        self.ns[stage] += ns
+
+    def lap(self, stage=None):
+        """
+        Time since the last lap, less any rendering in between, goes to
+        `stage`; lap() with no stage just starts the clock.
+        """
+        now, render = time.perf_counter_ns(), self.ns["render"]
+        if stage is not None:
+            self.counts[stage] += 1
+            self.ns[stage] += now - self._lap_ns - (render - self._lap_render)
+        self._lap_ns, self._lap_render = now, render
+
+    def merge(self, other):
+        for stage in self.STAGES:
+            self.counts[stage] += other.counts[stage]
+            self.ns[stage] += other.ns[stage]
+        return self
+
+    def wrap_listener(self, listener):
+        """listener, timed as the render stage."""
+        if listener is None:
+            return None
+        clock, add = time.perf_counter_ns, self.add
+        def timed(event):
+            start = clock()
+            listener(event)
+            add("render", clock() - start)
+        return timed
+
+    def report(self):
+        """{stage: {"count", "seconds", "mean_us"}}, ready for json.dump."""
+        return {stage: {"count": self.counts[stage], "seconds": self.ns[stage] / 1e9,
+                        "mean_us": self.ns[stage] / 1e3 / self.counts[stage] if self.counts[stage] else 0.0}
+                for stage in self.STAGES}
+
+    def folded(self, root="half_inning"):
+        """Collapsed-stack lines ("half_inning;pitch;strike 1234", in nanoseconds) for flamegraph tools."""
+        parent = {"baserunning": "plate_appearance", "render": "output", "policy": "batter"}
+        lines = []
+        for stage in self.STAGES:
+            if self.ns[stage]:
+                lines.append(f"{root};{parent.get(stage, 'pitch')};{stage} {self.ns[stage]}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path):
+        """Save as collapsed stacks if path ends in .folded, else as JSON."""
+        with open(path, "w", encoding="utf-8") as fh:
+            if path.endswith(".folded"):
+                fh.write(self.folded())
+            else:
+                json.dump(self.report(), fh, indent=2)
+                fh.write("\n")
 
-        # Single-out options
-        single = random.choice(["K", "ꓘ", f"F{user_pos_num}", random.choice(["6-3","5-3","4-3","1-3"]), random.choice(["CS 2-6","CS 2-4"])])
-        plays.append(single)
-        outs_left -= 1
+# ----------------------- Headless Engine -----------------------
 
-    return ", ".join(plays)
+# Plate-appearance outcomes, in the order the engine reports them
+PA_OUTCOMES = [
+    "k_looking", "k_swinging", "walk", "fly_out", "ground_out", "double_play",
+    "lineout", "ground_single", "single", "double", "triple", "homer",
+]
 
-def simulate_opponent_half_inning(user_pos_num):
-    opp_runs = random.choices([0, 1, 2, 3], weights=[45, 30, 18, 7], k=1)[0]
-    desc = defensive_play_notation_exact(user_pos_num)
-    return opp_runs, desc
+# Bases the batter takes on each hit
+HIT_BASES = {"ground_single": 1, "single": 1, "double": 2, "triple": 3, "homer": 4}
 
-# ----------------------- At-Bat Loop -----------------------
+# Base-out event for each outcome
+OUTCOME_BASE_EVENT = {
+    "k_looking": "out", "k_swinging": "out", "walk": "walk", "fly_out": "out",
+    "ground_out": "out", "double_play": "double_play", "lineout": "out",
+    "ground_single": "single", "single": "single", "double": "double",
+    "triple": "triple", "homer": "homer",
+}
 
-def play_ended(outs_added, batter_idx, reset_fn, outs, lineup, bases):
-    outs += outs_added
-    reset_fn()
-    batter_idx = (batter_idx + 1) % 9
-    return outs, batter_idx, outs < 3
+# outcome -> (transition row, outs added, is a hit)
+_PA_EFFECTS = {
+    outcome: (BASE_TRANSITIONS[event], BASE_EVENT_OUTS.get(event, 0), outcome in HIT_BASES)
+    for outcome, event in OUTCOME_BASE_EVENT.items()
+}
 
-def play_half_inning(lineup, batter_idx, user_name, base_user_side, current_pitcher, batter_sides, team_label, show_on_deck):
-    bases = [None, None, None]
-    hits = 0
-    runs = 0
-    outs = 0
-    state = {"balls": 0, "strikes": 0, "fouls": 0}
-
-    # determine starting side for user if switch
-    _, pitcher_side = current_pitcher
-    def default_side_for_switch(p_side):
-        return "L" if p_side == "R" else "R"
-
-    # per-AB user side (only matters when the user is up)
-    user_side_for_ab = base_user_side
-    if base_user_side == "S":
-        user_side_for_ab = default_side_for_switch(pitcher_side)
-
-    def reset(): reset_count(state)
-
-    # announce first batter
-    announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-    show_bases(bases)
-
-    while outs < 3:
-        batter_name = lineup[batter_idx]
-
-        # Use effective side: for user AB, use selected side; for others use listed bats
-        effective_side = batter_sides.get(batter_name, "R")
-        if batter_name == user_name and base_user_side == "S":
-            effective_side = user_side_for_ab
-
-        # Pitch comes in
-        pitch_type = random.choices(
-            population=["fastball", "slider", "curve", "changeup", "sinker"],
-            weights=[30, 25, 15, 15, 15],
-            k=1
-        )[0]
-        base_p = PITCH_TYPES[pitch_type]["strike_p"]
-        strike_p = count_adjusted_strike_p(base_p, state["balls"], state["strikes"])
-        strike_p = max(0.10, min(0.90, base_p + platoon_modifier(effective_side, pitcher_side)))
-        pitch_result = "strike" if random.random() < strike_p else "ball"
-
-        choice = input(f"⚾ {pitch_type.title()} — [s/t/q]{' (h=flip side)' if (batter_name==user_name and base_user_side=='S') else ''}: ").strip().lower()
-        # Optional side flip for switch-hitting user
-        if choice == "h" and batter_name == user_name and base_user_side == "S":
-            user_side_for_ab = "L" if user_side_for_ab == "R" else "R"
-            print(f"Switched hitting side for this AB → {user_side_for_ab}.")
-            continue
+_PITCH_CUM = list(accumulate(PITCH_MIX_WEIGHTS))
+_LAST_PITCH = len(PITCH_MIX) - 1
+_CONTACT_CUM = [list(accumulate(PITCH_TYPES[pt]["contact_weights"])) for pt in PITCH_MIX]
+_FLY_HIT_CUM = list(accumulate(FLY_HIT_WEIGHTS))
+_LINE_HIT_CUM = list(accumulate(LINE_HIT_WEIGHTS))
+_FOUL_P = [PITCH_TYPES[pt]["foul_on_strike_p"] for pt in PITCH_MIX]
+
+_SIDE_TABLES = {}
+
+def side_tables(pitcher_side):
+    """Per batter side: strike probability and swing threshold for each pitch in PITCH_MIX."""
+    tables = _SIDE_TABLES.get(pitcher_side)
+    if tables is None:
+        tables = {}
+        for side in ("L", "R", "S"):
+            tables[side] = (
+                [pitch_strike_p(pt, side, pitcher_side) for pt in PITCH_MIX],
+                [swing_threshold(pt, side, pitcher_side) for pt in PITCH_MIX],
+            )
+        _SIDE_TABLES[pitcher_side] = tables
+    return tables
+
+def matchup_tables(pitcher_side, batter_side, model=None):
+    """(strike_ps, thresholds, foul_ps) per pitch in PITCH_MIX for one matchup under a PitchModel (default: ours)."""
+    if model is None:
+        strike_ps, thresholds = side_tables(pitcher_side).get(batter_side, side_tables(pitcher_side)["R"])
+        return strike_ps, thresholds, _FOUL_P
+    return ([pitch_strike_p(pt, batter_side, pitcher_side, model.pitch_types) for pt in PITCH_MIX],
+            [swing_threshold(pt, batter_side, pitcher_side, model.swing_threshold) for pt in PITCH_MIX],
+            [model.pitch_types[pt]["foul_on_strike_p"] for pt in PITCH_MIX])
+
+def default_side_for_switch(pitcher_side):
+    return "L" if pitcher_side == "R" else "R"
+
+def simple_batter_policy(engine, pitch_type):
+    """Take on 3-0, swing at everything else."""
+    if engine.balls == 3 and engine.strikes == 0:
+        return "take"
+    return "swing"
+
+class HalfInningEngine:
+    """
+    One half-inning of the pitch model and baserunning, with no terminal I/O.
+
+    `policy(engine, pitch_type)` makes the batter's call on each pitch and
+    returns "swing", "take", "quit", or None to let the pitch go unplayed
+    (default: optimal_batter_policy). "wait" holds the pitch: step() returns without playing it, and the next
+    step() offers the same pitch to the policy again (for callers that have
+    to go and fetch the decision, like a prompt on a network connection).
+    Everything that happens is passed to `listener` as an event dict:
+      - {"event": "pitch", ...}     every pitch that is played; "call" is one of
+                                    ball, strike, foul, foul_two_strikes,
+                                    swinging_strike, in_play
+      - {"event": "play", ...}      the plate appearance is over
+      - {"event": "batter_up", ...} the next batter steps in
+      - {"event": "half_end", ...}  third out
+      - {"event": "pitching_change", ...} a new pitcher comes in
+      - {"event": "quit"}           the policy quit
+    `rng` is anything with random() and getrandbits() (default: the random module),
+    and the draws are made in the same order as the original interactive loop.
+    With a StageProfiler as `profiler`, step() laps its clock at each
+    stage and the listener is timed as rendering. `manager(engine)`, if
+    given, is asked before each plate appearance for the pitcher to face
+    the batter: a (name, hand) pitcher, or None to leave this one in.
+    """
 
-        if choice in ("s", "swing"):
-            pass  # proceed to swing branch
-        elif choice in ("t", "take"):
-            choice = "take"
-        elif choice in ("q", "quit"):
-            print("Practice over early. Head back to the clubhouse.")
-            return runs, hits, batter_idx, True
+    def __init__(self, lineup, batter_idx, current_pitcher, batter_sides, policy=None,
+                 rng=None, listener=None, user_name=None, base_user_side=None, profiler=None, manager=None):
+        self.lineup = lineup
+        self.batter_idx = batter_idx
+        self.current_pitcher = current_pitcher
+        self.batter_sides = batter_sides
+        self.policy = policy or optimal_batter_policy
+        self.rng = rng or random
+        self.listener = listener
+        self.user_name = user_name
+        self.base_user_side = base_user_side
+        self.manager = manager
+
+        self.bases = 0
+        self.balls = 0
+        self.strikes = 0
+        self.fouls = 0
+        self.outs = 0
+        self.runs = 0
+        self.hits = 0
+        self.done = False
+        self.quit = False
+        self.pitches = 0
+        self.pas = 0
+        self._held = None
+
+        self.profiler = profiler
+        if profiler is not None:
+            self.listener = profiler.wrap_listener(listener)
+
+        self._tables = side_tables(current_pitcher[1])
+        self._consult_manager()
+        self._new_batter()
+
+    # --- batter & side ---
+
+    def change_pitcher(self, pitcher):
+        """Bring in `pitcher` (name, hand); only between plate appearances."""
+        self.current_pitcher = pitcher
+        self._tables = side_tables(pitcher[1])
+        if self.listener is not None:
+            self.listener({"event": "pitching_change", "pitcher": pitcher[0], "hand": pitcher[1],
+                           "outs": self.outs, "bases": self.bases})
+
+    def _consult_manager(self):
+        if self.manager is not None:
+            pitcher = self.manager(self)
+            if pitcher is not None and pitcher != self.current_pitcher:
+                self.change_pitcher(pitcher)
+
+    def _new_batter(self):
+        self.batter_name = self.lineup[self.batter_idx]
+        self.user_side_for_ab = self.base_user_side
+        if self.base_user_side == "S":
+            self.user_side_for_ab = default_side_for_switch(self.current_pitcher[1])
+        self._set_side()
+
+    def _set_side(self):
+        side = self.batter_sides.get(self.batter_name, "R")
+        if self.batter_name == self.user_name and self.base_user_side == "S":
+            side = self.user_side_for_ab
+        self.effective_side = side
+        self._strike_p, self._threshold = self._tables.get(side, self._tables["R"])
+
+    def flip_side(self):
+        """Switch-hitting user flips sides for this AB. Returns the new side, or None."""
+        if self.batter_name != self.user_name or self.base_user_side != "S":
+            return None
+        self.user_side_for_ab = "L" if self.user_side_for_ab == "R" else "R"
+        self._set_side()
+        return self.user_side_for_ab
+
+    # --- snapshots ---
+
+    def snapshot(self):
+        """
+        Mid-half state as a tuple of small ints and the switch hitter's side:
+        batter_idx, bases, balls, strikes, fouls, outs, runs, hits, pitches,
+        pas, held pitch (-1, or pitch index * 2 + strike) and side for this AB.
+        """
+        held = -1 if self._held is None else self._held[0] * 2 + self._held[1]
+        return (self.batter_idx, self.bases, self.balls, self.strikes, self.fouls, self.outs, self.runs,
+                self.hits, self.pitches, self.pas, held, self.user_side_for_ab or "")
+
+    def restore(self, state):
+        """Pick the half-inning up from a snapshot() (the rng is restored separately)."""
+        (self.batter_idx, self.bases, self.balls, self.strikes, self.fouls, self.outs, self.runs,
+         self.hits, self.pitches, self.pas, held, side) = state
+        self._held = None if held < 0 else (held >> 1, bool(held & 1))
+        self.batter_name = self.lineup[self.batter_idx]
+        self.user_side_for_ab = side or self.base_user_side
+        self._set_side()
+        self.done = self.quit = False
+
+    # --- pitch loop ---
+
+    def step(self):
+        """Throw one pitch. Returns False once the half-inning is over."""
+        if self.done:
+            return False
+        rng, prof = self.rng, self.profiler
+        if prof is not None:
+            prof.lap()
+        if self._held is None:
+            pi = bisect(_PITCH_CUM, rng.random() * _PITCH_CUM[-1], 0, _LAST_PITCH)
+            if prof is not None:
+                prof.lap("pitch_type")
+            strike = rng.random() < self._strike_p[pi]
+            if prof is not None:
+                prof.lap("strike")
         else:
-            print("Type s (swing), t (take), or q (quit).")
+            (pi, strike), self._held = self._held, None
+        pitch_type = PITCH_MIX[pi]
+
+        decision = self.policy(self, pitch_type)
+        if prof is not None:
+            prof.lap("policy")
+        if decision is None:
+            return True
+        if decision == "wait":
+            self._held = pi, strike
+            return True
+        if decision == "quit":
+            self.done = self.quit = True
+            if self.listener is not None:
+                self.listener({"event": "quit"})
+            return False
+
+        if decision == "take":
+            if strike:
+                self.strikes += 1
+                self._pitch(pitch_type, "strike")
+                if self.strikes == 3:
+                    self._end_pa("k_looking")
+            else:
+                self.balls += 1
+                self._pitch(pitch_type, "ball")
+                if self.balls == 4:
+                    self._end_pa("walk")
+            return not self.done
+
+        # swing
+        foul = strike and rng.random() < _FOUL_P[pi]
+        if prof is not None:
+            prof.lap("foul")
+        if foul:
+            self.fouls += 1
+            if self.strikes < 2:
+                self.strikes += 1
+                self._pitch(pitch_type, "foul")
+            else:
+                self._pitch(pitch_type, "foul_two_strikes")
+            return True
+
+        # same draws as random.randint(1, 10)
+        r = rng.getrandbits(4)
+        while r >= 10:
+            r = rng.getrandbits(4)
+        if not (strike and r + 1 >= self._threshold[pi]):
+            if prof is not None:
+                prof.lap("contact")
+            self.strikes += 1
+            self._pitch(pitch_type, "swinging_strike")
+            if self.strikes == 3:
+                self._end_pa("k_swinging")
+            return not self.done
+
+        self._pitch(pitch_type, "in_play")
+        contact = bisect(_CONTACT_CUM[pi], rng.random() * _CONTACT_CUM[pi][2], 0, 2)
+        if prof is not None:
+            prof.lap("contact")
+        if contact == 0:    # fly
+            if rng.random() < FLY_OUT_P:
+                outcome = "fly_out"
+            else:
+                outcome = HIT_TYPES[bisect(_FLY_HIT_CUM, rng.random() * _FLY_HIT_CUM[2], 0, 2)]
+                if rng.random() < HOMER_UPGRADE_P:
+                    outcome = "homer"
+        elif contact == 1:  # ground
+            if rng.random() < GROUND_DP_P and self.bases & 1 and self.outs <= 1:
+                outcome = "double_play"
+            elif rng.random() < GROUND_SINGLE_P:
+                outcome = "ground_single"
+            else:
+                outcome = "ground_out"
+        else:               # line
+            if rng.random() < LINEOUT_P:
+                outcome = "lineout"
+            else:
+                outcome = HIT_TYPES[bisect(_LINE_HIT_CUM, rng.random() * _LINE_HIT_CUM[2], 0, 2)]
+                if rng.random() < HOMER_UPGRADE_P:
+                    outcome = "homer"
+        if prof is not None:
+            prof.lap("hit_type")
+        self._end_pa(outcome)
+        return not self.done
+
+    def run(self):
+        """Play pitches until the third out (or a quit)."""
+        step = self.step
+        while step():
+            pass
+        return self.runs, self.hits, self.batter_idx, self.quit
+
+    # --- bookkeeping ---
+
+    def _pitch(self, pitch_type, call):
+        self.pitches += 1
+        if self.listener is not None:
+            self.listener({"event": "pitch", "pitch": pitch_type, "call": call,
+                           "batter": self.batter_name, "balls": self.balls,
+                           "strikes": self.strikes, "fouls": self.fouls})
+
+    def _end_pa(self, outcome):
+        prof = self.profiler
+        if prof is not None:
+            prof.lap()
+        batter = self.batter_name
+        row, outs_added, is_hit = _PA_EFFECTS[outcome]
+        self.bases, scored = row[self.bases]
+        self.runs += scored
+        self.outs += outs_added
+        self.hits += is_hit
+        self.pas += 1
+        self.balls = self.strikes = self.fouls = 0
+        self.batter_idx = (self.batter_idx + 1) % 9
+
+        listener = self.listener
+        if listener is not None:
+            listener({"event": "play", "outcome": outcome, "batter": batter,
+                      "scored": scored, "runs": self.runs, "hits": self.hits,
+                      "outs": self.outs, "bases": self.bases})
+        if self.outs >= 3:
+            self.done = True
+            if listener is not None:
+                listener({"event": "half_end", "runs": self.runs, "hits": self.hits, "outs": self.outs})
+        else:
+            self._consult_manager()
+            self._new_batter()
+            if listener is not None:
+                listener({"event": "batter_up", "batter": self.batter_name,
+                          "batter_idx": self.batter_idx, "side": self.effective_side})
+        if prof is not None:
+            prof.lap("baserunning")
+
+def run_half_inning(lineup, batter_idx, current_pitcher, batter_sides, policy=None,
+                    rng=None, listener=None, user_name=None, base_user_side=None, profiler=None, manager=None):
+    """Headless play_half_inning. Returns (runs, hits, next batter_idx, quit)."""
+    engine = HalfInningEngine(lineup, batter_idx, current_pitcher, batter_sides, policy=policy,
+                              rng=rng, listener=listener, user_name=user_name,
+                              base_user_side=base_user_side, profiler=profiler, manager=manager)
+    return engine.run()
+
+# ----------------------- Opponent Half-Innings -----------------------
+
+# Scorebook marks per engine outcome; outs in play name the fielders, drawn by weight
+PLAY_MARKS = {
+    "k_looking": K_LOOK, "k_swinging": K_SWING, "walk": "BB", "ground_single": "1B",
+    "single": "1B", "double": "2B", "triple": "3B", "homer": "HR",
+}
+OUT_MARKS = {
+    "fly_out":     (["F7", "F8", "F9", "F4", "F5", "F6", "F3"], [22, 28, 22, 8, 7, 8, 5]),
+    "lineout":     (["L6", "L4", "L5", "L3", "L1", "L7", "L8", "L9"], [20, 20, 15, 15, 5, 8, 9, 8]),
+    "ground_out":  (["6-3", "4-3", "5-3", "1-3", "3U"], [30, 30, 25, 5, 10]),
+    "double_play": (["6-4-3 DP", "4-6-3 DP", "5-4-3 DP", "3-6-3 DP"], [40, 30, 20, 10]),
+}
+_OUT_MARK_CUMS = {outcome: (marks, list(accumulate(weights))) for outcome, (marks, weights) in OUT_MARKS.items()}
+
+def play_notation(outcome, scored=0, rng=None):
+    """Scorebook entry for one plate appearance, with any runs that scored on it."""
+    marks = _OUT_MARK_CUMS.get(outcome)
+    if marks is None:
+        mark = PLAY_MARKS[outcome]
+    else:
+        mark = (rng or random).choices(marks[0], cum_weights=marks[1])[0]
+    return f"{mark} ({scored} R)" if scored else mark
+
+def simulate_opponent_half_inning(lineup, batter_idx, current_pitcher, batter_sides, policy=None, rng=None,
+                                  listener=None):
+    """
+    Opponent half-inning on the headless engine. Returns (runs, hits, next
+    batter_idx, notation), where notation is the scorebook line of the plate
+    appearances that actually happened, e.g. "K, 1B, HR (2 R), F8, 6-4-3 DP".
+    listener, if given, also receives the engine's events.
+    """
+    rng = rng or random
+    plays = []
+    def record(ev):
+        if listener is not None:
+            listener(ev)
+        if ev["event"] == "play":
+            plays.append((ev["outcome"], ev["scored"]))
+    runs, hits, batter_idx, _ = run_half_inning(lineup, batter_idx, current_pitcher, batter_sides,
+                                                policy=policy, rng=rng, listener=record)
+    return runs, hits, batter_idx, ", ".join([play_notation(o, scored, rng) for o, scored in plays])
+
+# ----------------------- Plate-Appearance Distributions -----------------------
+
+# Every pitcher hand / batter side pairing a count-based policy can see
+SIDE_MATCHUPS = [(p, b) for p in ("L", "R") for b in ("L", "R", "S")]
+
+class _Count:
+    """Just the count and the matchup, for tabulating count-based policies."""
+    def __init__(self, balls, strikes, pitcher_side="R", batter_side="R"):
+        self.balls = balls
+        self.strikes = strikes
+        self.current_pitcher = (None, pitcher_side)
+        self.effective_side = batter_side
+
+def policy_table(policy, pitcher_side="R", batter_side="R"):
+    """
+    swing[balls][strikes][pitch index in PITCH_MIX] for a count-based policy.
+    The policy is handed an object with only `balls`, `strikes`,
+    `current_pitcher` (its hand) and `effective_side`.
+    """
+    return [[[policy(_Count(b, s, pitcher_side, batter_side), pt) == "swing" for pt in PITCH_MIX]
+             for s in range(3)] for b in range(4)]
+
+def _contact_outcomes(pitch_type, dp_possible, model=None):
+    """P(outcome | ball in play) for one pitch type."""
+    model = model or DEFAULT_PITCH_MODEL
+    out = dict.fromkeys(PA_OUTCOMES, 0.0)
+    weights = model.pitch_types[pitch_type]["contact_weights"]
+    fly, ground, line = (w / sum(weights) for w in weights)
+    for contact_p, out_name, out_p, hit_weights in ((fly, "fly_out", model.fly_out_p, FLY_HIT_WEIGHTS),
+                                                    (line, "lineout", model.lineout_p, LINE_HIT_WEIGHTS)):
+        out[out_name] += contact_p * out_p
+        hit_p = contact_p * (1 - out_p)
+        for hit, w in zip(HIT_TYPES, hit_weights):
+            out[hit] += hit_p * w / sum(hit_weights) * (1 - model.homer_p)
+        out["homer"] += hit_p * model.homer_p
+    dp = model.ground_dp_p if dp_possible else 0.0
+    out["double_play"] += ground * dp
+    out["ground_single"] += ground * (1 - dp) * model.ground_single_p
+    out["ground_out"] += ground * (1 - dp) * (1 - model.ground_single_p)
+    return out
+
+_PA_DISTRIBUTIONS = {}
+
+def pa_outcome_distribution(policy, pitcher_side, batter_side, dp_possible=False):
+    """
+    Exact probability of every PA outcome ({outcome: p} over PA_OUTCOMES) for a
+    count-based policy, solved over the (balls, strikes) chain with the foul
+    self-loop at two strikes. dp_possible: a runner on 1st with fewer than two
+    outs, so grounders can turn two. Memoized per key.
+    """
+    key = (policy, pitcher_side, batter_side, dp_possible)
+    dist = _PA_DISTRIBUTIONS.get(key)
+    if dist is None:
+        swing = policy_table(policy, pitcher_side, batter_side)
+        dist = _PA_DISTRIBUTIONS[key] = _count_chain(swing, pitcher_side, batter_side, dp_possible)
+    return dist
+
+def _count_chain(swing, pitcher_side, batter_side, dp_possible, model=None):
+    """pa_outcome_distribution for a swing[balls][strikes][pitch] table (under model, a PitchModel)."""
+    strike_ps, thresholds, foul_ps = matchup_tables(pitcher_side, batter_side, model)
+    total_w = float(sum(PITCH_MIX_WEIGHTS))
+    contact = [_contact_outcomes(pt, dp_possible, model) for pt in PITCH_MIX]
+
+    dist = dict.fromkeys(PA_OUTCOMES, 0.0)
+    reach = [[0.0] * 3 for _ in range(4)]
+    reach[0][0] = 1.0
+    # states in order of pitches thrown; only the two-strike foul loops back
+    for b, s in sorted(((b, s) for b in range(4) for s in range(3)), key=sum):
+        mass = reach[b][s]
+        if not mass:
             continue
+        to_ball = to_strike = k_look = k_swing = loop = 0.0
+        in_play = dict.fromkeys(PA_OUTCOMES, 0.0)
+        for pi, pt in enumerate(PITCH_MIX):
+            w = PITCH_MIX_WEIGHTS[pi] / total_w
+            p = strike_ps[pi]
+            if not swing[b][s][pi]:
+                to_ball += w * (1 - p)
+                if s < 2: to_strike += w * p
+                else:     k_look += w * p
+                continue
+            foul = p * foul_ps[pi]
+            q = min(1.0, max(0.0, (11 - thresholds[pi]) / 10))
+            contact_p = (p - foul) * q
+            whiff = 1 - foul - contact_p
+            if s < 2: to_strike += w * (foul + whiff)
+            else:     loop += w * foul; k_swing += w * whiff
+            for outcome, cp in contact[pi].items():
+                in_play[outcome] += w * contact_p * cp
+        mass /= (1 - loop)
+        if b < 3: reach[b + 1][s] += mass * to_ball
+        else:     dist["walk"] += mass * to_ball
+        if s < 2: reach[b][s + 1] += mass * to_strike
+        dist["k_looking"] += mass * k_look
+        dist["k_swinging"] += mass * k_swing
+        for outcome, p in in_play.items():
+            dist[outcome] += mass * p
+    return dist
+
+_PA_CUMS = {}
+
+def _pa_cum(policy, pitcher_side, batter_side, dp_possible):
+    key = (policy, pitcher_side, batter_side, dp_possible)
+    cum = _PA_CUMS.get(key)
+    if cum is None:
+        dist = pa_outcome_distribution(policy, pitcher_side, batter_side, dp_possible)
+        cum = _PA_CUMS[key] = list(accumulate(dist[o] for o in PA_OUTCOMES))
+    return cum
+
+def run_half_inning_pa(lineup, batter_idx, current_pitcher, batter_sides, policy=None, rng=None,
+                       stop_above=None):
+    """
+    Fast run_half_inning: one draw per plate appearance from the exact PA
+    distribution instead of pitch by pitch (no events, no pitch counts).
+    With stop_above, the half ends as soon as more runs than that are in
+    (a walk-off). Returns (runs, hits, next batter_idx).
+    """
+    policy = policy or optimal_batter_policy
+    rng = rng or random
+    pitcher_side = current_pitcher[1]
+    bases = outs = runs = hits = 0
+    if stop_above is None:
+        stop_above = float("inf")
+    while outs < 3 and runs <= stop_above:
+        side = batter_sides.get(lineup[batter_idx], "R")
+        cum = _pa_cum(policy, pitcher_side, side, (bases & 1) == 1 and outs <= 1)
+        outcome = PA_OUTCOMES[bisect(cum, rng.random() * cum[-1], 0, len(cum) - 1)]
+        row, outs_added, is_hit = _PA_EFFECTS[outcome]
+        bases, scored = row[bases]
+        runs += scored
+        outs += outs_added
+        hits += is_hit
+        batter_idx = (batter_idx + 1) % 9
+    return runs, hits, batter_idx
+
+def simulate_game(home, away, rng=None, policy=None, innings=9, pitchers=None, profiler=None, recorder=None,
+                  bullpen=None, fast=False):
+    """
+    Headless full game. home/away are dicts with "lineup" and "batter_sides";
+    each side gets a staff from choose_staff (drawn from `pitchers`), and
+    pitches by current_pitcher_for_inning unless `bullpen` is given:
+    bullpen(staff, opposing team, fielding at home, pitchers) returns a
+    manager for that side (e.g. show_bullpen.BullpenManager), called as
+    manager(engine, inning, lead) before every plate appearance and
+    holding the pitcher in the game as `current`. The bottom of the last inning
+    is skipped when the home team leads, extra innings are played while tied,
+    and a walk-off ends the game as soon as the home team goes ahead.
+    Returns line scores, hits, staffs and innings played. A StageProfiler
+    passed as `profiler` collects stage timings for every half-inning, and
+    `recorder.half(inning, bottom, pitcher)` (e.g. a show_log.GameRecorder)
+    supplies each half's event listener. fast=True plays every half with
+    run_half_inning_pa, a draw per plate appearance from the exact PA
+    distributions: the same game model several times faster, but with no
+    pitches, so no profiler, recorder or bullpen (ValueError).
+    """
+    if fast and (profiler is not None or recorder is not None or bullpen is not None):
+        raise ValueError("fast=True plays no pitches: no profiler, recorder or bullpen")
+    rng = rng or random
+    home_staff = choose_staff(rng, pitchers)
+    away_staff = choose_staff(rng, pitchers)
+    home_pen = bullpen and bullpen(home_staff, away, True, pitchers)
+    away_pen = bullpen and bullpen(away_staff, home, False, pitchers)
+    home_line, away_line = [], []
+    home_hits = away_hits = 0
+    home_idx = away_idx = 0
+    inning = 1
+    while True:
+        manager = None
+        if home_pen:
+            pitcher = home_pen.current
+            manager = lambda engine: home_pen(engine, inning, sum(home_line) - sum(away_line) - engine.runs)
+        else:
+            pitcher = current_pitcher_for_inning(home_staff, inning)
+        if fast:
+            runs, hits, away_idx = run_half_inning_pa(away["lineup"], away_idx, pitcher, away["batter_sides"],
+                                                      policy=policy, rng=rng)
+        else:
+            runs, hits, away_idx, _ = run_half_inning(away["lineup"], away_idx, pitcher, away["batter_sides"],
+                                                      policy=policy, rng=rng, profiler=profiler, manager=manager,
+                                                      listener=recorder and recorder.half(inning, False, pitcher))
+        away_line.append(runs); away_hits += hits
+        if inning >= innings and sum(home_line) > sum(away_line):
+            break
 
-        if choice == "take":
-            if pitch_result == "ball":
-                state["balls"] += 1
-                print(f"Ball {state['balls']} 🔔  Count: {count_string(state)}")
-                if state["balls"] == 4:
-                    print("Walk. Take your base. 🧱")
-                    scored = force_advance_on_walk(bases, batter_name)
-                    runs += scored
-                    if scored:
-                        print(f"Runs: +{scored}  |  {team_label} this half: {runs}")
-                    show_bases(bases)
-                    outs, batter_idx, ann = play_ended(0, batter_idx, reset, outs, lineup, bases)
-                    if ann:
-                        # new AB: re-evaluate default side vs current pitcher
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
+        manager = None
+        if away_pen:
+            pitcher = away_pen.current
+            manager = lambda engine: away_pen(engine, inning, sum(away_line) - sum(home_line) - engine.runs)
+        else:
+            pitcher = current_pitcher_for_inning(away_staff, inning)
+        deficit = sum(away_line) - sum(home_line) if inning >= innings else None
+        if fast:
+            runs, hits, home_idx = run_half_inning_pa(home["lineup"], home_idx, pitcher, home["batter_sides"],
+                                                      policy=policy, rng=rng, stop_above=deficit)
+        else:
+            engine = HalfInningEngine(home["lineup"], home_idx, pitcher, home["batter_sides"],
+                                      policy=policy, rng=rng, profiler=profiler, manager=manager,
+                                      listener=recorder and recorder.half(inning, True, pitcher))
+            if deficit is not None:
+                while engine.step() and engine.runs <= deficit:
+                    pass
             else:
-                state["strikes"] += 1
-                print(f"Strike {state['strikes']} 🎯  Count: {count_string(state)}")
-                if state["strikes"] == 3:
-                    print(f"Strikeout looking {K_LOOK}.")
-                    outs, batter_idx, ann = play_ended(1, batter_idx, reset, outs, lineup, bases)
-                    print(f"Outs: {outs}")
-                    if ann:
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
-            continue
+                engine.run()
+            runs, hits, home_idx = engine.runs, engine.hits, engine.batter_idx
+        home_line.append(runs); home_hits += hits
+        if inning >= innings and sum(home_line) != sum(away_line):
+            break
+        inning += 1
 
-        # swing branch
-        foul_on_strike_p = PITCH_TYPES[pitch_type]["foul_on_strike_p"]
-        foul = (pitch_result == "strike" and random.random() < foul_on_strike_p)
+    return {"home_line": home_line, "away_line": away_line,
+            "home_hits": home_hits, "away_hits": away_hits,
+            "home_staff": home_staff, "away_staff": away_staff, "innings": inning}
 
-        if foul:
-            state["fouls"] += 1
-            if state["strikes"] < 2:
-                state["strikes"] += 1
-                print(f"Foul ball. Strike {state['strikes']} ⚠️  Fouls: {state['fouls']}  Count: {count_string(state)}")
-            else:
-                print(f"Foul ball. Still two strikes. ⚠️  Fouls: {state['fouls']}  Count: {count_string(state)}")
-            continue
+# ----------------------- Lineup Optimizer -----------------------
 
-        base_threshold = 6
-        if pitch_type in ("slider", "curve"): base_threshold += 1
-        if pitch_type == "sinker": base_threshold += 1
-        if platoon_modifier(effective_side, pitcher_side) > 0: base_threshold -= 1
-
-        swing_roll = random.randint(1, 10)
-        if pitch_result == "strike" and swing_roll >= base_threshold:
-            weights = PITCH_TYPES[pitch_type]["contact_weights"]
-            contact = random.choices(["fly", "ground", "line"], weights=weights, k=1)[0]
-
-            if contact == "fly":
-                if random.random() < 0.55:
-                    print("Fly out. 🪁")
-                    outs, batter_idx, ann = play_ended(1, batter_idx, reset, outs, lineup, bases)
-                    if ann:
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
-                    continue
-                hit_type = random.choices(["single", "double", "triple"], weights=[35, 50, 15], k=1)[0]
-
-            elif contact == "ground":
-                turn_two = random.random() < 0.10 and bases[0] and outs <= 1  # DP requires runner on 1st
-                if turn_two:
-                    print("Ground ball. 6-4-3 double play. 🧱🧱")
-                    dp_runs = double_play_643(bases)
-                    runs += dp_runs
-                    outs, batter_idx, ann = play_ended(2, batter_idx, reset, outs, lineup, bases)
-                    if ann:
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
-                    continue
-                if random.random() < 0.35:
-                    scored = advance_bases(bases, batter_name, 1)
-                    hits += 1
-                    print("Ground-ball single through the infield. 🟩")
-                    runs += scored
-                    if scored:
-                        print(f"Runs: +{scored}  |  {team_label} this half: {runs}")
-                    show_bases(bases)
-                    outs, batter_idx, ann = play_ended(0, batter_idx, reset, outs, lineup, bases)
-                    if ann:
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
+def _half_inning_from_each_slot(sides, pitcher_side, policy):
+    """
+    Exact half-inning for a batting order given as the hitters' sides: for
+    each leadoff slot, (expected runs, distribution of next half's leadoff slot).
+    Solved backwards like rest_of_half_runs, over (outs, bases, batter up).
+    Within an outs level only hits and walks link the states, and the nine
+    batters form a cycle, so sweeping from the ninth back to the first is
+    off only by the chance of nine straight batters reaching (under 1e-3):
+    a few sweeps settle it.
+    """
+    # per (side, outs, bases): runs scored on the play, P(it ends the half),
+    # and (outs, bases, p) for every state it can lead to, merged
+    moves = {}
+    for side in set(sides):
+        for dp in (False, True):
+            dist = pa_outcome_distribution(policy, pitcher_side, side, dp)
+            for outs in range(3):
+                if dp and outs > 1:
                     continue
-                print("Ground out. 🧤")
-                outs, batter_idx, ann = play_ended(1, batter_idx, reset, outs, lineup, bases)
-                if ann:
-                    user_side_for_ab = base_user_side
-                    if base_user_side == "S":
-                        user_side_for_ab = default_side_for_switch(pitcher_side)
-                    announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                    show_bases(bases)
-                continue
+                for b in range(8):
+                    if ((b & 1) == 1 and outs <= 1) != dp:
+                        continue
+                    scored = ended = 0.0
+                    to = {}
+                    for outcome, p in dist.items():
+                        if not p:
+                            continue
+                        row, outs_added, _ = _PA_EFFECTS[outcome]
+                        nb, r = row[b]
+                        scored += p * r
+                        if outs + outs_added >= 3:
+                            ended += p
+                        else:
+                            key = (outs + outs_added, nb)
+                            to[key] = to.get(key, 0.0) + p
+                    moves[(side, outs, b)] = (scored, ended, [(o, nb, p) for (o, nb), p in to.items()])
+    # runs[outs][bases][slot] and lead[outs][bases][slot][j]: expected runs
+    # from here to the third out, and P(slot j leads off the next half)
+    runs = [[[0.0] * 9 for _ in range(8)] for _ in range(3)]
+    lead = [[[[0.0] * 9 for _ in range(9)] for _ in range(8)] for _ in range(3)]
+    for outs in (2, 1, 0):
+        runs_o, lead_o = runs[outs], lead[outs]
+        for _ in range(1000):
+            change = 0.0
+            for slot in range(8, -1, -1):
+                up = (slot + 1) % 9
+                side = sides[slot]
+                for b in range(8):
+                    e, ended, to = moves[(side, outs, b)]
+                    n = [0.0] * 9
+                    n[up] = ended
+                    for o, nb, p in to:
+                        e += p * runs[o][nb][up]
+                        n = [x + p * y for x, y in zip(n, lead[o][nb][up])]
+                    # lead converges with runs: both only wait on the wrap-around past the ninth batter
+                    change = max(change, abs(e - runs_o[b][slot]))
+                    runs_o[b][slot] = e
+                    lead_o[b][slot] = n
+            if change < 1e-9:   # what is left is this times the wrap-around chance
+                break
+    return [(runs[0][0][start], lead[0][0][start]) for start in range(9)]
 
-            else:  # line
-                if random.random() < 0.20:
-                    print("Lineout. 📐")
-                    outs, batter_idx, ann = play_ended(1, batter_idx, reset, outs, lineup, bases)
-                    if ann:
-                        user_side_for_ab = base_user_side
-                        if base_user_side == "S":
-                            user_side_for_ab = default_side_for_switch(pitcher_side)
-                        announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                        show_bases(bases)
+@lru_cache(maxsize=8192)
+def lineup_expected_runs(sides, pitcher_sides=None, policy=None, leadoff=0):
+    """
+    Exact expected runs over nine innings for a batting order given as a
+    tuple of hitters' sides, with slot `leadoff` (0-based) up first.
+    pitcher_sides is the opposing hand for each inning (None: the league
+    mix of pitchers, one hand for the whole game). Cached per (sides,
+    pitcher_sides, policy, leadoff), so orders that only differ by swapping
+    same-side hitters are evaluated once.
+    """
+    policy = policy or optimal_batter_policy
+    if pitcher_sides is None:
+        return sum(w * lineup_expected_runs(sides, (side,) * 9, policy, leadoff)
+                   for side, w in league_side_mix()[1].items() if w)
+    tables = {ps: _half_inning_from_each_slot(sides, ps, policy) for ps in set(pitcher_sides)}
+    lead = [0.0] * 9
+    lead[leadoff] = 1.0
+    total = 0.0
+    for ps in pitcher_sides:
+        nxt = [0.0] * 9
+        for slot, m in enumerate(lead):
+            if m:
+                exp_runs, next_lead = tables[ps][slot]
+                total += m * exp_runs
+                for j, q in enumerate(next_lead):
+                    nxt[j] += m * q
+        lead = nxt
+    return total
+
+def _lineup_runs_job(args):
+    return lineup_expected_runs(*args)
+
+def optimize_batting_order(defense, user_name, user_spot, batter_sides, pitcher_sides=None,
+                           policy=None, workers=1, restarts=0, seed=0, registry=None, leadoff=0):
+    """
+    Batting order with the most expected runs per game, for a game whose
+    first batter is slot `leadoff` (0-based): pairwise-swap local search from
+    build_batting_order_realistic, plus `restarts` seeded random restarts.
+    Orders are scored by lineup_expected_runs, which sees only each hitter's
+    side against the opposing hands, not player ratings: the search picks
+    where lefties, righties and switch hitters bat, and same-side hitters
+    then keep their places relative to each other from the realistic
+    (role-based) order, so the leadoff man still leads off among them.
+    The user stays in user_spot; ties keep the realistic order.
+    workers > 1 scores each swap neighbourhood on a process pool.
+    Returns (lineup, expected runs).
+    """
+    start = build_batting_order_realistic(defense, user_name, user_spot, batter_sides, registry)
+    pinned = {start.index(user_name)} if user_name in start else set()
+    free = [i for i in range(9) if i not in pinned]
+    pitcher_sides = tuple(pitcher_sides) if pitcher_sides is not None else None
+    rng = random.Random(seed)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+
+    def sides_of(lineup):
+        return tuple(batter_sides.get(n, "R") for n in lineup)
+
+    def score_all(lineups):
+        jobs = [(sides_of(l), pitcher_sides, policy, leadoff) for l in lineups]
+        if pool is None:
+            return [lineup_expected_runs(*job) for job in jobs]
+        return list(pool.map(_lineup_runs_job, jobs))
+
+    def local_search(lineup):
+        value = score_all([lineup])[0]
+        while True:
+            moves = []
+            for a, i in enumerate(free):
+                for j in free[a + 1:]:
+                    if batter_sides.get(lineup[i], "R") != batter_sides.get(lineup[j], "R"):
+                        cand = list(lineup)
+                        cand[i], cand[j] = cand[j], cand[i]
+                        moves.append(cand)
+            if not moves:
+                return lineup, value
+            scores = score_all(moves)
+            best = max(range(len(moves)), key=scores.__getitem__)
+            if scores[best] <= value + 1e-9:
+                return lineup, value
+            lineup, value = moves[best], scores[best]
+
+    try:
+        best, best_value = local_search(start)
+        for _ in range(restarts):
+            cand = list(start)
+            shuffled = [cand[i] for i in free]
+            rng.shuffle(shuffled)
+            for i, name in zip(free, shuffled):
+                cand[i] = name
+            cand, value = local_search(cand)
+            if value > best_value + 1e-9:
+                best, best_value = cand, value
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # same side pattern (so the same expected runs), same-side hitters in realistic order
+    by_side = {}
+    for i in free:
+        by_side.setdefault(batter_sides.get(start[i], "R"), []).append(start[i])
+    order = list(best)
+    for i in free:
+        order[i] = by_side[batter_sides.get(best[i], "R")].pop(0)
+    return order, best_value
+
+# ----------------------- Run Expectancy & Win Probability -----------------------
+
+# Disk cache for tables derived from the model (override with THE_SHOW_CACHE)
+CACHE_DIR = os.environ.get("THE_SHOW_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "the_show")
+
+TABLES_VERSION = 2
+MAX_RUNS = 20    # rest-of-half run distributions lump everything above this here
+MAX_LEAD = 15    # score differentials are clamped to +/- this
+HALVES = ("top", "bottom")
+
+def league_side_mix():
+    """Share of hitters batting L/R/S in the pools and of pitchers throwing L/R."""
+    hitters = [bats for pool in (MLB_POSITION_POOL, BENCH_POSITION_POOL)
+               for players in pool.values() for _, bats in players]
+    throws = [t for _, t, _ in PITCHERS]
+    return ({s: hitters.count(s) / len(hitters) for s in ("L", "R", "S")},
+            {t: throws.count(t) / len(throws) for t in ("L", "R")})
+
+def league_pa_distribution(policy, dp_possible):
+    """PA outcome probabilities for a league-average matchup."""
+    hitter_mix, pitcher_mix = league_side_mix()
+    dist = dict.fromkeys(PA_OUTCOMES, 0.0)
+    for p_side, pw in pitcher_mix.items():
+        for b_side, bw in hitter_mix.items():
+            for outcome, p in pa_outcome_distribution(policy, p_side, b_side, dp_possible).items():
+                dist[outcome] += pw * bw * p
+    return dist
+
+def model_hash(policy):
+    """Hash of everything the derived tables depend on."""
+    model = repr((TABLES_VERSION, PITCH_TYPES, PITCH_MIX, PITCH_MIX_WEIGHTS,
+                  FLY_OUT_P, FLY_HIT_WEIGHTS, GROUND_DP_P, GROUND_SINGLE_P, LINEOUT_P,
+                  LINE_HIT_WEIGHTS, HOMER_UPGRADE_P, SWING_THRESHOLD, BASE_TRANSITIONS,
+                  sorted(league_side_mix()[0].items()), sorted(league_side_mix()[1].items()),
+                  [policy_table(policy, p, b) for p, b in SIDE_MATCHUPS]))
+    return hashlib.sha256(model.encode("utf-8")).digest()[:16]
+
+def rest_of_half_runs(pa_dists):
+    """
+    f[outs][bases][k] = P(k more runs this half-inning), from PA outcome
+    distributions keyed by whether a double play is possible.
+    """
+    K = MAX_RUNS
+    f = [[[0.0] * (K + 1) for _ in range(8)] for _ in range(3)]
+    for outs in (2, 1, 0):
+        for _ in range(10000):
+            change = 0.0
+            for b in range(8):
+                new = [0.0] * (K + 1)
+                for outcome, p in pa_dists[(b & 1) == 1 and outs <= 1].items():
+                    if not p:
+                        continue
+                    row, outs_added, _ = _PA_EFFECTS[outcome]
+                    nb, r = row[b]
+                    if outs + outs_added >= 3:
+                        new[min(r, K)] += p
+                        continue
+                    for k, q in enumerate(f[outs + outs_added][nb]):
+                        if q:
+                            new[min(k + r, K)] += p * q
+                change = max(change, max(abs(x - y) for x, y in zip(new, f[outs][b])))
+                f[outs][b] = new
+            if change < 1e-14:
+                break
+    return f
+
+def _build_expectancy_tables(policy):
+    f = rest_of_half_runs({dp: league_pa_distribution(policy, dp) for dp in (False, True)})
+    re24 = [sum(k * q for k, q in enumerate(f[outs][b])) for outs in range(3) for b in range(8)]
+
+    K = MAX_RUNS
+    start = f[0][0]
+    # tied extra inning: home wins if it outscores the top half, replays on a tie
+    tied_extra = (sum(start[a] * sum(start[a + 1:]) for a in range(K + 1))
+                  / (1 - sum(q * q for q in start)))
+    # the interactive game stops after nine and a tie is not a win
+    return array("f", re24), _win_table(f, tied_extra), _win_table(f, 0.0)
+
+def _win_table(f, tied_after_nine):
+    """P(home wins) by state, flattened, worth `tied_after_nine` when nine innings end level."""
+    D = MAX_LEAD
+    clamp = lambda d: max(-D, min(D, d))
+    wp = {}   # (inning, half) -> [outs][bases][d + D]
+    for inning in range(9, 0, -1):
+        def after_bottom(d):
+            if inning >= 9:
+                return 1.0 if d > 0 else 0.0 if d < 0 else tied_after_nine
+            return wp[(inning + 1, 0)][0][0][clamp(d) + D]
+        bottom = [[[sum(q * after_bottom(d + k) for k, q in enumerate(f[outs][b]))
+                    for d in range(-D, D + 1)] for b in range(8)] for outs in range(3)]
+        wp[(inning, 1)] = bottom
+
+        def after_top(d):
+            if inning >= 9 and d > 0:
+                return 1.0
+            return bottom[0][0][clamp(d) + D]
+        wp[(inning, 0)] = [[[sum(q * after_top(d - k) for k, q in enumerate(f[outs][b]))
+                             for d in range(-D, D + 1)] for b in range(8)] for outs in range(3)]
+
+    return array("f", [x for inning in range(1, 10) for half in (0, 1)
+                       for outs in wp[(inning, half)] for row in outs for x in row])
+
+_EXPECTANCY = {}
+
+def expectancy_tables(policy=None):
+    """
+    (re24, wp, wp_nine) as float32 arrays, built once per model and cached on disk in
+    CACHE_DIR under the model hash (loaded once per process and policy). re24 is indexed [outs * 8 + bases]; wp is
+    P(home wins) indexed [inning 1-9][half][outs][bases][diff + MAX_LEAD], with
+    extra innings while tied, and wp_nine the same when nine innings end the game.
+    """
+    policy = policy or optimal_batter_policy
+    tables = _EXPECTANCY.get(policy)
+    if tables is not None:
+        return tables
+    key = model_hash(policy)
+
+    path = os.path.join(CACHE_DIR, f"expectancy-{key.hex()}.bin")
+    header = struct.Struct("<4sH16sII")
+    n_wp = 9 * 2 * 3 * 8 * (2 * MAX_LEAD + 1)
+    try:
+        with open(path, "rb") as fh:
+            magic, version, stored_key, n_re, n_w = header.unpack(fh.read(header.size))
+            if (magic, version, stored_key, n_re, n_w) != (b"TSRE", TABLES_VERSION, key, 24, n_wp):
+                raise ValueError("stale expectancy cache")
+            re24, wp, wp_nine = array("f"), array("f"), array("f")
+            re24.fromfile(fh, n_re)
+            wp.fromfile(fh, n_w)
+            wp_nine.fromfile(fh, n_w)
+    except (OSError, ValueError, EOFError, struct.error):
+        re24, wp, wp_nine = _build_expectancy_tables(policy)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(header.pack(b"TSRE", TABLES_VERSION, key, len(re24), len(wp)))
+                re24.tofile(fh)
+                wp.tofile(fh)
+                wp_nine.tofile(fh)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only cache dir: keep the tables in memory only
+
+    tables = _EXPECTANCY[policy] = (re24, wp, wp_nine)
+    return tables
+
+def run_expectancy(outs, bases, policy=None):
+    """Expected runs in the rest of the half-inning from a base-out state."""
+    return expectancy_tables(policy)[0][outs * 8 + bases]
+
+def win_probability(inning, half, outs, bases, diff, policy=None, extra_innings=True):
+    """
+    P(home team wins) with `diff` = home runs - away runs, under simulate_game
+    rules (extra innings while tied), or with extra_innings=False under the
+    interactive game's (nine innings, a tie stands). outs=3 means the half
+    just ended.
+    """
+    if outs >= 3:
+        if half == "top":
+            if inning >= 9 and diff > 0:
+                return 1.0
+            half, outs, bases = "bottom", 0, 0
+        else:
+            if inning >= 9 and (diff != 0 or not extra_innings):
+                return 1.0 if diff > 0 else 0.0
+            inning, half, outs, bases = inning + 1, "top", 0, 0
+    inning = min(inning, 9)
+    d = max(-MAX_LEAD, min(MAX_LEAD, diff))
+    width = 2 * MAX_LEAD + 1
+    idx = ((((inning - 1) * 2 + HALVES.index(half)) * 3 + outs) * 8 + bases) * width + d + MAX_LEAD
+    return expectancy_tables(policy)[1 if extra_innings else 2][idx]
+
+# ----------------------- Swing Policy -----------------------
+
+SWING_POLICY_ROUNDS = 20   # re-pricing rounds before settling for the last policy
+
+_PITCH_INDEX = {pt: i for i, pt in enumerate(PITCH_MIX)}
+
+def base_out_values(pa_dists):
+    """
+    (re24, visits) for PA outcome distributions keyed by whether a double
+    play is possible: expected runs in the rest of the half from each
+    base-out state, and expected visits to each state in a half-inning,
+    both indexed [outs * 8 + bases].
+    """
+    def effects(outs, b):
+        for outcome, p in pa_dists[(b & 1) == 1 and outs <= 1].items():
+            if p:
+                row, outs_added, _ = _PA_EFFECTS[outcome]
+                yield p, outs_added, row[b]
+
+    re24 = [0.0] * 24
+    for outs in (2, 1, 0):
+        for _ in range(10000):
+            change = 0.0
+            for b in range(8):
+                value = sum(p * (r + (re24[(outs + k) * 8 + nb] if outs + k < 3 else 0.0))
+                            for p, k, (nb, r) in effects(outs, b))
+                change = max(change, abs(value - re24[outs * 8 + b]))
+                re24[outs * 8 + b] = value
+            if change < 1e-14:
+                break
+
+    visits = [0.0] * 24
+    visits[0] = 1.0
+    for outs in range(3):
+        inflow = visits[outs * 8:outs * 8 + 8]
+        level = inflow
+        for _ in range(10000):
+            new = list(inflow)
+            for b in range(8):
+                for p, k, (nb, _) in effects(outs, b):
+                    if not k:
+                        new[nb] += level[b] * p
+            change = max(abs(x - y) for x, y in zip(new, level))
+            level = new
+            if change < 1e-14:
+                break
+        visits[outs * 8:outs * 8 + 8] = level
+        for b in range(8):
+            for p, k, (nb, _) in effects(outs, b):
+                if k and outs + k < 3:
+                    visits[(outs + k) * 8 + nb] += level[b] * p
+    return re24, visits
+
+def outcome_run_values(pa_dists):
+    """
+    Run value of each PA outcome (linear weights): the runs it scores plus
+    the change in run expectancy, averaged over the base-out states a
+    half-inning visits (a double play over those where one is in order).
+    Outcomes the policy never produces are priced all the same. Also
+    returns the share of PAs with a double play in order.
+    """
+    re24, visits = base_out_values(pa_dists)
+    total = dict.fromkeys(PA_OUTCOMES, 0.0)
+    weight = dict.fromkeys(PA_OUTCOMES, 0.0)
+    for outs in range(3):
+        for b in range(8):
+            n = visits[outs * 8 + b]
+            dp = (b & 1) == 1 and outs <= 1
+            for outcome in PA_OUTCOMES:
+                if outcome == "double_play" and not dp:
                     continue
-                hit_type = random.choices(["single", "double", "triple"], weights=[45, 40, 15], k=1)[0]
-
-            # Extra-base or HR chance
-            if random.random() < 0.07:
-                hit_type = "homer"
-
-            if hit_type == "single":
-                scored = advance_bases(bases, batter_name, 1); hits += 1; print("Single. 🎯")
-            elif hit_type == "double":
-                scored = advance_bases(bases, batter_name, 2); hits += 1; print("Double. 🎯🎯")
-            elif hit_type == "triple":
-                scored = advance_bases(bases, batter_name, 3); hits += 1; print("Triple! 🎯🎯🎯")
+                row, outs_added, _ = _PA_EFFECTS[outcome]
+                nb, r = row[b]
+                after = re24[(outs + outs_added) * 8 + nb] if outs + outs_added < 3 else 0.0
+                total[outcome] += n * (r + after - re24[outs * 8 + b])
+                weight[outcome] += n
+    values = {o: total[o] / weight[o] for o in PA_OUTCOMES}
+    return values, weight["double_play"] / weight["walk"]
+
+def _solve_count(pitcher_side, batter_side, values, dp_share, model=None):
+    """
+    Value iteration over the count for one matchup, the pitch type known
+    when the call is made. Returns calls[balls][strikes][pitch index] and
+    the matching (swing value, take value) in runs.
+    """
+    strike_ps, thresholds, foul_ps = matchup_tables(pitcher_side, batter_side, model)
+    total_w = float(sum(PITCH_MIX_WEIGHTS))
+    in_play = []
+    for pt in PITCH_MIX:
+        clear, turn_two = _contact_outcomes(pt, False, model), _contact_outcomes(pt, True, model)
+        in_play.append(sum(((1 - dp_share) * clear[o] + dp_share * turn_two[o]) * values[o] for o in PA_OUTCOMES))
+
+    v = [[0.0] * 3 for _ in range(4)]
+    choices = [[None] * 3 for _ in range(4)]
+    # backwards through the count; only the two-strike foul loops back
+    for _ in range(10000):
+        change = 0.0
+        for b in (3, 2, 1, 0):
+            for s in (2, 1, 0):
+                ball = v[b + 1][s] if b < 3 else values["walk"]
+                looking = v[b][s + 1] if s < 2 else values["k_looking"]
+                swinging = v[b][s + 1] if s < 2 else values["k_swinging"]
+                fouled = v[b][s + 1] if s < 2 else v[b][s]
+                value, row = 0.0, []
+                for pi in range(len(PITCH_MIX)):
+                    p = strike_ps[pi]
+                    foul = p * foul_ps[pi]
+                    contact = (p - foul) * min(1.0, max(0.0, (11 - thresholds[pi]) / 10))
+                    swing = foul * fouled + contact * in_play[pi] + (1 - foul - contact) * swinging
+                    take = p * looking + (1 - p) * ball
+                    row.append((swing, take))
+                    value += PITCH_MIX_WEIGHTS[pi] / total_w * max(swing, take)
+                change = max(change, abs(value - v[b][s]))
+                v[b][s], choices[b][s] = value, row
+        if change < 1e-14:
+            break
+    calls = [[["swing" if swing > take else "take" for swing, take in row] for row in counts] for counts in choices]
+    return calls, choices
+
+@lru_cache(maxsize=1)
+def solve_swing_policy():
+    """
+    The run-value-maximizing swing/take call for every matchup in
+    SIDE_MATCHUPS, count and pitch type. Starting from simple_batter_policy,
+    PA outcomes are priced by the run values of the current policy's
+    league-average half-inning, each count is solved by value iteration,
+    and the new calls are priced again until they stop changing.
+    Returns ({matchup: calls[balls][strikes][pitch index]},
+    {matchup: (swing value, take value) per call}, {outcome: run value}).
+    """
+    return solve_swing_policy_for(DEFAULT_PITCH_MODEL)
+
+def solve_swing_policy_for(model):
+    """solve_swing_policy under another PitchModel (not cached)."""
+    swings = {m: policy_table(simple_batter_policy, *m) for m in SIDE_MATCHUPS}
+    hitter_mix, pitcher_mix = league_side_mix()
+    for _ in range(SWING_POLICY_ROUNDS):
+        pa_dists = {}
+        for dp in (False, True):
+            dist = pa_dists[dp] = dict.fromkeys(PA_OUTCOMES, 0.0)
+            for (p_side, b_side), swing in swings.items():
+                w = pitcher_mix[p_side] * hitter_mix[b_side]
+                for outcome, p in _count_chain(swing, p_side, b_side, dp, model).items():
+                    dist[outcome] += w * p
+        values, dp_share = outcome_run_values(pa_dists)
+        solved = {m: _solve_count(*m, values, dp_share, model) for m in SIDE_MATCHUPS}
+        new = {m: [[[c == "swing" for c in row] for row in calls] for calls in solved[m][0]] for m in SIDE_MATCHUPS}
+        if new == swings:
+            break
+        swings = new
+    return ({m: calls for m, (calls, _) in solved.items()},
+            {m: choices for m, (_, choices) in solved.items()}, values)
+
+_SWING_CALLS = {}
+
+def _swing_calls(pitcher_side, batter_side):
+    calls = solve_swing_policy()[0]
+    table = _SWING_CALLS[(pitcher_side, batter_side)] = calls.get((pitcher_side, batter_side)) or calls[("R", "R")]
+    return table
+
+def optimal_batter_policy(engine, pitch_type):
+    """Swing or take per solve_swing_policy, for the engine's count and matchup."""
+    calls = _SWING_CALLS.get((engine.current_pitcher[1], engine.effective_side))
+    if calls is None:
+        calls = _swing_calls(engine.current_pitcher[1], engine.effective_side)
+    return calls[engine.balls][engine.strikes][_PITCH_INDEX[pitch_type]]
+
+def swing_hint(engine, pitch_type):
+    """The optimal call on this pitch and what it is worth over the other, for the player."""
+    values = solve_swing_policy()[1]
+    choices = values.get((engine.current_pitcher[1], engine.effective_side)) or values[("R", "R")]
+    swing, take = choices[engine.balls][engine.strikes][_PITCH_INDEX[pitch_type]]
+    call, other = ("swing", "taking") if swing > take else ("take", "swinging")
+    return f"💡 Hint: {call} ({abs(swing - take):.3f} runs better than {other})"
+
+# ----------------------- Snapshots & Undo -----------------------
+
+SNAPSHOT_VERSION = 1
+SAVE_PATH = os.environ.get("THE_SHOW_SAVE") or os.path.join(CACHE_DIR, "autosave.snap")
+UNDO_DEPTH = 200   # pitches the player can step back through
+
+# A snapshot is (game, progress, engine state, rng state):
+#   game      the setup that never changes: names, lineups, batter_sides, staffs
+#   progress  (inning, my_line, opp_line, my_hits, opp_hits, opp_batter_idx),
+#             lines as tuples, the home half in progress not included
+#   engine    HalfInningEngine.snapshot() at a pitch prompt
+#   rng       (version, key, position, gauss_next) from the game's random
+#             stream: getstate() with the 624-word key split off and packed
+#             as bytes (2.5 KB, where the tuple of ints takes 25 KB)
+_SNAP_HEADER = struct.Struct("<4sHH")
+_SNAP_ENGINE = struct.Struct("<BBBBHBHHHHb")
+_STAFF_ROLES = ("starter", "reliever", "closer")
+
+class SnapshotRing:
+    """
+    The last `depth` snapshots, each with the length the game's event log
+    had reached when it was taken. Consecutive snapshots share structure:
+    the game setup always, the progress tuple within a half-inning, and the
+    Mersenne Twister key between regenerations (every 624 draws), so each
+    pitch adds only its engine tuple and a few references, and each
+    regeneration 2.5 KB of packed key.
+    """
+
+    def __init__(self, depth=UNDO_DEPTH):
+        self._ring = deque(maxlen=depth)
+
+    def __len__(self):
+        return len(self._ring)
+
+    def push(self, game, progress, engine_state, rng_state, logged=0):
+        version, key, pos, gauss = rng_state
+        if self._ring:
+            (_, last_progress, _, (_, last_key, _, _)), _ = self._ring[-1]
+            if progress == last_progress:
+                progress = last_progress
+            if key == last_key:
+                key = last_key
+        snap = (game, progress, engine_state, (version, key, pos, gauss))
+        self._ring.append((snap, logged))
+        return snap
+
+    def pop(self):
+        """The latest (snapshot, log length) pair."""
+        return self._ring.pop()
+
+def rng_state(rng):
+    """getstate() split as snapshots keep it: (version, key bytes, position, gauss_next)."""
+    version, internal, gauss = rng.getstate()
+    return version, array("I", internal[:-1]).tobytes(), internal[-1], gauss
+
+def set_rng_state(rng, state):
+    version, key, pos, gauss = state
+    words = array("I")
+    words.frombytes(key)
+    rng.setstate((version, (*words, pos), gauss))
+
+def _pack_str(buf, text):
+    raw = text.encode("utf-8")
+    buf += struct.pack("<H", len(raw))
+    buf += raw
+
+def encode_snapshot(snap):
+    """A snapshot as compact bytes (about 3.5 KB, most of it the random state)."""
+    game, (inning, my_line, opp_line, my_hits, opp_hits, opp_batter_idx), engine, (version, key, pos, gauss) = snap
+    buf = bytearray(_SNAP_HEADER.pack(b"TSSN", SNAPSHOT_VERSION, 0))
+    for field in ("player_name", "my_team", "opp_team", "hitter_side", "user_pos_num"):
+        _pack_str(buf, game[field])
+    buf += struct.pack("<BB", game["user_spot"], game["show_on_deck"])
+    for name in game["home_lineup"] + game["opp_lineup"]:
+        _pack_str(buf, name)
+    buf += struct.pack("<H", len(game["batter_sides"]))
+    for name, side in game["batter_sides"].items():
+        _pack_str(buf, name)
+        _pack_str(buf, side)
+    for staff in (game["home_staff"], game["opp_staff"]):
+        for role in _STAFF_ROLES:
+            _pack_str(buf, staff[role][0])
+            _pack_str(buf, staff[role][1])
+        buf += struct.pack("<B", staff["starter_len"])
+
+    buf += struct.pack("<BB", inning, len(my_line)) + bytes(my_line)
+    buf += struct.pack("<B", len(opp_line)) + bytes(opp_line)
+    buf += struct.pack("<HHB", my_hits, opp_hits, opp_batter_idx)
+    buf += _SNAP_ENGINE.pack(*engine[:-1])
+    _pack_str(buf, engine[-1])
+
+    buf += struct.pack("<B?dH", version, gauss is not None, gauss or 0.0, pos)
+    buf += key
+    return bytes(buf)
+
+def decode_snapshot(data):
+    """encode_snapshot's inverse. Raises ValueError for anything else."""
+    view = memoryview(data)
+    try:
+        magic, version, _ = _SNAP_HEADER.unpack_from(view)
+        if (magic, version) != (b"TSSN", SNAPSHOT_VERSION):
+            raise ValueError("not a saved game")
+        off = _SNAP_HEADER.size
+
+        def unpack(fmt):
+            nonlocal off
+            values = struct.unpack_from(fmt, view, off)
+            off += struct.calcsize(fmt)
+            return values
+
+        def text():
+            nonlocal off
+            (n,) = unpack("<H")
+            off += n
+            return bytes(view[off - n:off]).decode("utf-8")
+
+        game = {field: text() for field in ("player_name", "my_team", "opp_team", "hitter_side", "user_pos_num")}
+        game["user_spot"], show_on_deck = unpack("<BB")
+        game["show_on_deck"] = bool(show_on_deck)
+        lineups = [text() for _ in range(18)]
+        game["home_lineup"], game["opp_lineup"] = lineups[:9], lineups[9:]
+        (n_sides,) = unpack("<H")
+        game["batter_sides"] = dict((text(), text()) for _ in range(n_sides))
+        for team in ("home_staff", "opp_staff"):
+            staff = {role: (text(), text()) for role in _STAFF_ROLES}
+            (staff["starter_len"],) = unpack("<B")
+            game[team] = staff
+
+        inning, n = unpack("<BB")
+        my_line = tuple(view[off:off + n]); off += n
+        (n,) = unpack("<B")
+        opp_line = tuple(view[off:off + n]); off += n
+        my_hits, opp_hits, opp_batter_idx = unpack("<HHB")
+        engine = unpack(_SNAP_ENGINE.format) + (text(),)
+
+        rng_version, has_gauss, gauss, pos = unpack("<B?dH")
+        key = bytes(view[off:])
+        if len(key) != 624 * 4:
+            raise ValueError("truncated random state")
+    except (struct.error, UnicodeDecodeError, IndexError) as exc:
+        raise ValueError(f"damaged saved game ({exc})") from None
+    progress = (inning, my_line, opp_line, my_hits, opp_hits, opp_batter_idx)
+    return game, progress, engine, (rng_version, key, pos, gauss if has_gauss else None)
+
+def save_snapshot(path, snap):
+    """Write a snapshot atomically (a crash mid-write leaves the previous one)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(encode_snapshot(snap))
+    os.replace(tmp, path)
+
+def load_snapshot(path):
+    """The snapshot saved at path, or None if there is none or it can't be read."""
+    try:
+        with open(path, "rb") as fh:
+            return decode_snapshot(fh.read())
+    except (OSError, ValueError):
+        return None
+
+def describe_snapshot(snap):
+    game, (inning, my_line, opp_line, *_), engine, _ = snap
+    return (f"Inning {inning}, {game['my_team']} {sum(my_line) + engine[6]} – "
+            f"{game['opp_team']} {sum(opp_line)}, {engine[5]} out")
+
+# ----------------------- At-Bat Loop -----------------------
+
+PLAY_CALLS = {
+    "fly_out": "Fly out. 🪁",
+    "ground_out": "Ground out. 🧤",
+    "double_play": "Ground ball. 6-4-3 double play. 🧱🧱",
+    "lineout": "Lineout. 📐",
+    "walk": "Walk. Take your base. 🧱",
+    "ground_single": "Ground-ball single through the infield. 🟩",
+    "single": "Single. 🎯",
+    "double": "Double. 🎯🎯",
+    "triple": "Triple! 🎯🎯🎯",
+    "homer": "Home run! 💥",
+}
+
+def play_half_inning_script(lineup, batter_idx, user_name, base_user_side, current_pitcher, batter_sides,
+                            team_label, show_on_deck, win_prob=None, profiler=None, rng=None, out=print,
+                            listener=None, checkpoint=None, resume=None, auto_policy=None):
+    """
+    Interactive half-inning as a prompt script: the player's answers are the
+    batter policy and events are narrated as they happen. win_prob(engine),
+    if given, returns the batting team's win probability, shown after each
+    play. profiler is an optional StageProfiler (see HalfInningEngine), and
+    listener also receives the engine's events (e.g. an event log).
+    checkpoint(engine) runs before every pitch prompt and returns whether
+    the player may undo ("u") back to the previous prompt; resume is an
+    engine snapshot() to pick the half up from. "e" hands the rest of the
+    half to auto_policy (default optimal_batter_policy) without narration,
+    and "?" shows swing_hint for the pitch.
+    Returns (runs, hits, next batter_idx, quit), where quit is "undo" when
+    the player asked to go back and "sim" when they asked to sim to the end.
+    """
+    answers, waiting, undo, simming = [], [], [], []
+
+    def decide(engine, pitch_type):
+        if not answers:
+            waiting.append(pitch_type)
+            return "wait"
+        choice = answers.pop().strip().lower()
+        can_flip = engine.batter_name == user_name and base_user_side == "S"
+        # Optional side flip for switch-hitting user
+        if choice == "h" and can_flip:
+            out(f"Switched hitting side for this AB → {engine.flip_side()}.")
+            return None
+        if choice in ("s", "swing"):
+            return "swing"
+        if choice in ("t", "take"):
+            return "take"
+        if choice in ("q", "quit"):
+            return "quit"
+        out("Type s (swing), t (take), or q (quit).")
+        return None
+
+    def narrate(ev):
+        if listener is not None:
+            listener(ev)
+        if simming:
+            return
+        kind = ev["event"]
+        if kind == "pitch":
+            call, count = ev["call"], f"{ev['balls']}-{ev['strikes']}"
+            if call == "ball":
+                out(f"Ball {ev['balls']} 🔔  Count: {count}")
+            elif call == "strike":
+                out(f"Strike {ev['strikes']} 🎯  Count: {count}")
+            elif call == "swinging_strike":
+                out(f"Swinging strike {ev['strikes']} ❌  Count: {count}")
+            elif call == "foul":
+                out(f"Foul ball. Strike {ev['strikes']} ⚠️  Fouls: {ev['fouls']}  Count: {count}")
+            elif call == "foul_two_strikes":
+                out(f"Foul ball. Still two strikes. ⚠️  Fouls: {ev['fouls']}  Count: {count}")
+        elif kind == "play":
+            outcome = ev["outcome"]
+            if outcome == "k_looking":
+                out(f"Strikeout looking {K_LOOK}.")
+                out(f"Outs: {ev['outs']}")
+            elif outcome == "k_swinging":
+                out(f"Strikeout swinging {K_SWING}.")
+                out(f"Outs: {ev['outs']}")
             else:
-                scored = advance_bases(bases, batter_name, 4); hits += 1; print("Home run! 💥")
-
-            runs += scored
-            if scored:
-                print(f"Runs: +{scored}  |  {team_label} this half: {runs}")
-            show_bases(bases)
-            outs, batter_idx, ann = play_ended(0, batter_idx, reset, outs, lineup, bases)
-            if ann:
-                user_side_for_ab = base_user_side
-                if base_user_side == "S":
-                    user_side_for_ab = default_side_for_switch(pitcher_side)
-                announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                show_bases(bases)
-        else:
-            state["strikes"] += 1
-            print(f"Swinging strike {state['strikes']} ❌  Count: {count_string(state)}")
-            if state["strikes"] == 3:
-                print(f"Strikeout swinging {K_SWING}.")
-                outs, batter_idx, ann = play_ended(1, batter_idx, reset, outs, lineup, bases)
-                print(f"Outs: {outs}")
-                if ann:
-                    user_side_for_ab = base_user_side
-                    if base_user_side == "S":
-                        user_side_for_ab = default_side_for_switch(pitcher_side)
-                    announce_batter(lineup, batter_idx, batter_sides, current_pitcher, show_on_deck, user_name=user_name, user_side_for_ab=user_side_for_ab)
-                    show_bases(bases)
-
-    print(f"\nEnd of half-inning for {team_label}. Runs: {runs}, Hits: {hits}, Outs: {outs}")
+                out(PLAY_CALLS[outcome])
+                if outcome == "walk" or outcome in HIT_BASES:
+                    if ev["scored"]:
+                        out(f"Runs: +{ev['scored']}  |  {team_label} this half: {ev['runs']}")
+                    show_bases(ev["bases"], out)
+            if win_prob is not None:
+                out(f"📈 Win probability: {team_label} {win_prob(engine):.0%}")
+        elif kind == "batter_up":
+            announce_batter(lineup, ev["batter_idx"], batter_sides, current_pitcher, show_on_deck,
+                            user_name=user_name, user_side_for_ab=engine.user_side_for_ab, rng=rng, out=out)
+            show_bases(engine.bases, out)
+        elif kind == "quit" and not undo:
+            out("Practice over early. Head back to the clubhouse.")
+
+    engine = HalfInningEngine(lineup, batter_idx, current_pitcher, batter_sides, policy=decide, rng=rng,
+                              listener=narrate, user_name=user_name, base_user_side=base_user_side,
+                              profiler=profiler)
+
+    if resume is None:
+        # announce first batter
+        engine.listener({"event": "batter_up", "batter": engine.batter_name,
+                         "batter_idx": batter_idx, "side": engine.effective_side})
+    else:
+        engine.restore(resume)
+        out(f"\nAt bat: {engine.batter_idx + 1}. {engine.batter_name} (Bats {engine.effective_side}).  "
+            f"Count: {engine.balls}-{engine.strikes}  Outs: {engine.outs}  {team_label} this half: {engine.runs}")
+        show_bases(engine.bases, out)
+
+    while engine.step():
+        if waiting:
+            can_undo = checkpoint is not None and checkpoint(engine)
+            pitch_type = waiting.pop()
+            can_flip = engine.batter_name == user_name and base_user_side == "S"
+            keys = "s/t/q/u/e/?" if can_undo else "s/t/q/e/?"
+            prompt = f"⚾ {pitch_type.title()} — [{keys}]{' (h=flip side)' if can_flip else ''}: "
+            answer = yield prompt
+            choice = answer.strip().lower()
+            while choice in ("?", "hint"):
+                out(swing_hint(engine, pitch_type))
+                answer = yield prompt
+                choice = answer.strip().lower()
+            if choice in ("u", "undo"):
+                if can_undo:
+                    undo.append(True)
+                answer = "q" if can_undo else ""
+            elif choice in ("e", "end"):
+                out("⏩ Simming to the end of the game...")
+                simming.append(True)
+                engine.policy = auto_policy or optimal_batter_policy
+                continue
+            answers.append(answer)
+    runs, hits, batter_idx = engine.runs, engine.hits, engine.batter_idx
+    if engine.quit:
+        return runs, hits, batter_idx, "undo" if undo else True
+    if simming:
+        return runs, hits, batter_idx, "sim"
+    out(f"\nEnd of half-inning for {team_label}. Runs: {runs}, Hits: {hits}, Outs: {engine.outs}")
     return runs, hits, batter_idx, False
 
+def play_half_inning(lineup, batter_idx, user_name, base_user_side, current_pitcher, batter_sides, team_label, show_on_deck, win_prob=None, profiler=None):
+    """play_half_inning_script at the keyboard. Returns (runs, hits, next batter_idx, quit)."""
+    return run_at_console(play_half_inning_script(lineup, batter_idx, user_name, base_user_side, current_pitcher,
+                                                  batter_sides, team_label, show_on_deck, win_prob, profiler))
+
 # ----------------------- Emoji Recap Animation -----------------------
 
-def watch_game_recap(my_team, opp_team, my_line, opp_line, final_home, final_away, speed=0.6):
-    """
-    Plays a simple emoji animation of the inning-by-inning scoring.
-    - ⚾ repeated for runs in that half-inning
-    - live score updates after each half
-    """
-    hl = my_line + [0]*(9 - len(my_line))
-    al = opp_line + [0]*(9 - len(opp_line))
-
-    home_score = 0
-    away_score = 0
-
-    print("\n🎬 Watch the game recap")
-    time.sleep(0.6)
-
-    for inning in range(1, 10):
-        runs_top = al[inning-1]
-        top_icons = "⚾" * runs_top if runs_top else "·"
-        away_score += runs_top
-        print("\033c", end="")
-        print(f"Recap — Inning {inning}")
-        print(f"Top {inning}: {opp_team} {top_icons}")
-        print(f"Score: {opp_team} {away_score} — {my_team} {home_score}")
-        time.sleep(speed)
-
-        runs_bot = hl[inning-1]
-        bot_icons = "⚾" * runs_bot if runs_bot else "·"
-        home_score += runs_bot
-        print("\033c", end="")
-        print(f"Recap — Inning {inning}")
-        print(f"Top {inning}: {opp_team} {top_icons}")
-        print(f"Bottom {inning}: {my_team} {bot_icons}")
-        print(f"Score: {opp_team} {away_score} — {my_team} {home_score}")
-        time.sleep(speed)
-
-    print("\033c", end="")
-    trophy = "🎉🏆" if home_score > away_score else "👏🧢" if away_score > home_score else "🤝"
-    verdict = (
-        f"{my_team} win! {trophy}" if home_score > away_score else
-        f"{opp_team} win! {trophy}" if away_score > home_score else
-        f"Tie game. {trophy}"
-    )
-    print("🏁 Final")
-    print(f"{opp_team} {away_score} — {my_team} {home_score}")
-    print(verdict)
-    time.sleep(1.0)
-
-# ----------------------- Main Game -----------------------
-
-def main():
-    print("⚾️  Welcome to The Show!")
-
-    player_name = input("What's your name? ").strip() or "Player"
-    my_team = choose_team_name("your")
-    opp_team = choose_team_name("the opponent's")
-
-    print(f"Hi {player_name}, you are playing for {my_team} (home).")
-    hitter_side = input("Hit from (L/R/S): ").upper()
+RECAP_FPS = 20
+RECAP_HALF_SECONDS = 0.6   # screen time per half-inning at normal speed
+
+def recap_frame(my_team, opp_team, my_line, opp_line, position):
+    """
+    Screen rows for the recap `position` half-innings in (away bats first);
+    the fraction into the current half counts its runs up one ⚾ at a time.
+    """
+    innings = max(9, len(my_line), len(opp_line))
+    lines = [opp_line, my_line]
+    done, frac = int(position), position - int(position)
+    rows = [f"Recap — {opp_team} at {my_team}", "",
+            "Inning      " + "".join(f"{i:>3}" for i in range(1, innings + 1)) + "     R"]
+    for side, team in ((0, opp_team), (1, my_team)):
+        line = lines[side]
+        shown = [line[i] if i < len(line) else None for i in range(innings) if 2 * i + side < done]
+        cells = ["  -" if r is None else f"{r:>3}" for r in shown] + ["  ·"] * (innings - len(shown))
+        rows.append(f"{team[:10]:<10}  {''.join(cells)}  {sum(r or 0 for r in shown):>4}")
+
+    if done >= 2 * innings:
+        home, away = sum(my_line), sum(opp_line)
+        trophy = "🎉🏆" if home > away else "👏🧢" if away > home else "🤝"
+        rows += ["", "🏁 Final", f"{opp_team} win! {trophy}" if away > home else
+                 f"{my_team} win! {trophy}" if home > away else f"Tie game. {trophy}"]
+        return rows
+    inning, side = done // 2 + 1, done % 2
+    line = lines[side]
+    runs = line[inning - 1] if inning - 1 < len(line) else 0
+    icons = "⚾" * min(runs, int(frac * (runs + 1))) or "·"
+    rows += ["", f"{'Bottom' if side else 'Top'} {inning}: {my_team if side else opp_team} {icons}", ""]
+    return rows
+
+class DiffRenderer:
+    """
+    Draws frames (lists of rows) to a terminal, rewriting only what changed
+    since the last frame: runs of changed characters on plain ASCII rows, the
+    whole row otherwise (emoji widths vary by terminal).
+    """
+
+    def __init__(self, out=print):
+        self.out = out
+        self.rows = None
+
+    def draw(self, rows):
+        if self.rows is None:
+            self.out("\033[2J\033[H" + "\n".join(rows), end="")
+            self.rows = list(rows)
+            return
+        parts = []
+        for r, new in enumerate(rows):
+            old = self.rows[r] if r < len(self.rows) else ""
+            if new == old:
+                continue
+            if not (new.isascii() and old.isascii()):
+                parts.append(f"\033[{r + 1};1H\033[2K{new}")
+                continue
+            width = max(len(new), len(old))
+            new_p, old_p = new.ljust(width), old.ljust(width)
+            c = 0
+            while c < width:
+                if new_p[c] == old_p[c]:
+                    c += 1
+                    continue
+                end = c
+                while end < width and new_p[end] != old_p[end]:
+                    end += 1
+                parts.append(f"\033[{r + 1};{c + 1}H{new_p[c:end]}")
+                c = end
+        for r in range(len(rows), len(self.rows)):
+            parts.append(f"\033[{r + 1};1H\033[2K")
+        if parts:
+            self.out("".join(parts), end="")
+        self.rows = list(rows)
+
+    def finish(self):
+        """Park the cursor under the last frame."""
+        if self.rows is not None:
+            self.out(f"\033[{len(self.rows) + 1};1H")
+
+def recap_script(my_team, opp_team, my_line, opp_line, fps=RECAP_FPS, speedup=1.0,
+                 half_seconds=RECAP_HALF_SECONDS, tty=True, out=print):
+    """
+    The emoji recap as a prompt script that yields the pause before each
+    frame tick (seconds, a float); the driver sends back True if the player
+    asked to skip, which jumps to the final frame. fps only changes how
+    smooth the count-up is, speedup how long the recap takes.
+    Without a TTY nothing is paced or redrawn: one line per half-inning and
+    the final line score go straight out, for logs.
+    """
+    halves = 2 * max(9, len(my_line), len(opp_line))
+    if not tty:
+        out(f"\n🎬 Recap — {opp_team} at {my_team}")
+        for h in range(halves):
+            line = (opp_line, my_line)[h % 2]
+            if h // 2 < len(line):
+                runs = line[h // 2]
+                out(f"{'Bottom' if h % 2 else 'Top'} {h // 2 + 1}: {(opp_team, my_team)[h % 2]} {'⚾' * runs or '·'}")
+        for row in recap_frame(my_team, opp_team, my_line, opp_line, halves)[2:]:
+            out(row)
+        return
+
+    renderer = DiffRenderer(out)
+    tick = 1.0 / fps
+    step = tick * speedup / half_seconds   # half-innings per tick
+    position = 0.0
+    while position < halves:
+        renderer.draw(recap_frame(my_team, opp_team, my_line, opp_line, position))
+        if (yield tick):
+            break
+        position += step
+    renderer.draw(recap_frame(my_team, opp_team, my_line, opp_line, halves))
+    renderer.finish()
+
+def _console_pause(seconds):
+    """Sleep for a prompt script's pause; Ctrl-C asks to skip."""
+    try:
+        time.sleep(seconds)
+        return False
+    except KeyboardInterrupt:
+        return True
+
+def watch_game_recap(my_team, opp_team, my_line, opp_line, final_home=None, final_away=None, speed=RECAP_HALF_SECONDS,
+                     fps=RECAP_FPS, speedup=1.0, tty=None, out=print):
+    """
+    Play the recap at the console (Ctrl-C skips to the final score).
+    tty defaults to whether stdout is a terminal. final_home/final_away are
+    accepted for older callers; the score comes from the line scores.
+    """
+    if tty is None:
+        tty = sys.stdout.isatty()
+    run_at_console(recap_script(my_team, opp_team, my_line, opp_line, fps, speedup, speed, tty, out))
+
+def setup_game_script(registry, pitchers, rng, out=print):
+    """The pre-game questions, teams, staffs and lineups as a prompt script. Returns the game setup dict."""
+    player_name = (yield "What's your name? ").strip() or "Player"
+    my_team = yield from choose_team_name_script("your", out)
+    opp_team = yield from choose_team_name_script("the opponent's", out)
+
+    out(f"Hi {player_name}, you are playing for {my_team} (home).")
+    hitter_side = (yield "Hit from (L/R/S): ").upper()
     if hitter_side not in ("L","R","S"):
         hitter_side = "R"
-        print("Not L/R/S; defaulting to R.")
+        out("Not L/R/S; defaulting to R.")
 
-    user_pos_num = prompt_position()
-    print(f"Defensively, you are {POS_LABELS[user_pos_num]} ({user_pos_num}).")
+    user_pos_num = yield from prompt_position_script(out)
+    out(f"Defensively, you are {POS_LABELS[user_pos_num]} ({user_pos_num}).")
 
     while True:
         try:
-            user_spot = int(input("Your lineup spot (1–9): "))
+            user_spot = int((yield "Your lineup spot (1–9): "))
             if 1 <= user_spot <= 9: break
-            print("Pick a number from 1 to 9.")
+            out("Pick a number from 1 to 9.")
         except ValueError:
-            print("Type a number, like 4.")
+            out("Type a number, like 4.")
 
-    show_on_deck = input("Show on-deck/in-the-hole lines? (y/n): ").strip().lower().startswith("y")
+    show_on_deck = (yield "Show on-deck/in-the-hole lines? (y/n): ").strip().lower().startswith("y")
 
     # Batter handedness map
     batter_sides = {player_name: hitter_side}
 
     # Build defenses (varied pools)
-    home_defense, opp_defense = allocate_two_teams(player_name, user_pos_num, batter_sides)
-
-    # Opponent pitching staff and schedule
-    opp_staff = choose_staff()
-
-    # Build lineups from realistic role-fitting
-    home_lineup = build_batting_order_realistic(home_defense, player_name, user_spot, batter_sides)
-    _ = build_batting_order_realistic(opp_defense, "Opp Batter", 9, batter_sides)  # opponent lineup not used in PBP
-
-    my_total_runs = 0
-    my_total_hits = 0
-    opp_total_runs = 0
-    my_line = []
-    opp_line = []
-    batter_idx = (user_spot - 1)
+    home_defense, opp_defense = allocate_two_teams(player_name, user_pos_num, batter_sides, registry, rng)
+
+    # Pitching staffs and schedules
+    opp_staff = choose_staff(rng, pitchers)
+    home_staff = choose_staff(rng, pitchers, exclude={opp_staff[role][0] for role in ("starter", "reliever", "closer")})
+
+    # Build lineups: the order that scores the most against their staff, you in your spot
+    # (and leading off: the game starts with your at-bat)
+    pitcher_sides = [current_pitcher_for_inning(opp_staff, i)[1] for i in range(1, 10)]
+    home_lineup, _ = yield partial(optimize_batting_order, home_defense, player_name, user_spot, batter_sides,
+                                   pitcher_sides, registry=registry, leadoff=user_spot - 1)
+    opp_lineup = build_batting_order_realistic(opp_defense, None, 9, batter_sides, registry)
+
+    return {"player_name": player_name, "my_team": my_team, "opp_team": opp_team, "hitter_side": hitter_side,
+            "user_pos_num": user_pos_num, "user_spot": user_spot, "show_on_deck": show_on_deck,
+            "batter_sides": batter_sides, "home_lineup": home_lineup, "opp_lineup": opp_lineup,
+            "home_staff": home_staff, "opp_staff": opp_staff}
+
+def main_script(registry=None, pitchers=None, rng=None, out=print, profiler=None, tty=True,
+                skip_hint="Ctrl-C skips", recorder=None, resume=None, autosave=None, undo_depth=UNDO_DEPTH):
+    """
+    A whole game as a prompt script. registry/pitchers default to the
+    built-in pools; rng (default: the random module) drives every draw, so
+    concurrent sessions each pass their own. tty=False writes the recap
+    as plain lines instead of animating it; skip_hint tells the player how
+    their driver skips it. recorder (a show_log.GameRecorder) logs every
+    pitch and play of both halves, and an undone pitch is taken back out of
+    it. The game's start record is written here for a new game; to log a
+    resumed one, pass the recorder from show_log.EventLog.resume, which
+    carries on the game the part already played was logged under.
+    A snapshot is taken at every pitch prompt and the last undo_depth are
+    kept for undo; with autosave (a path) each is also written there, and
+    passing one back as resume picks the game up at that pitch.
+    """
+    registry, pitchers = registry or REGISTRY, pitchers or PITCHERS
+    rng = rng or random
+    out("⚾️  Welcome to The Show!")
+
+    if resume is None:
+        game = yield from setup_game_script(registry, pitchers, rng, out)
+        inning, my_line, opp_line, my_total_hits, opp_total_hits, opp_batter_idx = 1, [], [], 0, 0, 0
+        batter_idx = game["user_spot"] - 1
+        state = None
+    else:
+        game, progress, state, snap_rng = resume
+        inning, my_line, opp_line, my_total_hits, opp_total_hits, opp_batter_idx = progress
+        my_line, opp_line = list(my_line), list(opp_line)
+        batter_idx = state[0]
+        set_rng_state(rng, snap_rng)
+        out(f"Welcome back, {game['player_name']}. {describe_snapshot(resume)}.")
+
+    player_name, my_team, opp_team = game["player_name"], game["my_team"], game["opp_team"]
+    hitter_side, show_on_deck, batter_sides = game["hitter_side"], game["show_on_deck"], game["batter_sides"]
+    home_lineup, opp_lineup = game["home_lineup"], game["opp_lineup"]
+    home_staff, opp_staff = game["home_staff"], game["opp_staff"]
+    if recorder is not None and resume is None:
+        recorder.start(my_team, opp_team)
+
+    ring = SnapshotRing(undo_depth)
     game_ended_early = False
-
-    # Inning 1 — Opp batting (defense summary = exactly 3 outs)
-    print(f"\n========== Inning 1 — {opp_team} batting ==========")
-    opp_runs, opp_desc = simulate_opponent_half_inning(user_pos_num)
-    opp_total_runs += opp_runs
-    opp_line.append(opp_runs)
-    print("Defense summary:", opp_desc)
-    print(f"{opp_team} scored this half: {opp_runs}")
-
-    # Inning 1 — Home batting
-    inning = 1
-    current_pitcher = current_pitcher_for_inning(opp_staff, inning)
-    p_name, p_hand = current_pitcher
-    print(f"\n========== Inning 1 — {my_team} batting (vs {p_name}, {p_hand}) ==========")
-    runs, hits, batter_idx, ended = play_half_inning(
-        lineup=home_lineup,
-        batter_idx=batter_idx,
-        user_name=player_name,
-        base_user_side=hitter_side,
-        current_pitcher=current_pitcher,
-        batter_sides=batter_sides,
-        team_label=my_team,
-        show_on_deck=show_on_deck
-    )
-    if ended: game_ended_early = True
-    my_total_runs += runs; my_total_hits += hits; my_line.append(runs)
-    print("\n--- Inning Summary ---")
-    print(f"{my_team}: {my_total_runs} | {opp_team}: {opp_total_runs}")
-    print("----------------------")
-
-    # Innings 2–9
-    inning = 2
-    while not game_ended_early and inning <= 9:
-        print(f"\n========== Inning {inning} — {opp_team} batting ==========")
-        opp_runs, opp_desc = simulate_opponent_half_inning(user_pos_num)
-        opp_total_runs += opp_runs
-        opp_line.append(opp_runs)
-        print("Defense summary:", opp_desc)
-        print(f"{opp_team} scored this half: {opp_runs}")
-
+    auto = False   # the player asked to sim to the end: the rest is headless and silent
+
+    def checkpoint(engine):
+        progress = (inning, tuple(my_line), tuple(opp_line), my_total_hits, opp_total_hits, opp_batter_idx)
+        snap = ring.push(game, progress, engine.snapshot(), rng_state(rng),
+                         len(recorder.data) if recorder is not None else 0)
+        if autosave:
+            try:
+                save_snapshot(autosave, snap)
+            except OSError:
+                pass   # unwritable save path: play on without autosave
+        return len(ring) > 1
+
+    def live_win_prob(engine):
+        diff = my_total_runs + engine.runs - opp_total_runs
+        return win_probability(inning, "bottom", engine.outs, engine.bases, diff, extra_innings=False)
+
+    while inning <= 9:
+        my_total_runs, opp_total_runs = sum(my_line), sum(opp_line)
         current_pitcher = current_pitcher_for_inning(opp_staff, inning)
         p_name, p_hand = current_pitcher
-        print(f"\n========== Inning {inning} — {my_team} batting (vs {p_name}, {p_hand}) ==========")
-        runs, hits, batter_idx, ended = play_half_inning(
+
+        if auto:
+            opp_pitcher = current_pitcher_for_inning(home_staff, inning)
+            opp_runs, opp_hits, opp_batter_idx, _ = run_half_inning(
+                opp_lineup, opp_batter_idx, opp_pitcher, batter_sides, rng=rng,
+                listener=recorder and recorder.half(inning, False, opp_pitcher))
+            runs, hits, batter_idx, _ = run_half_inning(
+                home_lineup, batter_idx, current_pitcher, batter_sides, rng=rng,
+                listener=recorder and recorder.half(inning, True, current_pitcher),
+                user_name=player_name, base_user_side=hitter_side)
+            opp_line.append(opp_runs); opp_total_hits += opp_hits
+            my_line.append(runs); my_total_hits += hits
+            inning += 1
+            continue
+
+        if state is None:
+            # Opp batting (simulated against our staff; the summary is their plate appearances)
+            opp_pitcher = current_pitcher_for_inning(home_staff, inning)
+            out(f"\n========== Inning {inning} — {opp_team} batting (vs {opp_pitcher[0]}, {opp_pitcher[1]}) ==========")
+            opp_runs, opp_hits, opp_batter_idx, opp_desc = simulate_opponent_half_inning(
+                opp_lineup, opp_batter_idx, opp_pitcher, batter_sides, rng=rng,
+                listener=recorder and recorder.half(inning, False, opp_pitcher))
+            opp_total_runs += opp_runs; opp_total_hits += opp_hits
+            opp_line.append(opp_runs)
+            out("Defense summary:", opp_desc)
+            out(f"{opp_team} scored this half: {opp_runs}")
+            out(f"📈 Win probability: {my_team} {win_probability(inning, 'top', 3, 0, my_total_runs - opp_total_runs, extra_innings=False):.0%}")
+
+        # Home batting
+        out(f"\n========== Inning {inning} — {my_team} batting (vs {p_name}, {p_hand}) ==========")
+        runs, hits, batter_idx, ended = yield from play_half_inning_script(
             lineup=home_lineup,
             batter_idx=batter_idx,
             user_name=player_name,
@@ -808,43 +2416,125 @@ def main():
             current_pitcher=current_pitcher,
             batter_sides=batter_sides,
             team_label=my_team,
-            show_on_deck=show_on_deck
+            show_on_deck=show_on_deck,
+            win_prob=live_win_prob,
+            profiler=profiler,
+            rng=rng,
+            out=out,
+            listener=recorder and recorder.half(inning, True, current_pitcher,
+                                                 state and (state[1], state[5], state[6]) or (0, 0, 0)),
+            checkpoint=checkpoint,
+            resume=state
         )
-        if ended:
+        state = None
+        if ended == "undo":
+            ring.pop()   # the prompt we were at; the one before it is replayed
+            (_, progress, state, snap_rng), logged = ring.pop()
+            if recorder is not None:
+                del recorder.data[logged:]
+            inning, my_line, opp_line, my_total_hits, opp_total_hits, opp_batter_idx = progress
+            my_line, opp_line = list(my_line), list(opp_line)
+            batter_idx = state[0]
+            set_rng_state(rng, snap_rng)
+            out("⏪ Back one pitch.")
+            continue
+        if ended == "sim":
+            auto = True
+        elif ended:
             game_ended_early = True
             break
         my_total_runs += runs; my_total_hits += hits; my_line.append(runs)
+        if auto:
+            inning += 1
+            continue
 
-        print("\n--- Inning Summary ---")
-        print(f"{my_team}: {my_total_runs} | {opp_team}: {opp_total_runs}")
-        print("----------------------")
+        out("\n--- Inning Summary ---")
+        out(f"{my_team}: {my_total_runs} | {opp_team}: {opp_total_runs}")
+        out("----------------------")
         inning += 1
 
-    if not game_ended_early:
-        # Scoreboard
-        def pad_line(arr): return arr + [0]*(9 - len(arr))
-        my_display  = pad_line(my_line)
-        opp_display = pad_line(opp_line)
-
-        header   = "Inning:   " + " ".join(str(i) for i in range(1, 10)) + "   R   H"
-        left_nm  = f"{my_team[:10]}".ljust(10)
-        right_nm = f"{opp_team[:10]}".ljust(10)
-        my_row   = f"{left_nm}:  {' '.join(map(str, my_display)).ljust(20)}  {my_total_runs:>2}  {my_total_hits:>2}"
-        opp_row  = f"{right_nm}:  {' '.join(map(str, opp_display)).ljust(20)}  {opp_total_runs:>2}   -"
-
-        print("\n========== Final ==========")
-        print(header)
-        print(my_row)
-        print(opp_row)
-        print(f"\n{my_team} {my_total_runs} vs {opp_team} {opp_total_runs}")
-        if my_total_runs > opp_total_runs:   print("You win. 🎉")
-        elif my_total_runs < opp_total_runs: print("You lose. 🧢")
-        else:                                 print("Tie game. 🤝")
-
-        # Optional recap animation
-        want_recap = input("\nWatch the emoji recap? (y/n): ").strip().lower()
-        if want_recap.startswith("y"):
-            watch_game_recap(my_team, opp_team, my_line, opp_line, my_total_runs, opp_total_runs)
+    if game_ended_early:
+        if autosave and len(ring):
+            out(f"Game saved. Start The Show again to pick up in inning {inning}.")
+        return
+    if autosave:
+        try:
+            os.remove(autosave)
+        except OSError:
+            pass
+
+    # Scoreboard
+    my_total_runs, opp_total_runs = sum(my_line), sum(opp_line)
+    def pad_line(arr): return arr + [0]*(9 - len(arr))
+    my_display  = pad_line(my_line)
+    opp_display = pad_line(opp_line)
+
+    header   = "Inning:   " + " ".join(str(i) for i in range(1, 10)) + "   R   H"
+    left_nm  = f"{my_team[:10]}".ljust(10)
+    right_nm = f"{opp_team[:10]}".ljust(10)
+    my_row   = f"{left_nm}:  {' '.join(map(str, my_display)).ljust(20)}  {my_total_runs:>2}  {my_total_hits:>2}"
+    opp_row  = f"{right_nm}:  {' '.join(map(str, opp_display)).ljust(20)}  {opp_total_runs:>2}  {opp_total_hits:>2}"
+
+    out("\n========== Final ==========")
+    out(header)
+    out(my_row)
+    out(opp_row)
+    out(f"\n{my_team} {my_total_runs} vs {opp_team} {opp_total_runs}")
+    if my_total_runs > opp_total_runs:   out("You win. 🎉")
+    elif my_total_runs < opp_total_runs: out("You lose. 🧢")
+    else:                                 out("Tie game. 🤝")
+
+    # Optional recap animation
+    want_recap = (yield "\nWatch the emoji recap? (y/n, f=fast-forward): ").strip().lower()
+    if want_recap.startswith(("y", "f")):
+        if tty:
+            out(f"({skip_hint})")
+        yield from recap_script(my_team, opp_team, my_line, opp_line,
+                                speedup=4.0 if want_recap.startswith("f") else 1.0, tty=tty, out=out)
+
+def main(roster_path=None):
+    # Optional roster file in place of the built-in pools
+    registry, pitchers = REGISTRY, PITCHERS
+    if roster_path:
+        from show_roster import load_roster
+        try:
+            registry, roster_pitchers = load_roster(roster_path)
+        except (OSError, ValueError) as exc:
+            print(exc)
+            sys.exit(1)
+        pitchers = roster_pitchers or PITCHERS
+
+    # THE_SHOW_PROFILE=stages.json (or .folded) records where each pitch's time goes
+    profile_path = os.environ.get("THE_SHOW_PROFILE")
+    profiler = StageProfiler() if profile_path else None
+
+    # THE_SHOW_LOG=games.log appends every pitch and play to a binary event log (see show_log.py)
+    log_path = os.environ.get("THE_SHOW_LOG")
+    log = recorder = None
+    if log_path:
+        from show_log import EventLog
+        log = EventLog(log_path)
+
+    # Every pitch prompt is autosaved; a game left mid-way can be picked up again
+    resume = load_snapshot(SAVE_PATH)
+    if resume is not None:
+        answer = input(f"Resume your saved game ({describe_snapshot(resume)})? (y/n): ")
+        if not answer.strip().lower().startswith("y"):
+            resume = None
+    if log is not None:
+        recorder = log.recorder() if resume is None else log.resume(resume[0]["my_team"], resume[0]["opp_team"])
+
+    try:
+        run_at_console(main_script(registry, pitchers, profiler=profiler, tty=sys.stdout.isatty(),
+                                   recorder=recorder, resume=resume, autosave=SAVE_PATH))
+    finally:
+        if log is not None:
+            log.append(recorder)
+            log.close()
+
+    if profiler is not None:
+        profiler.write(profile_path)
+        print(f"Stage timings saved to {profile_path}")
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)